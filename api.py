@@ -1,26 +1,44 @@
+import datetime
+import itertools
 import os
-import shutil
-import tempfile
+import threading
 import traceback
-import requests
+import uuid
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List
 from pathlib import Path
 
 from scraper import WebScraper
 from script_generator import ScriptGenerator
-from tts_converter import TTSConverter
+from tts_converter import get_converter, default_engine_router
+from parallel_tts import ParallelSynthesizer, print_progress
+from segment_cache import default_segment_cache
+from episode_plan import DEFAULT_AD_TEXT, build_vibe_map, ad_insert_index, insert_into_vibe_map
+from audio_mixer import render_episode, render_stream, iter_mixed_mp3, MIX_BACKENDS, DEFAULT_MIX_BACKEND
+from filtergraph_render import render_filtergraph
+from music_library import default_music_library
+from workspace import JobWorkspace, sweep_stale_workspaces
+from job_manager import default_job_manager, sse_events
+from llm_gateway import default_llm_gateway, LLMError
+from llm_cache import default_llm_cache
+from scrape_cache import default_scrape_cache
+from prefetcher import ListenLaterPrefetcher, foreground_activity, PREFETCH_ENABLED, PREFETCH_TTS_WORKERS
+from batch_pipeline import BatchPipeline, BATCH_MAX_URLS
+from script_compiler import compile_script, compile_line
+from script_stream import StreamedScript
 from history_manager import HistoryManager
 from pydub import AudioSegment
 from persona_engine import PersonaEngine
 from fact_checker import FactChecker
 
 from news_aggregator import NewsAggregator
-from database import engine, Base
+from feed_poller import FeedPoller, FEED_POLLING_ENABLED
+from database import engine, Base, migrate_schema
 from image_generator import ImageGenerator
 
 # ... existing imports ...
@@ -35,10 +53,13 @@ class QuoteRequest(BaseModel):
 
 # Create Tables
 Base.metadata.create_all(bind=engine)
+migrate_schema()
 
 app = FastAPI()
 history_mgr = HistoryManager()
+prefetcher = ListenLaterPrefetcher(history_mgr)
 news_aggregator = NewsAggregator()
+feed_poller = FeedPoller(news_aggregator, history_mgr)
 persona_engine = PersonaEngine()
 fact_checker = FactChecker()
 
@@ -51,6 +72,34 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+def preload_music():
+    # Decode the music beds in the background so the first render doesn't pay for it
+    threading.Thread(target=default_music_library.preload, daemon=True).start()
+
+@app.on_event("startup")
+def sweep_workspaces():
+    removed = sweep_stale_workspaces()
+    if removed:
+        print(f"🧹 Removed {removed} stale job workspaces")
+
+@app.on_event("startup")
+def purge_llm_cache():
+    removed = default_llm_cache.purge_expired()
+    if removed:
+        print(f"🧹 Removed {removed} expired LLM cache entries")
+
+@app.on_event("startup")
+def start_feed_poller():
+    if FEED_POLLING_ENABLED:
+        feed_poller.start()
+
+@app.on_event("startup")
+def sweep_scrape_cache():
+    removed = default_scrape_cache.sweep()
+    if removed:
+        print(f"🧹 Removed {removed} old scraped pages")
+
 # Resolve paths relative to the script location
 BASE_DIR = Path(__file__).resolve().parent
 images_dir = BASE_DIR / "images"
@@ -90,16 +139,25 @@ class GenerateRequest(BaseModel):
     improv: Optional[bool] = False
     user_intro_file: Optional[str] = None
     guest_url: Optional[str] = None
+    tts_workers: Optional[int] = None # Parallel TTS lines (defaults to TTS_WORKERS)
+    use_tts_cache: Optional[bool] = True # False forces fresh synthesis
+    mix_backend: Optional[str] = None # "numpy" (default), "stream" (flat memory), "ffmpeg" (one filtergraph) or "pydub"
+    stream_script: Optional[bool] = False # Synthesize script lines while the LLM is still writing them
+    force_fresh: Optional[bool] = False # Bypass the LLM response cache for the script and guest persona
+    long_document: Optional[bool] = False # Condense the full article (map-reduce) instead of using its first 4000 characters
+    refresh_content: Optional[bool] = False # Scrape the URL again instead of using the scrape cache
 
 class SegmentRegenRequest(BaseModel):
     text: str
     voice: str # "male" or "female"
     cartesia_key: Optional[str] = None
+    use_tts_cache: Optional[bool] = True
 
 class HistoryGenerateRequest(BaseModel):
     script: str
     url: str
     cartesia_key: Optional[str] = None
+    use_tts_cache: Optional[bool] = True
 
 class PlaylistAddRequest(BaseModel):
     url: str
@@ -114,11 +172,11 @@ class CommentRequest(BaseModel):
     timestamp_seconds: int
 
 @app.get("/api/history")
-async def get_history():
+def get_history():
     return history_mgr.get_history()
 
 @app.get("/api/history/{entry_id}")
-async def get_history_detail(entry_id: str):
+def get_history_detail(entry_id: str):
     detail = history_mgr.get_generation_detail(entry_id)
     if not detail:
         raise HTTPException(status_code=404, detail="Entry not found")
@@ -129,25 +187,46 @@ async def get_history_detail(entry_id: str):
     return detail
 
 @app.post("/api/comments/add")
-async def add_comment(req: CommentRequest):
+def add_comment(req: CommentRequest):
     history_mgr.add_comment(req.episode_id, req.username, req.text, req.timestamp_seconds)
     return {"status": "success"}
 
 @app.get("/api/discovery/trending")
-async def get_trending():
-    return news_aggregator.get_trending()
+def get_trending(limit: int = 10, offset: int = 0, source: Optional[str] = None, hours: Optional[float] = None):
+    """Newest stored articles first; page with limit/offset, filter by source and the last `hours` hours."""
+    if limit < 1 or limit > 100 or offset < 0:
+        raise HTTPException(status_code=400, detail="limit must be 1-100 and offset at least 0")
+    since = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(hours=hours) if hours else None
+    articles = history_mgr.get_articles(limit=limit, offset=offset, source=source, since=since)
+    if not articles and not feed_poller.ready and feed_poller.wait_for_first_poll():
+        # Nothing stored yet because the first poll was still under way
+        articles = history_mgr.get_articles(limit=limit, offset=offset, source=source, since=since)
+    return articles
+
+@app.get("/api/discovery/sources")
+def get_trending_sources():
+    return history_mgr.get_article_sources()
+
+@app.get("/api/discovery/feeds")
+def get_feed_stats():
+    return feed_poller.stats()
 
 @app.get("/api/playlist")
-async def get_listen_later():
+def get_listen_later():
     return history_mgr.get_listen_later()
 
 @app.post("/api/playlist/add")
-async def add_listen_later(req: PlaylistAddRequest):
+def add_listen_later(req: PlaylistAddRequest):
     history_mgr.add_listen_later(req.url, req.title, req.source, req.summary)
+    prefetcher.wake()
     return {"status": "success"}
 
+@app.get("/api/playlist/prefetch")
+def get_prefetch_status():
+    return prefetcher.stats()
+
 @app.post("/api/trailer/{entry_id}")
-async def create_trailer(entry_id: str):
+def create_trailer(entry_id: str):
     detail = history_mgr.get_generation_detail(entry_id)
     if not detail or not detail.get('audio_url'):
         raise HTTPException(status_code=404, detail="Audio not found")
@@ -163,8 +242,9 @@ async def create_trailer(entry_id: str):
         trailer = trailer.fade_out(3000)
         
         output_filename = f"trailer_{filename}"
-        output_path = history_dir / output_filename
-        trailer.export(output_path, format="mp3")
+        with JobWorkspace(prefix="trailer_") as workspace:
+            trailer.export(workspace.file(output_filename), format="mp3")
+            workspace.publish(output_filename, history_dir)
         
         return {"audio_url": f"/history_files/{output_filename}"}
     except Exception as e:
@@ -207,22 +287,16 @@ class InterrogateRequest(BaseModel):
     context: str
     cartesia_key: Optional[str] = None
     cerebras_key: Optional[str] = None
+    force_fresh: Optional[bool] = False # Bypass the LLM response cache for the fact check
 
 @app.post("/api/interrogate")
-async def interrogate_hosts(req: InterrogateRequest):
-    if req.cerebras_key: os.environ['CEREBRAS_API_KEY'] = req.cerebras_key
-    if req.cartesia_key: os.environ['CARTESIA_API_KEY'] = req.cartesia_key
+def interrogate_hosts(req: InterrogateRequest):
+    keys = _llm_keys(req)
     
     # 1. Fact Check
-    fact_check = fact_checker.check_claim(req.query, req.context)
+    fact_check = fact_checker.check_claim(req.query, req.context, keys=keys, force_fresh=req.force_fresh)
     
     # 2. Generate Host Response (Dialogue)
-    generator = ScriptGenerator()
-    headers = {
-        "Authorization": f"Bearer {os.environ.get('CEREBRAS_API_KEY')}",
-        "Content-Type": "application/json"
-    }
-    
     prompt = f"""
     The listener is asking a question about the podcast.
     QUESTION: {req.query}
@@ -239,44 +313,11 @@ async def interrogate_hosts(req: InterrogateRequest):
     
     # 2. Get LLM response for interrogation (Tiered: Gemini -> OpenRouter -> Cerebras)
     response_text = ""
-    gemini_key = os.environ.get('GEMINI_API_KEY')
-    openrouter_key = os.environ.get('OPENROUTER_API_KEY')
-    
-    # Tier 1: Gemini 3 Flash
-    if gemini_key:
-        try:
-            url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-3-flash-preview:generateContent?key={gemini_key}"
-            res = requests.post(url, json={"contents": [{"parts": [{"text": prompt}]}]}, timeout=15)
-            if res.status_code == 200:
-                response_text = res.json()['candidates'][0]['content']['parts'][0]['text']
-        except Exception as e:
-            print(f"Gemini Interrogate Error: {e}")
-
-    # Tier 2: OpenRouter
-    if not response_text and openrouter_key:
-        try:
-            or_headers = {"Authorization": f"Bearer {openrouter_key}", "Content-Type": "application/json"}
-            or_data = {"model": "qwen/qwen3-4b:free", "messages": [{"role": "user", "content": prompt}]}
-            res = requests.post("https://openrouter.ai/api/v1/chat/completions", headers=or_headers, json=or_data, timeout=15)
-            if res.status_code == 200:
-                response_text = res.json()['choices'][0]['message']['content']
-        except Exception as e:
-            print(f"OpenRouter Interrogate Error: {e}")
+    try:
+        response_text = default_llm_gateway.complete(prompt, keys=keys, timeout=15, kind="interrogate").text
+    except LLMError as e:
+        print(f"Interrogate Error: {e}")
 
-    # Tier 3: Cerebras Fallback
-    if not response_text:
-        try:
-            cerebras_data = {
-                "model": "llama3.1-8b",
-                "messages": [{"role": "user", "content": prompt}],
-                "stream": False
-            }
-            res = requests.post("https://api.cerebras.ai/v1/chat/completions", headers=headers, json=cerebras_data, timeout=15)
-            if res.status_code == 200:
-                response_text = res.json()['choices'][0]['message']['content']
-        except Exception as e:
-            print(f"Cerebras Interrogate Error: {e}")
-    
     # If no response generated, use fallback
     if not response_text:
         response_text = "Host 1: That's an interesting question!\nHost 2: Unfortunately, we're having some technical difficulties accessing that information right now."
@@ -286,37 +327,31 @@ async def interrogate_hosts(req: InterrogateRequest):
     interrogate_dir.mkdir(exist_ok=True)
     
     # 4. TTS for response - Parse and generate audio
-    tts = TTSConverter()
-    segments = tts._parse_script(response_text)
-    
-    audio_segments = []
-    for i, (speaker, text) in enumerate(segments):
-        audio_file = interrogate_dir / f"interrogate_{tempfile.mktemp().split('/')[-1]}_{i}.mp3"
-        tts._generate_and_save_speech(text, speaker, str(audio_file))
-        
-        if audio_file.exists() and audio_file.stat().st_size > 0:
-            audio_segments.append(audio_file)
-    
-    # Merge all segments if multiple
-    if len(audio_segments) > 1:
-        from pydub import AudioSegment as AS
-        combined = AS.empty()
-        for seg_path in audio_segments:
-            combined += AS.from_mp3(seg_path)
-        
-        final_path = interrogate_dir / f"response_{tempfile.mktemp().split('/')[-1]}.mp3"
-        combined.export(final_path, format="mp3")
-        
-        # Clean up individual segments
-        for seg_path in audio_segments:
-            try: os.remove(seg_path)
-            except: pass
+    tts = get_converter(cartesia_key=req.cartesia_key)
+    segments = compile_script(response_text)
+    
+    audio_url = None
+    with JobWorkspace(prefix="interrogate_") as workspace:
+        audio_segments = []
+        for i, segment in enumerate(segments):
+            audio_file = workspace.file(f"interrogate_{i}.mp3")
+            tts.synthesize_segment(segment, str(audio_file))
             
-        audio_url = f"/history_files/interrogate/{final_path.name}"
-    elif len(audio_segments) == 1:
-        audio_url = f"/history_files/interrogate/{audio_segments[0].name}"
-    else:
-        audio_url = None
+            if audio_file.exists() and audio_file.stat().st_size > 0:
+                audio_segments.append(audio_file)
+        
+        # Merge all segments if multiple; only the response is published, the rest goes with the workspace
+        final_name = f"response_{workspace.job_id}.mp3"
+        if len(audio_segments) > 1:
+            combined = AudioSegment.empty()
+            for seg_path in audio_segments:
+                combined += AudioSegment.from_mp3(seg_path)
+            combined.export(workspace.file(final_name), format="mp3")
+            workspace.publish(final_name, interrogate_dir)
+            audio_url = f"/history_files/interrogate/{final_name}"
+        elif len(audio_segments) == 1:
+            workspace.publish(audio_segments[0].name, interrogate_dir, final_name)
+            audio_url = f"/history_files/interrogate/{final_name}"
     
     return {
         "response_text": response_text,
@@ -324,122 +359,440 @@ async def interrogate_hosts(req: InterrogateRequest):
         "audio_url": audio_url
     }
 
+@app.get("/api/tts/cache")
+async def get_tts_cache_stats():
+    return default_segment_cache.stats()
+
+@app.get("/api/tts/engines")
+async def get_tts_engine_health():
+    return default_engine_router.snapshot()
+
+@app.get("/api/llm/stats")
+async def get_llm_stats():
+    return default_llm_gateway.stats()
+
+@app.get("/api/llm/cache")
+def get_llm_cache_stats():
+    return default_llm_cache.stats()
+
+@app.get("/api/scrape/cache")
+def get_scrape_cache_stats():
+    return default_scrape_cache.stats()
+
 @app.post("/api/regenerate-segment")
-async def regenerate_segment(req: SegmentRegenRequest):
-    if req.cartesia_key: os.environ['CARTESIA_API_KEY'] = req.cartesia_key
-    converter = TTSConverter()
+def regenerate_segment(req: SegmentRegenRequest):
+    converter = get_converter(cartesia_key=req.cartesia_key)
     
     # Use a persistent temp folder
     regen_dir = history_dir / "regen"
     regen_dir.mkdir(exist_ok=True)
     
-    output_filename = f"regen_{tempfile.mktemp().split('/')[-1]}.mp3"
-    output_path = regen_dir / output_filename
-    
-    curr_text = req.text
-    for prefix in ["Host 1:", "Host 2:", "Guest:"]:
-        if curr_text.startswith(prefix):
-            curr_text = curr_text.replace(prefix, "").strip()
-
-    converter._generate_and_save_speech(curr_text, req.voice, str(output_path))
+    # Strips a leading "Host 1:" / "Host 2:" / "Guest:" prefix
+    segment = compile_line(req.text, req.voice)
+    with JobWorkspace(prefix="regen_") as workspace:
+        output_filename = f"regen_{workspace.job_id}.mp3"
+        converter.synthesize_segment(segment, str(workspace.file(output_filename)), use_cache=req.use_tts_cache)
+        if workspace.file(output_filename).exists():
+            workspace.publish(output_filename, regen_dir)
     
     return {"audio_url": f"/history_files/regen/{output_filename}"}
 app.mount("/history_files/interrogate", StaticFiles(directory=str(history_dir / "interrogate")), name="interrogate")
 app.mount("/history_files/regen", StaticFiles(directory=str(history_dir / "regen")), name="regen")
 
 @app.post("/api/upload/audio")
-async def upload_audio(file: UploadFile = File(...)):
+def upload_audio(file: UploadFile = File(...)):
     file_location = uploads_dir / file.filename
     with open(file_location, "wb+") as file_object:
         file_object.write(file.file.read())
     return {"filename": file.filename}
 
-@app.post("/api/generate")
-async def generate_podcast(req: GenerateRequest):
+def _llm_keys(req):
+    """Per-request LLM credentials for the gateway; providers left out use the environment."""
+    return {"cerebras": req.cerebras_key} if req.cerebras_key else None
+
+def _apply_request_keys(req):
     # Ensure keys are loaded
     load_dotenv()
-    
-    # Set keys in environment for the session if provided (overrides .env)
-    if req.crawlbase_key: os.environ['CRAWLBASE_API_KEY'] = req.crawlbase_key
-    if req.cerebras_key: os.environ['CEREBRAS_API_KEY'] = req.cerebras_key
-    if req.cartesia_key: os.environ['CARTESIA_API_KEY'] = req.cartesia_key
-
-    # Validate required keys
-    required_keys = ["CRAWLBASE_API_KEY", "CEREBRAS_API_KEY", "CARTESIA_API_KEY"]
-    missing = [k for k in required_keys if not os.environ.get(k)]
+
+    # Keys given with the request override .env but are passed along with it (_llm_keys,
+    # WebScraper(token), get_converter(cartesia_key)), never set in the shared environment
+    required_keys = {"CRAWLBASE_API_KEY": req.crawlbase_key, "CEREBRAS_API_KEY": req.cerebras_key, "CARTESIA_API_KEY": req.cartesia_key}
+    missing = [k for k, given in required_keys.items() if not (given or os.environ.get(k))]
     if missing:
         raise HTTPException(status_code=500, detail=f"Server Configuration Error: Missing API Keys: {', '.join(missing)}. Please check your .env file.")
 
-    try:
-        # Step 1: Content Acquisition
-        content = req.manual_content
-        if not content and not req.manual_script:
-            if not req.url:
-                raise HTTPException(status_code=400, detail="URL is required if manual content/script is not provided.")
-            scraper = WebScraper()
-            content = scraper.scrape(req.url)
-        elif not content:
-            content = "Manual Script / Content Entry"
-
-        # Step 1.5: Guest Persona
-        guest_persona = None
-        if req.guest_url:
-            guest_persona = persona_engine.extract_persona(req.guest_url)
-
-        # Step 2: Scripting / Dialogue Generation
-        if req.manual_script:
-            script = req.manual_script
-            gen_response = {
-                "script": script,
-                "chapters": [{"title": "Introduction", "estimate_seconds": 10}, {"title": "Discussion", "estimate_seconds": 60}],
-                "show_notes": "A custom podcast generated from a manually provided script.",
-                "social_assets": {"linkedin": "Check out our newest episode!", "twitter": "New episode just dropped! 🎙️"},
-                "segments": [{"start_line_index": 0, "sentiment": "LOFI"}]
-            }
-        else:
-            generator = ScriptGenerator()
-            gen_response = generator.generate(content, persona=req.persona, depth=req.depth, improv=req.improv, guest_persona=guest_persona)
-        
-        script = gen_response['script']
-        metadata = {
-            "chapters": gen_response.get('chapters', []),
-            "show_notes": gen_response.get('show_notes', ''),
-            "social_assets": gen_response.get('social_assets', {}),
-            "guest_persona": guest_persona
+def _acquire_content(req: GenerateRequest, on_stage):
+    """Article text, the raw scraped page (None unless scraped) and guest persona for a request."""
+    content, raw_content = _scrape_content(req, on_stage)
+    guest_persona = _guest_persona(req, on_stage)
+    return content, raw_content, guest_persona
+
+def _scrape_content(req: GenerateRequest, on_stage):
+    # Step 1: Content Acquisition
+    content = req.manual_content
+    raw_content = None
+    if not content and not req.manual_script:
+        if not req.url:
+            raise HTTPException(status_code=400, detail="URL is required if manual content/script is not provided.")
+        on_stage("scraping")
+        scraper = WebScraper(req.crawlbase_key)
+        page = scraper.fetch(req.url, force_fresh=req.refresh_content)
+        content, raw_content = page.text, page.html
+    elif not content:
+        content = "Manual Script / Content Entry"
+    return content, raw_content
+
+def _guest_persona(req: GenerateRequest, on_stage):
+    # Step 1.5: Guest Persona
+    if not req.guest_url:
+        return None
+    on_stage("guest_persona")
+    return persona_engine.extract_persona(req.guest_url, keys=_llm_keys(req), force_fresh=req.force_fresh, long_document=req.long_document,
+                                          crawlbase_key=req.crawlbase_key)
+
+def _prepare_episode(req: GenerateRequest, on_stage=None):
+    """Scrape, script and save an episode to history. Returns everything the audio stage needs.
+
+    on_stage(name) is called as each stage starts.
+    """
+    on_stage = on_stage or (lambda stage: None)
+    content, raw_content, guest_persona = _acquire_content(req, on_stage)
+    gen_response = _write_script(req, content, guest_persona, on_stage)
+    return _save_episode(req, content, gen_response, guest_persona, raw_content)
+
+def _write_script(req: GenerateRequest, content, guest_persona, on_stage):
+    # Step 2: Scripting / Dialogue Generation
+    if req.manual_script:
+        return {
+            "script": req.manual_script,
+            "chapters": [{"title": "Introduction", "estimate_seconds": 10}, {"title": "Discussion", "estimate_seconds": 60}],
+            "show_notes": "A custom podcast generated from a manually provided script.",
+            "social_assets": {"linkedin": "Check out our newest episode!", "twitter": "New episode just dropped! 🎙️"},
+            "segments": [{"start_line_index": 0, "sentiment": "LOFI"}]
         }
-        
-        # Save to history (DB)
-        display_url = req.url or "manual_entry"
-        entry_id = history_mgr.save_generation(display_url, content, script, req.persona, req.depth, metadata=metadata)
+    on_stage("scripting")
+    generator = ScriptGenerator(keys=_llm_keys(req))
+    return generator.generate(content, persona=req.persona, depth=req.depth, improv=req.improv, guest_persona=guest_persona, force_fresh=req.force_fresh, long_document=req.long_document)
+
+def _save_episode(req: GenerateRequest, content, gen_response, guest_persona, raw_content=None):
+    """Save a generated script and its metadata to history."""
+    script = gen_response['script']
+    metadata = {
+        "chapters": gen_response.get('chapters', []),
+        "show_notes": gen_response.get('show_notes', ''),
+        "social_assets": gen_response.get('social_assets', {}),
+        "guest_persona": guest_persona
+    }
+    
+    # Save to history (DB)
+    display_url = req.url or "manual_entry"
+    entry_id = history_mgr.save_generation(display_url, content, script, req.persona, req.depth, metadata=metadata, raw_content=raw_content)
+
+    return {
+        "content": content,
+        "script": script,
+        "metadata": metadata,
+        "segments_metadata": gen_response.get('segments', []),
+        "entry_id": entry_id
+    }
+
+def _validate_generate_request(req: GenerateRequest):
+    if req.mix_backend and req.mix_backend not in MIX_BACKENDS:
+        raise HTTPException(status_code=400, detail=f"mix_backend must be one of {', '.join(MIX_BACKENDS)}")
+    if req.insert_ad and (req.ad_position is None or not 0.0 <= req.ad_position <= 1.0):
+        raise HTTPException(status_code=400, detail="ad_position must be between 0.0 and 1.0")
+    _apply_request_keys(req)
+
+def _prefetched_response(req: GenerateRequest):
+    """The response for a Listen Later episode pre-generated exactly as `req` asks, if there is one."""
+    if (not req.url or req.manual_content or req.manual_script or req.guest_url or req.insert_ad
+            or req.user_intro_file or req.improv or req.force_fresh or req.refresh_content or req.long_document):
+        return None
+    entry_id = history_mgr.get_prefetched_episode(req.url, req.persona, req.depth)
+    detail = history_mgr.get_generation_detail(entry_id) if entry_id else None
+    if not detail:
+        return None
+    print(f"⚡ Serving pre-generated episode {entry_id} for {req.url}")
+    return {
+        "status": "success",
+        "script": detail['script'],
+        "content": detail['content'],
+        "audio_url": detail['audio_url'],
+        "url": req.url,
+        "id": detail['id'],
+        "show_notes": detail['show_notes'],
+        "chapters": detail['chapters'],
+        "social_assets": detail['social_assets']
+    }
 
+def _generate(req: GenerateRequest, job=None, background=False):
+    """The whole pipeline for one episode; reports stages and TTS progress to job if given.
+
+    Foreground runs hold the Listen Later prefetcher back while they last, and
+    are answered from its episode when it already made this one.
+    """
+    if background:
+        return _run_pipeline(req, job)
+    prefetched = _prefetched_response(req)
+    if prefetched:
+        return prefetched
+    with foreground_activity:
+        return _run_pipeline(req, job)
+
+def _run_pipeline(req: GenerateRequest, job=None):
+    on_stage = job.set_stage if job else (lambda stage: None)
+    on_progress = print_progress
+    if job:
+        def on_progress(done, total, index, speaker):
+            print_progress(done, total, index, speaker)
+            job.set_progress(done, total, line=index, speaker=speaker)
+
+    audio_options = dict(tts_workers=req.tts_workers, use_tts_cache=req.use_tts_cache, cartesia_key=req.cartesia_key, mix_backend=req.mix_backend, on_stage=on_stage, on_progress=on_progress)
+    if req.stream_script and not req.manual_script:
+        # TTS starts on each line as soon as the LLM has written it; the episode
+        # is saved to history once the whole reply is in
+        content, raw_content, guest_persona = _acquire_content(req, on_stage)
+        on_stage("scripting")
+        generator = ScriptGenerator(keys=_llm_keys(req))
+        streamed = generator.generate_stream(content, persona=req.persona, depth=req.depth, improv=req.improv, guest_persona=guest_persona, force_fresh=req.force_fresh, long_document=req.long_document)
+        audio_url = run_full_audio_flow(streamed, req.insert_ad, req.user_intro_file, None, req.ad_position, req.ad_audio_file, **audio_options)
+        episode = _save_episode(req, content, streamed.response, guest_persona, raw_content)
+    else:
+        episode = _prepare_episode(req, on_stage=on_stage)
         # Step 3 & 4: Audio & Merge
-        segments_metadata = gen_response.get('segments', [])
-        audio_url = await run_full_audio_flow(script, req.insert_ad, req.user_intro_file, segments_metadata, req.ad_position, req.ad_audio_file)
-        
-        # Update DB with audio path
-        history_mgr.update_audio_path(entry_id, audio_url.split('/')[-1])
-        
-        return {
-            "status": "success",
-            "script": script,
-            "content": content,
-            "audio_url": audio_url,
-            "url": req.url,
-            "id": str(entry_id),
-            "show_notes": metadata['show_notes'],
-            "chapters": metadata['chapters'],
-            "social_assets": metadata['social_assets']
-        }
+        audio_url = run_full_audio_flow(episode['script'], req.insert_ad, req.user_intro_file, episode['segments_metadata'], req.ad_position, req.ad_audio_file, **audio_options)
+    return _finish_episode(req, episode, audio_url)
+
+def _finish_episode(req: GenerateRequest, episode, audio_url):
+    """Record a saved episode's audio and build the /api/generate response."""
+    script = episode['script']
+    metadata = episode['metadata']
+    entry_id = episode['entry_id']
+    
+    # Update DB with audio path
+    history_mgr.update_audio_path(entry_id, audio_url.split('/')[-1])
+    
+    return {
+        "status": "success",
+        "script": script,
+        "content": episode['content'],
+        "audio_url": audio_url,
+        "url": req.url,
+        "id": str(entry_id),
+        "show_notes": metadata['show_notes'],
+        "chapters": metadata['chapters'],
+        "social_assets": metadata['social_assets']
+    }
+
+def _prefetch_generate(url):
+    return _generate(GenerateRequest(url=url, tts_workers=PREFETCH_TTS_WORKERS), background=True)
+
+@app.on_event("startup")
+def start_prefetcher():
+    if PREFETCH_ENABLED:
+        prefetcher.start(_prefetch_generate)
+
+@app.post("/api/generate")
+def generate_podcast(req: GenerateRequest):
+    # A plain def, so FastAPI runs it in its threadpool and the event loop stays free
+    _validate_generate_request(req)
+
+    try:
+        return _generate(req)
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error occurred: {str(e)}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/jobs/generate")
+def submit_generate_job(req: GenerateRequest):
+    """Queue an episode on the generation workers and return its job id straight away.
+
+    Follow it at /api/jobs/{id} or as Server-Sent Events at /api/jobs/{id}/events;
+    the finished job's result is what /api/generate would have returned.
+    """
+    _validate_generate_request(req)
+    job = default_job_manager.submit("generate", _generate, req)
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/api/jobs/{job.id}",
+        "events_url": f"/api/jobs/{job.id}/events"
+    }
+
+@app.get("/api/jobs")
+async def list_jobs():
+    return default_job_manager.list()
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = default_job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.snapshot()
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    job = default_job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return StreamingResponse(sse_events(job), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+class BatchGenerateRequest(GenerateRequest):
+    urls: List[str] # Every other field applies to all of them
+
+def _batch_request(batch, item) -> GenerateRequest:
+    return batch.context.model_copy(update={"url": item.url})
+
+def _batch_scrape(batch, item, state):
+    req = _batch_request(batch, item)
+    prefetched = _prefetched_response(req)
+    if prefetched:
+        item.result = prefetched
+        return None
+    content, raw_content = _scrape_content(req, item.set_stage)
+    # One guest for the whole batch, so it is looked up once
+    guest_persona = batch.shared("guest_persona", lambda: _guest_persona(req, item.set_stage))
+    return {"req": req, "content": content, "raw_content": raw_content, "guest_persona": guest_persona}
+
+def _batch_script(batch, item, state):
+    req = state["req"]
+    gen_response = _write_script(req, state["content"], state["guest_persona"], item.set_stage)
+    return {"req": req, "episode": _save_episode(req, state["content"], gen_response, state["guest_persona"], state["raw_content"])}
+
+def _batch_tts(batch, item, state):
+    req, episode = state["req"], state["episode"]
+    workspace = JobWorkspace()
+    output_filename = f"podcast_{workspace.job_id}.mp3"
+    try:
+        mix = synthesize_audio(episode['script'], workspace, workspace.file(output_filename), req.insert_ad, req.user_intro_file, episode['segments_metadata'], req.ad_position, req.ad_audio_file,
+                               tts_workers=req.tts_workers, use_tts_cache=req.use_tts_cache, cartesia_key=req.cartesia_key, mix_backend=req.mix_backend,
+                               on_stage=item.set_stage, on_progress=lambda done, total, index, speaker: item.set_progress(done, total))
+    except BaseException:
+        workspace.cleanup()
+        raise
+    return {**state, "workspace": workspace, "output_filename": output_filename, "mix": mix}
+
+def _batch_mix(batch, item, state):
+    with state["workspace"] as workspace:
+        if state["mix"]:
+            item.set_stage("mixing")
+            state["mix"]()
+        item.set_stage("publishing")
+        workspace.publish(state["output_filename"], history_dir)
+    return _finish_episode(state["req"], state["episode"], f"/history_files/{state['output_filename']}")
+
+# Scraping, scripting, TTS and mixing each run on a worker pool of their own
+# (BATCH_*_WORKERS), so the TTS workers always have scripts waiting
+batches = BatchPipeline([
+    ("scrape", _batch_scrape),
+    ("script", _batch_script),
+    ("tts", _batch_tts),
+    ("mix", _batch_mix),
+])
+
+@app.post("/api/batch/generate")
+def submit_batch(req: BatchGenerateRequest):
+    """Queue episodes for many URLs (e.g. everything from /api/discovery/trending) with shared options.
+
+    Returns the batch id straight away; /api/batch/{id} has each item's status
+    and result and the batch's throughput in episodes per hour.
+    """
+    urls = list(dict.fromkeys(url.strip() for url in req.urls if url and url.strip()))
+    if not urls:
+        raise HTTPException(status_code=400, detail="urls must list at least one URL")
+    if len(urls) > BATCH_MAX_URLS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_URLS} URLs per batch")
+    if req.manual_content or req.manual_script:
+        raise HTTPException(status_code=400, detail="Batches generate from URLs; manual content and scripts are not supported")
+    base = GenerateRequest(**req.model_dump(exclude={"urls", "url"}))
+    _validate_generate_request(base)
+    batch = batches.submit(urls, base)
+    return {
+        "batch_id": batch.id,
+        "total": len(batch.items),
+        "status_url": f"/api/batch/{batch.id}"
+    }
+
+@app.get("/api/batch")
+async def list_batches():
+    return batches.list()
+
+@app.get("/api/batch/stages")
+async def get_batch_stages():
+    return batches.stats()
+
+@app.get("/api/batch/{batch_id}")
+async def get_batch(batch_id: str):
+    batch = batches.get(batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return batch.snapshot()
+
+@app.post("/api/generate/stream")
+def generate_podcast_stream(req: GenerateRequest):
+    """Progressive playback: MP3 bytes start flowing as soon as the first lines are synthesized.
+
+    Scraping and scripting still happen up front; the audio is then synthesized,
+    mixed with the music bed and encoded line by line. The finished file is also
+    saved to history (see the X-Episode-Id / X-Audio-Url headers).
+    """
+    _validate_generate_request(req)
+
+    try:
+        # Foreground work, like _generate: the Listen Later prefetcher waits for it
+        with foreground_activity:
+            episode = _prepare_episode(req)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error occurred: {str(e)}")
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+    converter = get_converter(cartesia_key=req.cartesia_key)
+    segments = compile_script(episode['script'])
+    intro_audio = _load_intro(req.user_intro_file)
+    ad_audio = _load_ad(converter, req.ad_audio_file) if req.insert_ad else None
+
+    script_start_offset = 1 if intro_audio else 0
+    vibe_map = build_vibe_map(episode['segments_metadata'], script_start_offset)
+    ad_idx = None
+    if ad_audio:
+        ad_idx = ad_insert_index(script_start_offset + len(segments), req.ad_position, start=script_start_offset)
+        vibe_map = insert_into_vibe_map(vibe_map, ad_idx)
+
+    entry_id = episode['entry_id']
+    # Named up front for the X-Audio-Url header; the workspace itself is only
+    # created once the response starts, so a client gone before then leaves no directory
+    output_filename = f"podcast_{uuid.uuid4().hex[:12]}.mp3"
+
+    def body():
+        # The saved copy only lands in history/ once the whole episode has streamed;
+        # a dropped connection leaves nothing behind
+        with foreground_activity, JobWorkspace(prefix="stream_") as workspace:
+            synthesizer = ParallelSynthesizer(converter, max_workers=req.tts_workers, use_cache=req.use_tts_cache)
+            lines = synthesizer.iter_audio(segments, workspace.path, on_progress=print_progress)
+            speech = _episode_speech(lines, intro_audio, ad_audio, ad_idx)
+            # Bed windows are slices of the library's pre-tiled loops: nothing is tiled per episode
+            yield from iter_mixed_mp3(speech, default_music_library.beds(), vibe_map, tee_path=workspace.file(output_filename))
+            workspace.publish(output_filename, history_dir)
+            history_mgr.update_audio_path(entry_id, output_filename)
+
+    return StreamingResponse(body(), media_type="audio/mpeg", headers={
+        "X-Episode-Id": str(entry_id),
+        "X-Audio-Url": f"/history_files/{output_filename}"
+    })
+
 @app.post("/api/generate-from-history")
-async def generate_from_history(req: HistoryGenerateRequest):
-    if req.cartesia_key: os.environ['CARTESIA_API_KEY'] = req.cartesia_key
+def generate_from_history(req: HistoryGenerateRequest):
     try:
-        audio_url = await run_full_audio_flow(req.script)
+        audio_url = run_full_audio_flow(req.script, use_tts_cache=req.use_tts_cache, cartesia_key=req.cartesia_key)
         # Note: We can't update the audio path easily here without the ID passed in req
         # But for now we just return the URL
         return {
@@ -449,157 +802,190 @@ async def generate_from_history(req: HistoryGenerateRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-async def run_full_audio_flow(script, insert_ad=False, user_intro_file=None, segments_metadata=None, ad_position=0.5, ad_audio_file=None):
-    converter = TTSConverter()
-    segments = converter._parse_script(script)
-    
-    audio_dir_path = history_dir / "temp_audio"
-    audio_dir_path.mkdir(exist_ok=True)
-    
-    speech_segments = []
-    
-    # Handle user intro
-    if user_intro_file:
-        intro_path = uploads_dir / user_intro_file
-        if intro_path.exists():
-            try:
-                intro_audio = AudioSegment.from_mp3(intro_path)
-                speech_segments.append(intro_audio)
-            except Exception as e:
-                print(f"Failed to load intro: {e}")
-
-    # Generate speech segments
-    for i, (speaker, text) in enumerate(segments):
-        # Note: 'segments' is list of (speaker, text). 
-        # API logic assumed 1-based index for naming, but list is 0-based.
-        # segments_metadata uses 0-based index relative to the SCRIPT lines.
-        # User intro adds an index 0 segment effectively? No, intro is separate.
-        
-        audio_file = audio_dir_path / f"segment_{i:03d}.mp3"
-        converter._generate_and_save_speech(text, speaker, str(audio_file))
+def _episode_speech(lines, intro_audio=None, ad_audio=None, ad_idx=None):
+    """Intro, then the synthesized (index, audio) lines, with the ad spliced in at ad_idx.
+
+    The ad is never dropped: one whose slot is already behind us (or past the
+    end) plays as soon as it can.
+    """
+    emitted = 0
+    ad_pending = ad_idx is not None
+    if intro_audio:
+        yield intro_audio
+        emitted += 1
+    for _, audio in lines:
+        if ad_pending and emitted >= ad_idx:
+            yield ad_audio
+            emitted += 1
+            ad_pending = False
+        yield audio
+        emitted += 1
+    if ad_pending:
+        yield ad_audio
+
+def _wait_for_script(lines, streamed):
+    """Pull synthesized lines until a streamed script is complete; returns an iterator over all of them."""
+    held = []
+    for item in lines:
+        held.append(item)
+        if streamed.done:
+            break
+    return itertools.chain(held, lines)
+
+def _intro_path(user_intro_file):
+    """Path of the user-recorded intro in uploads/, or None."""
+    if not user_intro_file:
+        return None
+    intro_path = uploads_dir / user_intro_file
+    return intro_path if intro_path.exists() else None
+
+def _load_intro(user_intro_file):
+    """User-recorded intro from uploads/, or None."""
+    intro_path = _intro_path(user_intro_file)
+    if intro_path:
+        try:
+            return AudioSegment.from_mp3(intro_path)
+        except Exception as e:
+            print(f"Failed to load intro: {e}")
+    return None
+
+def _ad_path(converter, ad_audio_file=None):
+    """Path of the uploaded ad, or of the default ad (synthesized on first use), or None."""
+    if ad_audio_file:
+        ad_path = uploads_dir / ad_audio_file
+    else:
+        ad_path = ads_dir / "default.mp3"
         
-        if audio_file.exists() and audio_file.stat().st_size > 0:
-            speech_segments.append(AudioSegment.from_mp3(audio_file))
+    if not ad_path.exists() and not ad_audio_file:
+         print("Generating default ad...")
+         # Generated aside and moved in, so a concurrent job never loads half an ad
+         with JobWorkspace(prefix="ad_") as workspace:
+             converter._generate_and_save_speech(DEFAULT_AD_TEXT, "male", str(workspace.file(ad_path.name)))
+             if workspace.file(ad_path.name).exists():
+                 workspace.publish(ad_path.name, ads_dir)
+    return ad_path if ad_path.exists() else None
+
+def _load_ad(converter, ad_audio_file=None):
+    """Uploaded ad, or the default ad (synthesized on first use), or None."""
+    ad_path = _ad_path(converter, ad_audio_file)
+    if ad_path:
+        try:
+            return AudioSegment.from_mp3(ad_path)
+        except Exception as e:
+            print(f"Failed to load ad: {e}")
+    return None
+
+def run_full_audio_flow(script, insert_ad=False, user_intro_file=None, segments_metadata=None, ad_position=0.5, ad_audio_file=None, tts_workers=None, use_tts_cache=True, cartesia_key=None, mix_backend=None, on_stage=None, on_progress=print_progress):
+    """Synthesize and mix a script into history/; returns the episode URL. Blocking.
+
+    `script` may be a StreamedScript, whose lines are synthesized as the LLM
+    writes them; its segments metadata is read once it is complete.
+    """
+    on_stage = on_stage or (lambda stage: None)
+    # Segment files, the work copy of the episode and any ffmpeg lists live in a
+    # workspace of this job's own, removed however the job ends
+    with JobWorkspace() as workspace:
+        output_filename = f"podcast_{workspace.job_id}.mp3"
+        mix = synthesize_audio(script, workspace, workspace.file(output_filename), insert_ad, user_intro_file, segments_metadata, ad_position, ad_audio_file,
+                               tts_workers=tts_workers, use_tts_cache=use_tts_cache, cartesia_key=cartesia_key, mix_backend=mix_backend, on_stage=on_stage, on_progress=on_progress)
+        if mix:
+            on_stage("mixing")
+            mix()
+
+        on_stage("publishing")
+        # Only the finished episode leaves the workspace, in one atomic rename
+        workspace.publish(output_filename, history_dir)
+
+    return f"/history_files/{output_filename}"
+
+def synthesize_audio(script, workspace, output_path, insert_ad=False, user_intro_file=None, segments_metadata=None, ad_position=0.5, ad_audio_file=None, tts_workers=None, use_tts_cache=True, cartesia_key=None, mix_backend=None, on_stage=None, on_progress=print_progress):
+    """The TTS half of run_full_audio_flow: synthesizes every line into `workspace`.
 
-    if not speech_segments:
-        raise Exception("No audio segments generated")
+    Returns mix(), which renders the episode to output_path, so the two halves
+    can run on different workers. The "stream" backend mixes as it synthesizes;
+    it has written output_path already and returns None.
+    """
+    on_stage = on_stage or (lambda stage: None)
+    converter = get_converter(cartesia_key=cartesia_key)
+    streamed = script if isinstance(script, StreamedScript) else None
+    segments = streamed.segments() if streamed else compile_script(script)
 
     # Map segment index to vibe
-    # segments_metadata indices refer to the *script* lines. 
-    # If user intro was added at index 0 of speech_segments, 
-    # the script segments start at index 1 (if intro exists).
-    
     script_start_offset = 1 if user_intro_file else 0
-    vibe_map = { (m['start_line_index'] + script_start_offset): m['sentiment'] for m in (segments_metadata or []) }
-    
-    # Pre-load music loops
-    music_loops = {}
-    music_dir = BASE_DIR / "music"
-    for vibe in ["lofi", "tense", "excited", "corporate"]:
-        p = music_dir / f"{vibe}.mp3"
-        if p.exists():
-            music_loops[vibe.upper()] = AudioSegment.from_mp3(p)
-
-    # Insert Ad Logic
-    if insert_ad:
-        # Calculate insert index based on ad_position (0.0 to 1.0)
-        # We ensure it's within bounds of the generated segments
-        insert_idx = int(len(speech_segments) * ad_position)
-        insert_idx = max(0, min(len(speech_segments), insert_idx))
-        
-        if ad_audio_file:
-            ad_path = images_dir.parent / "uploads" / ad_audio_file
-        else:
-            ad_path = ads_dir / "default.mp3"
-            
-        if not ad_path.exists() and not ad_audio_file:
-             print("Generating default ad...")
-             converter._generate_and_save_speech("Stay tuned! We'll be right back after this short break.", "male", str(ad_path))
-        
-        if ad_path.exists():
-            try:
-                ad_audio = AudioSegment.from_mp3(ad_path)
-                speech_segments.insert(insert_idx, ad_audio)
-                
-                # Shift vibe map keys
-                new_vibe_map = {}
-                for k, v in vibe_map.items():
-                    if k >= insert_idx:
-                        new_vibe_map[k + 1] = v
-                    else:
-                        new_vibe_map[k] = v
-                new_vibe_map[insert_idx] = "CORPORATE"
-                vibe_map = new_vibe_map
-            except Exception as e:
-                print(f"Ad audio error: {e}")
-                print(f"Failed to load ad: {e}")
-
-    # Build BG Track Grouping
-    grouped_segments = []
-    current_vibe = "LOFI"
-    current_group_duration = 0
-    
-    for i, seg in enumerate(speech_segments):
-        if i in vibe_map:
-             if current_group_duration > 0:
-                 grouped_segments.append({"vibe": current_vibe, "duration": current_group_duration})
-             current_vibe = vibe_map[i]
-             current_group_duration = 0
-        current_group_duration += len(seg)
-    
-    # Last group
-    if current_group_duration > 0:
-        grouped_segments.append({"vibe": current_vibe, "duration": current_group_duration})
-
-    # Construct Mix
-    full_speech = AudioSegment.empty()
-    for seg in speech_segments:
-        full_speech += seg
-        
-    full_bg = AudioSegment.empty()
-    
-    for group in grouped_segments:
-        vibe = group['vibe']
-        duration = group['duration']
-        loop = music_loops.get(vibe, music_loops.get("LOFI"))
-        
-        if not loop:
-             # Silence if no loop found
-             chunk = AudioSegment.silent(duration=duration)
-        else:
-            chunk = AudioSegment.empty()
-            target_len = duration + 2000 # Buffer
-            while len(chunk) < target_len:
-                chunk += loop
-            chunk = chunk[:duration] 
-        
-        if len(full_bg) > 0:
-             # Crossfade
-             full_bg = full_bg.append(chunk, crossfade=500)
-        else:
-             full_bg += chunk
-
-    # Ducking
-    full_bg = full_bg.apply_gain(-15)
-    
-    # Sync lengths
-    if len(full_bg) < len(full_speech):
-        full_speech = full_speech[:len(full_bg)]
+
+    def episode_vibe_map():
+        # A streamed script only has its segments metadata once the LLM is done
+        metadata = streamed.response.get('segments', []) if streamed else segments_metadata
+        return build_vibe_map(metadata, script_start_offset)
+
+    # Generate speech segments through the worker pool; results come back in script order
+    # Note: 'segments' is a tuple of ScriptSegments (see script_compiler), or a generator of them for a streamed script.
+    # Segments come back as decoded PCM; only the final mix is encoded to MP3.
+    synthesizer = ParallelSynthesizer(converter, max_workers=tts_workers, use_cache=use_tts_cache)
+    backend = mix_backend or DEFAULT_MIX_BACKEND
+
+    on_stage("synthesizing")
+    if backend == "ffmpeg":
+        # One ffmpeg process reads the segment files, intro, ad and loops itself
+        intro_path = _intro_path(user_intro_file)
+        speech_files = [intro_path] if intro_path else []
+        for i, audio_file in synthesizer.iter_synthesize(segments, workspace.path, on_progress=on_progress):
+            if audio_file.exists() and audio_file.stat().st_size > 0:
+                speech_files.append(audio_file)
+        vibe_map = episode_vibe_map()
+
+        if not speech_files:
+            raise Exception("No audio segments generated")
+
+        if insert_ad:
+            insert_idx = ad_insert_index(len(speech_files), ad_position, start=1 if intro_path else 0)
+            ad_path = _ad_path(converter, ad_audio_file)
+            if ad_path:
+                speech_files.insert(insert_idx, ad_path)
+                vibe_map = insert_into_vibe_map(vibe_map, insert_idx)
+
+        return lambda: render_filtergraph(speech_files, default_music_library.files(), vibe_map, output_path, work_dir=workspace.path)
+    elif backend == "stream":
+        intro_audio = _load_intro(user_intro_file)
+        # Lines are mixed and encoded as they arrive, so memory stays flat
+        # however long the episode is; the ad slot is planned from the script.
+        # There is no separate "mixing" stage: it happens alongside synthesis.
+        lines = synthesizer.iter_audio(segments, workspace.path, on_progress=on_progress)
+        if streamed:
+            # The bed and the ad slot need the whole script, so the first lines
+            # wait (already synthesized) until the LLM has finished
+            lines = _wait_for_script(lines, streamed)
+        vibe_map = episode_vibe_map()
+        ad_audio = _load_ad(converter, ad_audio_file) if insert_ad else None
+        ad_idx = None
+        if ad_audio:
+            segment_count = streamed.segment_count if streamed else len(segments)
+            ad_idx = ad_insert_index(script_start_offset + segment_count, ad_position, start=script_start_offset)
+            vibe_map = insert_into_vibe_map(vibe_map, ad_idx)
+        speech = _episode_speech(lines, intro_audio, ad_audio, ad_idx)
+        if not render_stream(speech, default_music_library.beds(), vibe_map, output_path):
+            raise Exception("No audio segments generated")
+        return None
     else:
-        full_bg = full_bg[:len(full_speech)]
-        
-    final_mix = full_speech.overlay(full_bg)
-    
-    output_filename = f"podcast_{tempfile.mktemp().split('/')[-1]}.mp3"
-    output_path = history_dir / output_filename
-    final_mix.export(output_path, format="mp3")
-    
-    # Cleanup
-    for f in audio_dir_path.glob("segment_*.mp3"):
-        try: os.remove(f)
-        except: pass
-        
-    return f"/history_files/{output_filename}"
+        intro_audio = _load_intro(user_intro_file)
+        speech_segments = [intro_audio] if intro_audio else []
+        for i, audio in synthesizer.iter_audio(segments, workspace.path, on_progress=on_progress):
+            speech_segments.append(audio)
+        vibe_map = episode_vibe_map()
+
+        if not speech_segments:
+            raise Exception("No audio segments generated")
+
+        # Insert Ad Logic
+        if insert_ad:
+            # Calculate insert index based on ad_position (0.0 to 1.0)
+            insert_idx = ad_insert_index(len(speech_segments), ad_position, start=1 if intro_audio else 0)
+            ad_audio = _load_ad(converter, ad_audio_file)
+            if ad_audio:
+                speech_segments.insert(insert_idx, ad_audio)
+                vibe_map = insert_into_vibe_map(vibe_map, insert_idx)
+
+        return lambda: render_episode(speech_segments, default_music_library, vibe_map, output_path, backend=mix_backend)
 
 if __name__ == "__main__":
     import uvicorn
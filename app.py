@@ -6,7 +6,8 @@ from pydub import AudioSegment
 
 from scraper import WebScraper
 from script_generator import ScriptGenerator
-from tts_converter import TTSConverter
+from tts_converter import get_converter
+from script_compiler import compile_script
 from history_manager import HistoryManager
 
 history_mgr = HistoryManager()
@@ -209,10 +210,10 @@ if generate_btn or "use_script_from_history" in st.session_state:
         # Step 3: Audio Generation
         with st.status("🎙️ Converting script to audio...", expanded=True) as status:
             try:
-                converter = TTSConverter()
+                converter = get_converter(cartesia_key=cartesia_key)
                 
                 # Parse script to get segment count
-                segments = converter._parse_script(script)
+                segments = compile_script(script)
                 total_segments = len(segments)
                 
                 st.info(f"Generating {total_segments} audio segments...")
@@ -228,12 +229,12 @@ if generate_btn or "use_script_from_history" in st.session_state:
                 audio_dir.mkdir(exist_ok=True)
                 audio_files = []
                 
-                for i, (speaker, text) in enumerate(segments, 1):
+                for i, segment in enumerate(segments, 1):
+                    speaker = segment.speaker
                     progress_text.text(f"Processing segment {i}/{total_segments} ...")
-                    voice = converter.voices.get(speaker, converter.voices["male"])
                     audio_file = str(audio_dir / f"segment_{i:03d}.mp3")
                     
-                    converter._generate_and_save_speech(text, speaker, audio_file)
+                    converter.synthesize_segment(segment, audio_file)
                     
                     # Verify file exists before adding to list
                     if os.path.exists(audio_file) and os.path.getsize(audio_file) > 0:
@@ -0,0 +1,270 @@
+import os
+import numpy as np
+from pydub import AudioSegment
+
+from episode_plan import DEFAULT_VIBE, group_by_vibe, vibe_at
+from episode_stream import (
+    STREAM_FRAME_RATE, STREAM_CHANNELS, STREAM_SAMPLE_WIDTH, BED_GAIN_DB, CROSSFADE_MS,
+    Mp3PipeEncoder, normalize
+)
+
+# "numpy" renders into one preallocated sample buffer; "stream" mixes and encodes
+# window by window in flat memory; "ffmpeg" hands the segment files to a single
+# filtergraph (see filtergraph_render); "pydub" is the original AudioSegment
+# concatenation (quadratic in episode length, kept for comparison)
+MIX_BACKENDS = ("numpy", "stream", "ffmpeg", "pydub")
+DEFAULT_MIX_BACKEND = os.getenv("MIX_BACKEND", "numpy")
+
+# Frames mixed per step, bounds the float temporaries to a few MB
+MIX_BLOCK_FRAMES = STREAM_FRAME_RATE * 10
+
+
+def to_samples(audio: AudioSegment) -> np.ndarray:
+    """(frames, channels) int16 view of an AudioSegment in the mix format."""
+    return np.frombuffer(normalize(audio).raw_data, dtype=np.int16).reshape(-1, STREAM_CHANNELS)
+
+
+def to_audio_segment(samples: np.ndarray) -> AudioSegment:
+    return AudioSegment(samples.tobytes(), frame_rate=STREAM_FRAME_RATE,
+                        sample_width=STREAM_SAMPLE_WIDTH, channels=STREAM_CHANNELS)
+
+
+def _frames(ms) -> int:
+    return int(round(ms * STREAM_FRAME_RATE / 1000))
+
+
+class TiledLoop:
+    """A decoded loop repeated out to `span` extra frames, so any window of up
+    to `span` frames starting anywhere in the loop is one contiguous slice."""
+
+    __slots__ = ("frames", "span", "tiled")
+
+    def __init__(self, samples: np.ndarray, span=MIX_BLOCK_FRAMES):
+        self.frames = len(samples)
+        self.span = span
+        reps = 1 + -(-span // self.frames)
+        self.tiled = np.tile(samples, (reps, 1))
+
+    def __len__(self):
+        return self.frames
+
+    def window(self, offset, length) -> np.ndarray:
+        """`length` (<= span) frames of the loop starting `offset` frames in."""
+        pos = offset % self.frames
+        return self.tiled[pos:pos + length]
+
+
+class NumpyMixer:
+    """Lays the music bed under int16 speech buffers, in place.
+
+    A new vibe starts its loop from the top while the old loop fades out
+    linearly over crossfade_ms, and a repeated vibe carries on where it was. The bed state
+    lives on the mixer, so the episode can be fed in as one buffer or as any
+    sequence of windows and comes out the same.
+    """
+
+    def __init__(self, music_loops, gain_db=BED_GAIN_DB, crossfade_ms=CROSSFADE_MS):
+        # Loops are AudioSegments or TiledLoops already decoded by music_library
+        self.loops = {
+            vibe: loop if isinstance(loop, TiledLoop) else TiledLoop(to_samples(loop))
+            for vibe, loop in music_loops.items() if len(loop) > 0
+        }
+        self.gain = np.float32(10 ** (gain_db / 20))
+        self.crossfade = _frames(crossfade_ms)
+        self.vibe = None
+        self.offset = 0      # frames into the current loop
+        self._tail = None    # (old loop, its offset at the switch) while a crossfade runs
+        self._fade_pos = 0   # crossfade frames already rendered
+
+    def _loop_for(self, vibe):
+        return self.loops.get(vibe, self.loops.get(DEFAULT_VIBE))
+
+    def lay_bed(self, out: np.ndarray, vibe):
+        """Mix the next len(out) frames of the bed for `vibe` into `out`."""
+        loop = self._loop_for(vibe)
+        if loop is None:
+            # Silence if no loop found
+            self.vibe = vibe
+            return
+        if vibe != self.vibe:
+            old_loop = self._loop_for(self.vibe) if self.vibe is not None else None
+            crossfade = old_loop is not None and old_loop is not loop and self.crossfade > 0
+            self._tail = (old_loop, self.offset) if crossfade else None
+            self._fade_pos = 0
+            self.vibe = vibe
+            self.offset = 0
+
+        pos = 0
+        while pos < len(out):
+            # The crossfade gets a block of its own, the rest goes in MIX_BLOCK_FRAMES steps
+            fading = self._tail is not None
+            step = self.crossfade - self._fade_pos if fading else MIX_BLOCK_FRAMES
+            end = min(len(out), pos + step)
+            bed = loop.window(self.offset, end - pos).astype(np.float32)
+            if fading:
+                tail_loop, tail_offset = self._tail
+                ramp = np.arange(self._fade_pos, self._fade_pos + end - pos, dtype=np.float32)[:, None]
+                ramp /= self.crossfade
+                bed *= ramp
+                bed += tail_loop.window(tail_offset + self._fade_pos, end - pos) * (1.0 - ramp)
+                self._fade_pos += end - pos
+                if self._fade_pos >= self.crossfade:
+                    self._tail = None
+            bed *= self.gain
+            block = out[pos:end]
+            bed += block
+            np.clip(bed, -32768, 32767, out=bed)
+            block[:] = bed
+            self.offset += end - pos
+            pos = end
+
+    def mix(self, speech_segments, vibe_map) -> np.ndarray:
+        """Concatenate the speech segments into one buffer and lay the bed under them."""
+        # Upper bound on the resampled length, so segments are converted one at a
+        # time straight into the buffer instead of all being held twice
+        capacity = sum(int(seg.frame_count() * STREAM_FRAME_RATE / seg.frame_rate) + 2 for seg in speech_segments)
+        out = np.empty((capacity, STREAM_CHANNELS), dtype=np.int16)
+        lengths = []
+        pos = 0
+        for seg in speech_segments:
+            samples = to_samples(seg)
+            out[pos:pos + len(samples)] = samples
+            pos += len(samples)
+            lengths.append(len(samples))
+        out = out[:pos]
+
+        start = 0
+        for group in group_by_vibe(lengths, vibe_map):
+            self.lay_bed(out[start:start + group['duration']], group['vibe'])
+            start += group['duration']
+        return out
+
+
+def mix_numpy(speech_segments, music_loops, vibe_map) -> np.ndarray:
+    return NumpyMixer(music_loops).mix(speech_segments, vibe_map)
+
+
+def write_mp3(samples: np.ndarray, output_path, block_frames=MIX_BLOCK_FRAMES):
+    """Encode a (frames, channels) int16 buffer to MP3 without another full copy."""
+    encoder = Mp3PipeEncoder()
+    finished = False
+    try:
+        with open(output_path, "wb") as f:
+            for pos in range(0, len(samples), block_frames):
+                encoder.write(samples[pos:pos + block_frames].tobytes())
+                for chunk in encoder.ready_chunks():
+                    f.write(chunk)
+            for chunk in encoder.finish():
+                f.write(chunk)
+        finished = True
+    finally:
+        if not finished:
+            encoder.abort()
+
+
+def iter_mixed_mp3(speech_segments, music_loops, vibe_map, window_frames=MIX_BLOCK_FRAMES, tee_path=None):
+    """Mix an iterable of speech AudioSegments with the bed and yield MP3 bytes.
+
+    Each segment is mixed in windows of window_frames and piped into one
+    ffmpeg encoder, so memory stays at about one segment whatever the
+    episode length. If tee_path is given, the same MP3 stream is also
+    written there.
+    """
+    mixer = NumpyMixer(music_loops)
+    encoder = Mp3PipeEncoder()
+    tee = open(tee_path, "wb") if tee_path else None
+    vibe = DEFAULT_VIBE
+    finished = False
+    try:
+        for i, segment in enumerate(speech_segments):
+            vibe = vibe_at(i, vibe_map, vibe)
+            samples = to_samples(segment)
+            for pos in range(0, len(samples), window_frames):
+                window = samples[pos:pos + window_frames].copy()
+                mixer.lay_bed(window, vibe)
+                encoder.write(window.tobytes())
+                for chunk in encoder.ready_chunks():
+                    if tee: tee.write(chunk)
+                    yield chunk
+        for chunk in encoder.finish():
+            if tee: tee.write(chunk)
+            yield chunk
+        finished = True
+    finally:
+        if not finished:
+            encoder.abort()
+        if tee:
+            tee.close()
+
+
+def render_stream(speech_segments, music_loops, vibe_map, output_path) -> int:
+    """Write the episode MP3 while the segments arrive; returns the segment count."""
+    count = 0
+
+    def counted():
+        nonlocal count
+        for segment in speech_segments:
+            count += 1
+            yield segment
+
+    with open(output_path, "wb") as f:
+        for chunk in iter_mixed_mp3(counted(), music_loops, vibe_map):
+            f.write(chunk)
+    return count
+
+
+def mix_pydub(speech_segments, music_loops, vibe_map) -> AudioSegment:
+    """The original AudioSegment mix: every += / append copies the whole episode so far."""
+    grouped_segments = group_by_vibe([len(seg) for seg in speech_segments], vibe_map)
+
+    # Construct Mix
+    full_speech = AudioSegment.empty()
+    for seg in speech_segments:
+        full_speech += seg
+
+    full_bg = AudioSegment.empty()
+
+    for group in grouped_segments:
+        vibe = group['vibe']
+        duration = group['duration']
+        loop = music_loops.get(vibe, music_loops.get(DEFAULT_VIBE))
+
+        if not loop:
+            # Silence if no loop found
+            chunk = AudioSegment.silent(duration=duration)
+        else:
+            chunk = AudioSegment.empty()
+            target_len = duration + 2000 # Buffer
+            while len(chunk) < target_len:
+                chunk += loop
+            chunk = chunk[:duration]
+
+        if len(full_bg) > 0:
+            # Crossfade
+            full_bg = full_bg.append(chunk, crossfade=CROSSFADE_MS)
+        else:
+            full_bg += chunk
+
+    # Ducking
+    full_bg = full_bg.apply_gain(BED_GAIN_DB)
+
+    # Sync lengths
+    if len(full_bg) < len(full_speech):
+        full_speech = full_speech[:len(full_bg)]
+    else:
+        full_bg = full_bg[:len(full_speech)]
+
+    return full_speech.overlay(full_bg)
+
+
+def render_episode(speech_segments, music_library, vibe_map, output_path, backend=None):
+    """Mix speech over the music beds of a MusicLibrary and write the episode MP3 to output_path."""
+    backend = backend or DEFAULT_MIX_BACKEND
+    if backend == "numpy":
+        write_mp3(mix_numpy(speech_segments, music_library.beds(), vibe_map), output_path)
+    elif backend == "stream":
+        render_stream(speech_segments, music_library.beds(), vibe_map, output_path)
+    elif backend == "pydub":
+        mix_pydub(speech_segments, music_library.loops(), vibe_map).export(output_path, format="mp3")
+    else:
+        raise ValueError(f"Unknown mix backend: {backend}")
@@ -0,0 +1,241 @@
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from job_manager import JOB_TTL_SECONDS, FINISHED
+from prefetcher import foreground_activity
+
+# Workers per stage, shared by every batch. Scraping and scripting mostly wait on
+# the network, each TTS worker runs an episode's own pool of TTS_WORKERS lines,
+# and mixing is CPU-bound.
+DEFAULT_STAGE_WORKERS = {
+    "scrape": int(os.getenv("BATCH_SCRAPE_WORKERS", 4)),
+    "script": int(os.getenv("BATCH_SCRIPT_WORKERS", 4)),
+    "tts": int(os.getenv("BATCH_TTS_WORKERS", 2)),
+    "mix": int(os.getenv("BATCH_MIX_WORKERS", 1)),
+}
+# Most URLs accepted in one batch
+BATCH_MAX_URLS = int(os.getenv("BATCH_MAX_URLS", 100))
+
+
+class BatchItem:
+    """One URL of a batch. Stage functions report through set_stage / set_progress, as on a Job."""
+
+    def __init__(self, index, url):
+        self.index = index
+        self.url = url
+        self.status = "queued"  # queued (for `stage`), running, done, failed
+        self.stage = None       # pipeline stage it is queued for or running in
+        self.step = None        # finer step within it (scraping, guest_persona, synthesizing...)
+        self.progress = None
+        self.result = None
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self.stage_seconds = {}
+
+    def set_stage(self, step):
+        self.step = step
+        self.progress = None
+
+    def set_progress(self, done, total=None, **info):
+        self.progress = {"done": done, "total": total}
+
+    def snapshot(self) -> dict:
+        return {
+            "index": self.index,
+            "url": self.url,
+            "status": self.status,
+            "stage": self.stage,
+            "step": self.step,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+            "stage_seconds": self.stage_seconds,
+            "seconds": round(self.finished_at - self.started_at, 2) if self.finished_at and self.started_at else None
+        }
+
+
+class Batch:
+    """Episodes for a list of URLs, generated with shared options (`context`)."""
+
+    def __init__(self, urls, context=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.items = [BatchItem(i, url) for i, url in enumerate(urls)]
+        self.context = context
+        self.created_at = time.time()
+        self.finished_at = None
+        self._lock = threading.Lock()
+        self._shared_lock = threading.Lock()
+        self._shared = {}
+
+    @property
+    def finished(self) -> bool:
+        return all(item.status in FINISHED for item in self.items)
+
+    def shared(self, name, fn):
+        """fn() computed once for the whole batch (e.g. the guest persona); items wait for the first."""
+        with self._shared_lock:
+            if name not in self._shared:
+                self._shared[name] = fn()
+            return self._shared[name]
+
+    def snapshot(self, items=True) -> dict:
+        counts = {status: 0 for status in ("queued", "running", "done", "failed")}
+        for item in self.items:
+            counts[item.status] += 1
+        elapsed = (self.finished_at or time.time()) - self.created_at
+        snapshot = {
+            "id": self.id,
+            "status": "done" if self.finished else "running",
+            "total": len(self.items),
+            "counts": counts,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "elapsed_seconds": round(elapsed, 2),
+            "episodes_per_hour": round(counts["done"] * 3600 / elapsed, 1) if elapsed > 0 else 0.0
+        }
+        if items:
+            snapshot["items"] = [item.snapshot() for item in self.items]
+        return snapshot
+
+
+class BatchPipeline:
+    """Generates batches of episodes through a chain of stages, each on a worker
+    pool of its own.
+
+    An item moves to the next stage's queue as soon as it leaves a stage, so
+    the stages work on different items side by side: while one episode is
+    being mixed, the TTS workers are already on the next, whose script was
+    written while the one before it was synthesized. Each stage's limit holds
+    across all batches.
+
+    `stages` is a list of (name, fn); fn(batch, item, state) returns the state
+    for the next stage (the first one gets None) and the last stage returns
+    the item's result. A stage may finish an item early by setting item.result.
+    """
+
+    def __init__(self, stages, workers=None, ttl=JOB_TTL_SECONDS):
+        self.stages = list(stages)
+        workers = {**DEFAULT_STAGE_WORKERS, **(workers or {})}
+        self.workers = {name: max(1, workers.get(name, 1)) for name, _ in self.stages}
+        self._pools = {name: ThreadPoolExecutor(max_workers=self.workers[name], thread_name_prefix=f"batch-{name}")
+                       for name, _ in self.stages}
+        self.ttl = ttl
+        self._batches = {}
+        self._lock = threading.Lock()
+        self._stage_stats = {name: {"queued": 0, "active": 0, "completed": 0, "failed": 0, "busy_seconds": 0.0}
+                             for name, _ in self.stages}
+
+    def submit(self, urls, context=None) -> Batch:
+        batch = Batch(urls, context)
+        with self._lock:
+            self._prune()
+            self._batches[batch.id] = batch
+        print(f"📦 Batch {batch.id}: {len(batch.items)} episodes queued")
+        for item in batch.items:
+            self._enqueue(batch, item, 0, None)
+        return batch
+
+    def _enqueue(self, batch, item, index, state):
+        name = self.stages[index][0]
+        item.stage = name
+        item.status = "queued"
+        with self._lock:
+            self._stage_stats[name]["queued"] += 1
+        self._pools[name].submit(self._run, batch, item, index, state)
+
+    def _run(self, batch, item, index, state):
+        name, fn = self.stages[index]
+        stats = self._stage_stats[name]
+        with self._lock:
+            stats["queued"] -= 1
+            stats["active"] += 1
+        item.status = "running"
+        item.started_at = item.started_at or time.time()
+        started = time.perf_counter()
+        try:
+            # Batches are foreground work: the Listen Later prefetcher waits for them
+            with foreground_activity:
+                state = fn(batch, item, state)
+        except Exception as e:
+            item.error = getattr(e, "detail", None) or str(e)
+            print(f"❌ Batch {batch.id} item {item.index} failed in {name}: {item.error}")
+            traceback.print_exc()
+            self._finish(batch, item, name, started, "failed")
+            return
+
+        if item.result is None and index + 1 < len(self.stages):
+            self._account(name, started, item, "completed")
+            self._enqueue(batch, item, index + 1, state)
+        else:
+            if item.result is None:
+                item.result = state
+            self._finish(batch, item, name, started, "done")
+
+    def _account(self, name, started, item, outcome):
+        seconds = time.perf_counter() - started
+        item.stage_seconds[name] = round(seconds, 2)
+        with self._lock:
+            stats = self._stage_stats[name]
+            stats["active"] -= 1
+            stats[outcome] += 1
+            stats["busy_seconds"] += seconds
+
+    def _finish(self, batch, item, name, started, status):
+        self._account(name, started, item, "completed" if status == "done" else "failed")
+        item.finished_at = time.time()
+        if status == "done":
+            # A failed item keeps the stage it failed in
+            item.stage = None
+        item.step = None
+        item.status = status
+        with batch._lock:
+            done = batch.finished and batch.finished_at is None
+            if done:
+                batch.finished_at = time.time()
+        if done:
+            summary = batch.snapshot(items=False)
+            print(f"📦 Batch {batch.id} finished: {summary['counts']['done']}/{summary['total']} episodes in "
+                  f"{summary['elapsed_seconds']:.0f}s ({summary['episodes_per_hour']} episodes/hour)")
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        for batch_id in [b.id for b in self._batches.values() if b.finished_at and b.finished_at < cutoff]:
+            del self._batches[batch_id]
+
+    def get(self, batch_id):
+        with self._lock:
+            return self._batches.get(batch_id)
+
+    def list(self) -> list:
+        with self._lock:
+            batches = list(self._batches.values())
+        return [batch.snapshot(items=False) for batch in batches]
+
+    def stats(self) -> dict:
+        """Per-stage load, and the episodes per hour each stage could sustain at its
+        average time per item; the slowest one bounds the pipeline."""
+        stages = {}
+        with self._lock:
+            for name, _ in self.stages:
+                stats = self._stage_stats[name]
+                runs = stats["completed"] + stats["failed"]
+                average = stats["busy_seconds"] / runs if runs else None
+                stages[name] = {
+                    "workers": self.workers[name],
+                    "queued": stats["queued"],
+                    "active": stats["active"],
+                    "completed": stats["completed"],
+                    "failed": stats["failed"],
+                    "avg_seconds": round(average, 2) if average else None,
+                    "capacity_per_hour": round(self.workers[name] * 3600 / average, 1) if average else None
+                }
+        measured = {name: s["capacity_per_hour"] for name, s in stages.items() if s["capacity_per_hour"]}
+        return {
+            "stages": stages,
+            "bottleneck": min(measured, key=measured.get) if measured else None
+        }
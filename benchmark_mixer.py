@@ -0,0 +1,136 @@
+"""Render time and peak memory of the episode mixers on synthetic episodes.
+
+    python benchmark_mixer.py                      # numpy/stream/ffmpeg at 5/30/90 min, pydub at 5/30 min
+    python benchmark_mixer.py --minutes 5 --backends pydub,ffmpeg --encode
+
+Speech is a set of ~8 s tones, the bed three short loops, with a vibe change
+every ten lines. Peak memory is what tracemalloc sees during the mix (NumPy
+and pydub buffers are both tracked), not counting the input segments. The
+"stream" backend encodes as it mixes, so its time always includes the MP3
+encode; it is fed a generator, so its inputs are never all in memory either.
+"ffmpeg" gets the same lines and loops as WAV files and renders straight to
+MP3 in one process; its time includes the encode and its memory is outside
+Python, so no peak is shown.
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+from pydub.generators import Sine, Square, WhiteNoise
+
+from audio_mixer import mix_numpy, mix_pydub, render_stream, write_mp3
+from filtergraph_render import render_filtergraph
+from episode_plan import VIBES
+
+
+def build_episode(minutes, seed=0):
+    rng = random.Random(seed)
+    # A small pool of distinct lines, reused, so inputs cost little memory
+    pool = [
+        Sine(180 + 40 * i).to_audio_segment(duration=6000 + 500 * i).apply_gain(-6)
+        .set_channels(2).set_frame_rate(44100)
+        for i in range(8)
+    ]
+    speech, total = [], 0
+    while total < minutes * 60 * 1000:
+        seg = rng.choice(pool)
+        speech.append(seg)
+        total += len(seg)
+    loops = {
+        "LOFI": Sine(110).to_audio_segment(duration=30000).apply_gain(-3),
+        "TENSE": Square(90).to_audio_segment(duration=20000).apply_gain(-12),
+        "EXCITED": WhiteNoise().to_audio_segment(duration=15000).apply_gain(-20),
+    }
+    vibe_map = {i: rng.choice(VIBES) for i in range(0, len(speech), 10)}
+    return speech, loops, vibe_map
+
+
+def run_ffmpeg(speech, loops, vibe_map):
+    # Same audio on disk: each distinct line / loop written once as WAV
+    work_dir = tempfile.mkdtemp(prefix="bench_")
+    paths = {}
+    for seg in speech:
+        if id(seg) not in paths:
+            paths[id(seg)] = os.path.join(work_dir, f"line_{len(paths)}.wav")
+            seg.export(paths[id(seg)], format="wav")
+    music_files = {}
+    for vibe, loop in loops.items():
+        music_files[vibe] = os.path.join(work_dir, f"{vibe.lower()}.wav")
+        loop.export(music_files[vibe], format="wav")
+    output_path = os.path.join(work_dir, "episode.mp3")
+    started = time.perf_counter()
+    render_filtergraph([paths[id(seg)] for seg in speech], music_files, vibe_map, output_path)
+    seconds = time.perf_counter() - started
+    shutil.rmtree(work_dir)
+    return seconds, None, None
+
+
+def run_stream(speech, loops, vibe_map):
+    fd, path = tempfile.mkstemp(suffix=".mp3")
+    os.close(fd)
+    tracemalloc.start()
+    started = time.perf_counter()
+    render_stream(iter(speech), loops, vibe_map, path)
+    seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    os.remove(path)
+    return seconds, peak, None
+
+
+def run(backend, speech, loops, vibe_map, encode):
+    if backend == "stream":
+        return run_stream(speech, loops, vibe_map)
+    if backend == "ffmpeg":
+        return run_ffmpeg(speech, loops, vibe_map)
+    tracemalloc.start()
+    started = time.perf_counter()
+    if backend == "numpy":
+        mixed = mix_numpy(speech, loops, vibe_map)
+    else:
+        mixed = mix_pydub(speech, loops, vibe_map)
+    mix_seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    encode_seconds = None
+    if encode:
+        fd, path = tempfile.mkstemp(suffix=".mp3")
+        os.close(fd)
+        started = time.perf_counter()
+        if backend == "numpy":
+            write_mp3(mixed, path)
+        else:
+            mixed.export(path, format="mp3")
+        encode_seconds = time.perf_counter() - started
+        os.remove(path)
+    return mix_seconds, peak, encode_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", default="5,30,90")
+    parser.add_argument("--backends", default="numpy,stream,ffmpeg,pydub")
+    parser.add_argument("--pydub-max-minutes", type=float, default=30,
+                        help="skip the quadratic pydub mixer on longer episodes")
+    parser.add_argument("--encode", action="store_true", help="also time the final MP3 encode")
+    args = parser.parse_args()
+
+    print(f"{'minutes':>7} {'backend':>7} {'mix s':>8} {'peak MB':>9} {'encode s':>9}")
+    for minutes in [float(m) for m in args.minutes.split(",")]:
+        speech, loops, vibe_map = build_episode(minutes)
+        for backend in args.backends.split(","):
+            if backend == "pydub" and minutes > args.pydub_max_minutes:
+                print(f"{minutes:>7g} {backend:>7} {'skipped':>8}")
+                continue
+            mix_seconds, peak, encode_seconds = run(backend, speech, loops, vibe_map, args.encode)
+            encode = f"{encode_seconds:9.2f}" if encode_seconds is not None else f"{'-':>9}"
+            peak = f"{peak / 2**20:9.1f}" if peak is not None else f"{'-':>9}"
+            print(f"{minutes:>7g} {backend:>7} {mix_seconds:8.2f} {peak} {encode}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+import re
+from html.parser import HTMLParser
+
+# Never text: dropped with everything inside them
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "iframe", "canvas", "form",
+             "button", "select", "object", "video", "audio", "map", "dialog"}
+# Page chrome: dropped unless they sit inside the article itself
+CHROME_TAGS = {"nav", "aside", "header", "footer", "menu"}
+# Where the article body lives, when the page says so
+ARTICLE_TAGS = {"article", "main"}
+# Never dropped, whatever their classes say
+ROOT_TAGS = {"html", "body"} | ARTICLE_TAGS
+
+
+def _hint(*words):
+    # Whole words of a class / id / role value, where "-" and "_" also separate words
+    return re.compile(r"(?<![a-z0-9])(?:" + "|".join(words) + r")(?![a-z0-9])")
+
+
+# class / id / role words that mark an element as boilerplate...
+BOILERPLATE_HINTS = _hint("nav", "navbar", "navigation", "menu", "footer", "cookies?", "consent", "gdpr",
+                          "share", "sharing", "social", "related", "recommended", "comments?", "advert\\w*",
+                          "ads?", "promo", "newsletter", "subscribe", "sidebar", "breadcrumbs?", "popup",
+                          "modal", "banner", "sponsored?", "outbrain", "taboola", "paywall", "skip",
+                          "pagination", "pager", "complementary", "contentinfo")
+# ...unless they also mark it as content
+CONTENT_HINTS = _hint("article", "body", "content", "main", "story", "post", "entry")
+ARTICLE_HINTS = _hint("articlebody", "article-?body", "article-content", "post-content", "post-body",
+                      "entry-content", "story-body", "story-content", "content-body")
+BYLINE_HINTS = _hint("byline", "author", "authors")
+BLOCK_TAGS = {"p", "div", "section", "article", "main", "li", "ul", "ol", "dl", "dt", "dd",
+              "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "figure", "figcaption",
+              "table", "tr", "td", "th", "br", "hr", "header", "footer"}
+HEADINGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta",
+             "param", "source", "track", "wbr"}
+
+# An <article>/<main> with less text than this is a teaser card, not the story
+MIN_ARTICLE_CHARS = 500
+# Outside an article, shorter blocks are taken for menus, labels and buttons
+MIN_BLOCK_WORDS = 5
+MAX_BYLINE_CHARS = 100
+# Blocks this long count as prose when scoring containers...
+PROSE_WORDS = 12
+# ...unless this much of their text is link text (menus, "read more" lists)
+MAX_LINK_DENSITY = 0.5
+
+_HTML_START = re.compile(r"\s*(<!--.*?-->\s*)*<(!doctype|html|head|body|meta|div|p|article|title)\b", re.I | re.S)
+
+
+def looks_like_html(text) -> bool:
+    return bool(text) and bool(_HTML_START.match(text[:1000]))
+
+
+class ExtractedContent:
+    __slots__ = ("title", "byline", "body")
+
+    def __init__(self, title="", byline="", body=""):
+        self.title = title
+        self.byline = byline
+        self.body = body
+
+    @property
+    def text(self) -> str:
+        """Title, byline and body as one plain-text document, for prompts and history."""
+        head = [f"Title: {self.title}"] if self.title else []
+        if self.byline:
+            head.append(f"By: {self.byline}")
+        return "\n".join(head) + ("\n\n" if head and self.body else "") + self.body
+
+
+class ContentExtractor(HTMLParser):
+    """Streaming HTML-to-text: feed() the page as it downloads, then close() and
+    take result().
+
+    Scripts, styles, forms and page chrome (nav, sidebars, share bars, cookie
+    banners, ad slots...) are dropped as they stream past. Text is kept per
+    block and scored as it closes: prose blocks count for their containers,
+    short or link-heavy ones against. The body is the best-scoring container;
+    failing that, the blocks inside <article>/<main> (or an element marked as
+    the article body), or every block of real prose on the page. Title and
+    byline come from the meta tags, the first <h1> and byline/author elements.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._stack = []          # (tag, skipped, article, byline, first block, score at open) per open element
+        self._skip = 0
+        self._article = 0
+        self._byline = 0
+        self._in_head = False
+        self._in_title = False
+        self._in_h1 = False
+        self._heading = False
+        self._block = []
+        self._link = 0
+        self._link_chars = 0
+        self._byline_text = []
+        self._doc_title = []
+        self._h1 = []
+        self.meta = {}
+        self.article_blocks = []
+        self.page_blocks = []     # (text, is_heading, is_links) outside the article too
+        self._score = 0           # running prose chars minus short-block chars over page_blocks
+        self.best = None          # (score, first block, end block) of the best container so far
+
+    @staticmethod
+    def _names(attrs) -> str:
+        return " ".join(v for k, v in attrs if k in ("class", "id", "role", "itemprop", "rel") and v).lower()
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "meta":
+            self._meta(dict(attrs))
+            return
+        if tag == "head":
+            self._in_head = True
+        elif tag == "body":
+            self._in_head = False
+        elif tag == "title" and not self._skip:
+            self._in_title = True
+
+        if tag in BLOCK_TAGS:
+            self._flush()
+        if tag in VOID_TAGS:
+            return
+
+        names = self._names(attrs)
+        skipped = (tag in SKIP_TAGS
+                   or (tag in CHROME_TAGS and not self._article)
+                   or (tag not in ROOT_TAGS and bool(BOILERPLATE_HINTS.search(names)) and not CONTENT_HINTS.search(names)))
+        article = not skipped and (tag in ARTICLE_TAGS or bool(ARTICLE_HINTS.search(names)))
+        byline = not skipped and not self._byline and bool(BYLINE_HINTS.search(names))
+        self._stack.append((tag, skipped, article, byline, len(self.page_blocks), self._score))
+        self._skip += skipped
+        self._article += article
+        self._byline += byline
+        if tag == "a":
+            self._link += 1
+        if tag == "h1" and not self._h1:
+            self._in_h1 = True
+        if tag in HEADINGS and not self._skip:
+            self._heading = True
+
+    def handle_endtag(self, tag):
+        if tag == "head":
+            self._in_head = False
+        elif tag == "title":
+            self._in_title = False
+        if tag in BLOCK_TAGS:
+            self._flush()
+        if tag == "h1":
+            self._in_h1 = False
+        # Unclosed children are closed along with their parent; a stray end tag is ignored
+        for depth in range(len(self._stack) - 1, -1, -1):
+            if self._stack[depth][0] == tag:
+                for closed, skipped, article, byline, first, score in reversed(self._stack[depth:]):
+                    self._link -= closed == "a"
+                    self._skip -= skipped
+                    self._article -= article
+                    self._byline -= byline
+                    gained = self._score - score
+                    if gained > 0 and (self.best is None or gained > self.best[0]):
+                        self.best = (gained, first, len(self.page_blocks))
+                del self._stack[depth:]
+                return
+
+    def handle_data(self, data):
+        if self._in_title:
+            self._doc_title.append(data)
+            return
+        if self._skip or self._in_head:
+            return
+        if self._in_h1:
+            self._h1.append(data)
+        if self._byline:
+            self._byline_text.append(data)
+        if self._link:
+            self._link_chars += len(data.strip())
+        self._block.append(data)
+
+    def _meta(self, attrs):
+        name = (attrs.get("property") or attrs.get("name") or "").lower()
+        if name in ("og:title", "twitter:title", "author", "article:author", "citation_author", "byl") and attrs.get("content"):
+            self.meta.setdefault(name, attrs["content"].strip())
+
+    def _flush(self):
+        text = " ".join("".join(self._block).split())
+        links = self._link_chars > MAX_LINK_DENSITY * len(text)
+        self._block = []
+        self._link_chars = 0
+        heading, self._heading = self._heading, False
+        if not text:
+            return
+        self.page_blocks.append((text, heading, links))
+        if len(text.split()) >= PROSE_WORDS and not links:
+            self._score += len(text)
+        elif not heading:
+            self._score -= len(text)
+        if self._article and not links:
+            self.article_blocks.append(text)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+    def result(self) -> ExtractedContent:
+        title = self.meta.get("og:title") or self.meta.get("twitter:title") or _clean(self._h1) or _clean(self._doc_title)
+
+        byline = self.meta.get("author") or self.meta.get("citation_author") or self.meta.get("byl") or ""
+        if not byline or byline.startswith("http"):
+            byline = _clean(self._byline_text)
+            if len(byline) > MAX_BYLINE_CHARS:
+                # An author bio or contact note rather than a byline
+                byline = ""
+        byline = re.sub(r"^by\s+", "", byline, flags=re.I)
+
+        if self.best and self.best[0] >= MIN_ARTICLE_CHARS:
+            _, first, end = self.best
+            blocks = [text for text, heading, links in self.page_blocks[first:end]
+                      if not links and (heading or len(text.split()) >= MIN_BLOCK_WORDS)]
+        elif sum(len(b) for b in self.article_blocks) >= MIN_ARTICLE_CHARS:
+            blocks = self.article_blocks
+        else:
+            blocks = [text for text, heading, links in self.page_blocks
+                      if not links and (heading or len(text.split()) >= MIN_BLOCK_WORDS)]
+        # Title and byline are shown once, above the body
+        blocks = [b for b in blocks if b != title and b != byline and b.lower() != f"by {byline}".lower()]
+        return ExtractedContent(title, byline, "\n\n".join(_dedupe(blocks)))
+
+
+def _clean(parts) -> str:
+    return " ".join("".join(parts).split())
+
+
+def _dedupe(blocks):
+    # Responsive pages often repeat a block (mobile + desktop copies)
+    seen = set()
+    for block in blocks:
+        if block not in seen:
+            seen.add(block)
+            yield block
+
+
+def extract_content(html) -> ExtractedContent:
+    extractor = ContentExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return extractor.result()
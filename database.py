@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker, declarative_base
 from pathlib import Path
 
@@ -21,3 +21,27 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Columns added to existing tables since their first release: create_all only
+# creates missing tables, so these are added to older databases by migrate_schema()
+ADDED_COLUMNS = {
+    "listen_later": {
+        "summary": "TEXT",
+        "episode_id": "INTEGER REFERENCES episodes(id)",
+        "processed_at": "DATETIME",
+        "prefetch_attempts": "INTEGER DEFAULT 0",
+        "prefetch_error": "TEXT",
+    },
+}
+
+def migrate_schema():
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table, columns in ADDED_COLUMNS.items():
+            if not inspector.has_table(table):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table)}
+            for name, ddl in columns.items():
+                if name not in existing:
+                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+                    print(f"🛠️ Added column {table}.{name}")
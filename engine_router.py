@@ -0,0 +1,133 @@
+import os
+import time
+import threading
+
+# Consecutive failures that open an engine's circuit
+DEFAULT_FAILURE_THRESHOLD = int(os.getenv("TTS_BREAKER_FAILURES", 3))
+# Seconds an open circuit waits before letting a single probe through
+DEFAULT_COOLDOWN_SECONDS = float(os.getenv("TTS_BREAKER_COOLDOWN", 30))
+# Latency handicap per fallback tier, so a cheaper engine only jumps ahead of a
+# better one when the better one is really slower (or failing)
+DEFAULT_TIER_PENALTY_SECONDS = float(os.getenv("TTS_TIER_PENALTY_SECONDS", 2.0))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class EngineHealth:
+    """Rolling health of one TTS engine."""
+
+    def __init__(self, name, tier):
+        self.name = name
+        self.tier = tier
+        self.state = CLOSED
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ewma_latency = None
+        self.success_rate = 1.0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+
+    def score(self, tier_penalty):
+        # Unknown latency counts as instant so new engines get tried
+        latency = self.ewma_latency or 0.0
+        return latency / max(self.success_rate, 0.05) + self.tier * tier_penalty
+
+    def to_dict(self):
+        return {
+            "engine": self.name,
+            "state": self.state,
+            "successes": self.successes,
+            "failures": self.failures,
+            "success_rate": round(self.success_rate, 3),
+            "ewma_latency": round(self.ewma_latency, 3) if self.ewma_latency is not None else None
+        }
+
+
+class EngineRouter:
+    """Orders TTS engines by health and latency and trips circuit breakers.
+
+    An engine that fails `failure_threshold` times in a row is skipped for
+    `cooldown_seconds`; after that one request is let through as a probe
+    (half-open). A successful probe closes the circuit, a failed one re-opens it.
+    """
+
+    def __init__(self, engines, failure_threshold=None, cooldown_seconds=None,
+                 tier_penalty=None, alpha=0.3):
+        self.failure_threshold = failure_threshold or DEFAULT_FAILURE_THRESHOLD
+        self.cooldown_seconds = cooldown_seconds if cooldown_seconds is not None else DEFAULT_COOLDOWN_SECONDS
+        self.tier_penalty = tier_penalty if tier_penalty is not None else DEFAULT_TIER_PENALTY_SECONDS
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._health = {name: EngineHealth(name, tier) for tier, name in enumerate(engines)}
+
+    def rank(self, engines) -> list:
+        """Return `engines` best first.
+
+        Closed circuits are ordered by score. Open circuits past their cooldown
+        are slotted in by tier alone so a recovered better tier gets its probe.
+        Open circuits still cooling down are dropped, unless every engine is
+        open, in which case the original order is returned as a last resort.
+        """
+        now = time.time()
+        with self._lock:
+            scored = []
+            for name in engines:
+                health = self._health[name]
+                if health.state == CLOSED:
+                    scored.append((health.score(self.tier_penalty), health.tier, name))
+                elif not health.probe_in_flight and now - health.opened_at >= self.cooldown_seconds:
+                    scored.append((health.tier * self.tier_penalty, health.tier, name))
+        if not scored:
+            return list(engines)
+        return [name for _, _, name in sorted(scored)]
+
+    def acquire(self, name, candidates=()) -> bool:
+        """Claim the right to call an engine now. False means skip it.
+
+        `candidates` are the engines the caller is choosing between; if none of
+        them has a closed circuit, cooling-down engines are tried anyway.
+        """
+        with self._lock:
+            health = self._health[name]
+            if health.state == CLOSED:
+                return True
+            if health.probe_in_flight:
+                return False
+            if time.time() - health.opened_at < self.cooldown_seconds:
+                # Every candidate is open and rank() fell back to all of them
+                return not any(self._health[c].state == CLOSED for c in candidates)
+            health.state = HALF_OPEN
+            health.probe_in_flight = True
+            print(f"  🔌 {name} circuit half-open, probing")
+            return True
+
+    def record(self, name, ok, latency):
+        with self._lock:
+            health = self._health[name]
+            health.probe_in_flight = False
+            health.success_rate = (1 - self.alpha) * health.success_rate + self.alpha * (1.0 if ok else 0.0)
+            if ok:
+                health.successes += 1
+                health.consecutive_failures = 0
+                health.ewma_latency = latency if health.ewma_latency is None else (
+                    (1 - self.alpha) * health.ewma_latency + self.alpha * latency
+                )
+                if health.state != CLOSED:
+                    print(f"  🔌 {name} circuit closed")
+                health.state = CLOSED
+                return
+
+            health.failures += 1
+            health.consecutive_failures += 1
+            if health.state == HALF_OPEN or health.consecutive_failures >= self.failure_threshold:
+                if health.state != OPEN:
+                    print(f"  🔌 {name} circuit open for {self.cooldown_seconds:.0f}s")
+                health.state = OPEN
+                health.opened_at = time.time()
+
+    def snapshot(self) -> list:
+        with self._lock:
+            return [h.to_dict() for h in sorted(self._health.values(), key=lambda h: h.tier)]
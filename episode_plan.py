@@ -0,0 +1,68 @@
+"""Episode layout helpers shared by the mixing and streaming paths.
+
+Indices here are positions in the final list of speech segments, i.e. the
+optional user intro, then the script lines, with the ad spliced in somewhere.
+"""
+
+VIBES = ["LOFI", "TENSE", "EXCITED", "CORPORATE"]
+DEFAULT_VIBE = "LOFI"
+AD_VIBE = "CORPORATE"
+DEFAULT_AD_TEXT = "Stay tuned! We'll be right back after this short break."
+
+
+def build_vibe_map(segments_metadata, script_start_offset=0):
+    """Map segment index -> vibe from the LLM's segments metadata.
+
+    segments_metadata indices refer to the *script* lines. If a user intro is
+    added at index 0, the script lines start at index 1.
+    """
+    return {
+        (m['start_line_index'] + script_start_offset): m['sentiment']
+        for m in (segments_metadata or [])
+    }
+
+
+def ad_insert_index(segment_count, ad_position, start=0):
+    """Where an ad lands for ad_position in 0.0-1.0, clamped to the segment list.
+
+    Nothing goes before `start`: with a user intro (start=1) the intro always plays first.
+    """
+    insert_idx = int(segment_count * ad_position)
+    return max(start, min(segment_count, insert_idx))
+
+
+def insert_into_vibe_map(vibe_map, insert_idx, vibe=AD_VIBE):
+    """Shift vibe map keys for a segment inserted at insert_idx, which gets `vibe`."""
+    new_vibe_map = {}
+    for k, v in vibe_map.items():
+        if k >= insert_idx:
+            new_vibe_map[k + 1] = v
+        else:
+            new_vibe_map[k] = v
+    new_vibe_map[insert_idx] = vibe
+    return new_vibe_map
+
+
+def vibe_at(index, vibe_map, previous_vibe=DEFAULT_VIBE):
+    """Vibe in effect for segment `index`, given the vibe of the segment before it."""
+    return vibe_map.get(index, previous_vibe)
+
+
+def group_by_vibe(durations, vibe_map):
+    """Collapse per-segment durations (ms) into [{"vibe", "duration"}] music groups."""
+    grouped_segments = []
+    current_vibe = DEFAULT_VIBE
+    current_group_duration = 0
+
+    for i, duration in enumerate(durations):
+        if i in vibe_map:
+            if current_group_duration > 0:
+                grouped_segments.append({"vibe": current_vibe, "duration": current_group_duration})
+            current_vibe = vibe_map[i]
+            current_group_duration = 0
+        current_group_duration += duration
+
+    # Last group
+    if current_group_duration > 0:
+        grouped_segments.append({"vibe": current_vibe, "duration": current_group_duration})
+    return grouped_segments
@@ -0,0 +1,86 @@
+import queue
+import shutil
+import subprocess
+import threading
+from pydub import AudioSegment
+
+# Every streamed segment is normalised to this before it reaches the encoder
+STREAM_FRAME_RATE = 44100
+STREAM_CHANNELS = 2
+STREAM_SAMPLE_WIDTH = 2  # s16le
+
+BED_GAIN_DB = -15
+CROSSFADE_MS = 500
+
+
+class Mp3PipeEncoder:
+    """One long-running ffmpeg process: s16le PCM in on stdin, MP3 out on stdout.
+
+    A reader thread drains stdout into a queue so writing PCM never deadlocks
+    on a full pipe.
+    """
+
+    def __init__(self, frame_rate=STREAM_FRAME_RATE, channels=STREAM_CHANNELS, bitrate="128k", chunk_size=16384):
+        ffmpeg_path = shutil.which("ffmpeg") or "ffmpeg"
+        self.proc = subprocess.Popen(
+            [
+                ffmpeg_path, "-hide_banner", "-loglevel", "error",
+                "-f", "s16le", "-ar", str(frame_rate), "-ac", str(channels), "-i", "pipe:0",
+                "-f", "mp3", "-b:a", bitrate, "pipe:1"
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
+        )
+        self.chunk_size = chunk_size
+        self._chunks = queue.Queue()
+        self._reader = threading.Thread(target=self._read, daemon=True)
+        self._reader.start()
+
+    def _read(self):
+        while True:
+            chunk = self.proc.stdout.read1(self.chunk_size)
+            if not chunk:
+                break
+            self._chunks.put(chunk)
+        self._chunks.put(None)
+
+    def write(self, pcm: bytes):
+        self.proc.stdin.write(pcm)
+        self.proc.stdin.flush()
+
+    def ready_chunks(self):
+        """Yield the MP3 bytes encoded so far without blocking."""
+        while True:
+            try:
+                chunk = self._chunks.get_nowait()
+            except queue.Empty:
+                return
+            if chunk is None:
+                self._chunks.put(None)
+                return
+            yield chunk
+
+    def finish(self):
+        """Close stdin and yield the remaining MP3 bytes until ffmpeg exits."""
+        self.proc.stdin.close()
+        while True:
+            chunk = self._chunks.get()
+            if chunk is None:
+                break
+            yield chunk
+        self.proc.wait()
+        if self.proc.returncode != 0:
+            raise Exception(f"ffmpeg encoder exited with code {self.proc.returncode}")
+
+    def abort(self):
+        if self.proc.poll() is None:
+            self.proc.kill()
+        self.proc.wait()
+
+
+def normalize(audio: AudioSegment) -> AudioSegment:
+    """Convert to the stream's sample rate / channels / width."""
+    return (audio.set_frame_rate(STREAM_FRAME_RATE)
+                 .set_channels(STREAM_CHANNELS)
+                 .set_sample_width(STREAM_SAMPLE_WIDTH))
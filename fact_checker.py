@@ -1,77 +1,37 @@
 import os
-import requests
-import json
+
 from scraper import WebScraper
+from llm_gateway import default_llm_gateway, LLMError
+from llm_cache import default_llm_cache, normalize_text
+
+# Verdicts go stale faster than scripts (FACT_CHECK_CACHE_TTL_SECONDS, default 1 day)
+FACT_CHECK_CACHE_TTL = int(os.getenv("FACT_CHECK_CACHE_TTL_SECONDS", 24 * 3600))
 
 class FactChecker:
     def __init__(self):
         self.scraper = WebScraper()
-        self.gemini_key = os.environ.get('GEMINI_API_KEY')
-        self.openrouter_key = os.environ.get('OPENROUTER_API_KEY')
-        self.cerebras_key = os.environ.get('CEREBRAS_API_KEY')
-        
-    def check_claim(self, claim, context):
-        """Verify a claim using a tiered AI strategy."""
-        if not claim:
-            return None
-            
-        # Tier 1: Gemini 3 Flash
-        if self.gemini_key:
-            res = self._check_via_gemini(claim, context)
-            if res: return res
-            
-        # Tier 2: OpenRouter (Qwen thinking)
-        if self.openrouter_key:
-            res = self._check_via_openrouter(claim, context)
-            if res: return res
 
-        # Tier 3: Cerebras
-        return self._check_via_cerebras(claim, context)
+    def check_claim(self, claim, context, keys=None, force_fresh=False):
+        """Verify a claim using a tiered AI strategy (Gemini -> OpenRouter -> Cerebras).
 
-    def _check_via_gemini(self, claim, context):
-        try:
-            url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-3-flash-preview:generateContent?key={self.gemini_key}"
-            prompt = f"Fact-check this: {claim}\nContext: {context[:2000]}\nOutput JSON: status, rating, explanation, source_snippet."
-            data = {
-                "contents": [{"parts": [{"text": prompt}]}],
-                "generationConfig": {"response_mime_type": "application/json"}
-            }
-            response = requests.post(url, json=data, timeout=10)
-            if response.status_code == 200:
-                return json.loads(response.json()['candidates'][0]['content']['parts'][0]['text'])
-        except Exception as e:
-            print(f"Gemini Fact-Check error: {e}")
-        return None
+        Verdicts are cached per claim and context; force_fresh asks the LLM again."""
+        if not claim:
+            return None
 
-    def _check_via_openrouter(self, claim, context):
-        try:
-            headers = {"Authorization": f"Bearer {self.openrouter_key}", "Content-Type": "application/json"}
-            prompt = f"Fact-check this: {claim}\nContext: {context[:2000]}\nOutput JSON: status, rating, explanation, source_snippet."
-            data = {
-                "model": "qwen/qwen3-4b:free",
-                "messages": [{"role": "user", "content": prompt}],
-                "response_format": {"type": "json_object"}
-            }
-            response = requests.post("https://openrouter.ai/api/v1/chat/completions", headers=headers, json=data, timeout=10)
-            if response.status_code == 200:
-                content = response.json()['choices'][0]['message']['content']
-                return json.loads(content)
-        except Exception as e:
-            print(f"OpenRouter Fact-Check error: {e}")
-        return None
+        key = default_llm_cache.make_key("fact_check", default_llm_gateway.models(),
+                                         claim=normalize_text(claim), context=normalize_text(context[:2000]))
+        if force_fresh:
+            default_llm_cache.skip("fact_check")
+        else:
+            cached = default_llm_cache.get("fact_check", key)
+            if cached is not None:
+                return cached
 
-    def _check_via_cerebras(self, claim, context):
+        prompt = f"Fact-check this: {claim}\nContext: {context[:2000]}\nOutput JSON: status, rating, explanation, source_snippet."
         try:
-            headers = {"Authorization": f"Bearer {self.cerebras_key}", "Content-Type": "application/json"}
-            prompt = f"Fact-check the claim: {claim}\nContext: {context[:1000]}"
-            data = {
-                "model": "llama3.1-8b",
-                "messages": [{"role": "user", "content": prompt}],
-                "response_format": {"type": "json_object"}
-            }
-            response = requests.post("https://api.cerebras.ai/v1/chat/completions", headers=headers, json=data)
-            if response.status_code == 200:
-                return json.loads(response.json()['choices'][0]['message']['content'])
-            return {"status": "unverifiable", "explanation": "Backup engine offline."}
-        except Exception as e:
-            return {"status": "error", "explanation": str(e)}
+            result = default_llm_gateway.complete_json(prompt, keys=keys, timeout=10, kind="fact_check")
+        except LLMError as e:
+            print(f"Fact-check error: {e}")
+            return {"status": "unverifiable", "explanation": "Fact-check engines offline."}
+        default_llm_cache.put("fact_check", key, result.data, provider=result.provider, ttl=FACT_CHECK_CACHE_TTL)
+        return result.data
@@ -0,0 +1,112 @@
+import os
+import time
+import datetime
+import threading
+import traceback
+
+# FEED_POLLING=0 turns the background feed poller off
+FEED_POLLING_ENABLED = os.getenv("FEED_POLLING", "1") == "1"
+# Seconds between polls of every configured feed
+FEED_POLL_INTERVAL = float(os.getenv("FEED_POLL_INTERVAL_SECONDS", 600))
+# Articles published longer ago than this are deleted after each poll
+ARTICLE_RETENTION_DAYS = float(os.getenv("ARTICLE_RETENTION_DAYS", 30))
+# With no articles stored yet, a trending request waits this long for the first poll
+FEED_COLD_WAIT = float(os.getenv("FEED_COLD_WAIT_SECONDS", 10))
+
+
+class FeedPoller:
+    """Polls the aggregator's feeds on a schedule into the articles table.
+
+    Runs on one background thread: every interval it fetches all feeds
+    (unchanged ones answer 304 and are skipped) and upserts their articles
+    by URL. Trending requests only ever read the table, so the number of
+    feeds has no bearing on their latency.
+    """
+
+    def __init__(self, aggregator, history, interval=None, retention_days=None):
+        self.aggregator = aggregator
+        self.history = history
+        self.interval = interval if interval is not None else FEED_POLL_INTERVAL
+        self.retention_days = retention_days if retention_days is not None else ARTICLE_RETENTION_DAYS
+        self._wake = threading.Event()
+        self._polled = threading.Event()
+        self._thread = None
+        self.polls = 0
+        self.new_articles = 0
+        self.pruned = 0
+        self.last_poll_at = None
+        self.last_poll_seconds = None
+        self.last_error = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="feed-poller", daemon=True)
+        self._thread.start()
+
+    def wake(self):
+        """Poll now rather than at the next interval."""
+        self._wake.set()
+
+    @property
+    def ready(self) -> bool:
+        """Whether the first poll has finished."""
+        return self._polled.is_set()
+
+    def wait_for_first_poll(self, timeout=FEED_COLD_WAIT) -> bool:
+        """Block until the first poll has finished (or timeout); False if the poller is not running."""
+        if self._thread is None:
+            return False
+        return self._polled.wait(timeout)
+
+    def _run(self):
+        while True:
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"❌ Feed poll failed: {e}")
+                traceback.print_exc()
+                self.last_error = str(e)
+            self._polled.set()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def poll(self) -> int:
+        """Fetch every feed once and store what changed. Returns how many articles were new."""
+        started = time.perf_counter()
+        changed = self.aggregator.fetch_all()
+        cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=self.retention_days)
+        added = 0
+        for feed_url, articles in changed.items():
+            try:
+                # Older entries would only be pruned again
+                added += self.history.save_articles([a for a in articles if a["published_at"] >= cutoff])
+            except Exception as e:
+                print(f"❌ Storing articles from {feed_url} failed: {e}")
+                self.last_error = str(e)
+                # Fetch it in full next time rather than being told it has not changed
+                self.aggregator.invalidate(feed_url)
+
+        self.pruned += self.history.prune_articles(cutoff)
+
+        self.polls += 1
+        self.new_articles += added
+        self.last_poll_at = time.time()
+        self.last_poll_seconds = round(time.perf_counter() - started, 2)
+        print(f"📰 Polled {len(self.aggregator.feeds)} feeds in {self.last_poll_seconds:.1f}s: "
+              f"{len(changed)} changed, {added} new articles")
+        return added
+
+    def stats(self) -> dict:
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "interval_seconds": self.interval,
+            "polls": self.polls,
+            "last_poll_at": self.last_poll_at,
+            "last_poll_seconds": self.last_poll_seconds,
+            "new_articles": self.new_articles,
+            "pruned": self.pruned,
+            "articles": self.history.count_articles(),
+            "last_error": self.last_error,
+            **self.aggregator.stats()
+        }
@@ -0,0 +1,152 @@
+import shutil
+import subprocess
+import tempfile
+import wave
+from pathlib import Path
+
+from episode_plan import DEFAULT_VIBE, group_by_vibe
+from episode_stream import STREAM_FRAME_RATE, BED_GAIN_DB, CROSSFADE_MS
+
+# Every input is brought to this before it is concatenated or mixed
+_INPUT_FORMAT = f"aresample={STREAM_FRAME_RATE},aformat=sample_fmts=fltp:channel_layouts=stereo"
+# aloop buffers the whole (short) loop, then repeats it until atrim stops it
+_LOOP_FOREVER = "aloop=loop=-1:size=2147483647"
+
+
+def probe_duration(path) -> float:
+    """Length of an audio file in seconds. WAV headers are read directly, anything else via ffprobe."""
+    path = str(path)
+    if path.lower().endswith(".wav"):
+        with wave.open(path, "rb") as wav:
+            return wav.getnframes() / wav.getframerate()
+    ffprobe_path = shutil.which("ffprobe") or "ffprobe"
+    result = subprocess.run(
+        [ffprobe_path, "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", path],
+        check=True, capture_output=True, text=True
+    )
+    return float(result.stdout.strip())
+
+
+def _wav_format(path):
+    """(rate, channels, width) of a WAV file, None for anything else."""
+    if not str(path).lower().endswith(".wav"):
+        return None
+    with wave.open(str(path), "rb") as wav:
+        return wav.getframerate(), wav.getnchannels(), wav.getsampwidth()
+
+
+def _speech_inputs(speech_files, list_dir=None) -> list:
+    """ffmpeg input arguments for the speech, in order.
+
+    With list_dir, each run of WAV files sharing one format becomes a single
+    concat-demuxer input read file after file; otherwise every file is its
+    own -i, which ffmpeg opens and buffers all at once.
+    """
+    if list_dir is None:
+        return [["-i", str(f)] for f in speech_files]
+    runs = []
+    for path in speech_files:
+        fmt = _wav_format(path)
+        if fmt is not None and runs and runs[-1][0] == fmt:
+            runs[-1][1].append(path)
+        else:
+            runs.append((fmt, [path]))
+    inputs = []
+    for n, (fmt, paths) in enumerate(runs):
+        if fmt is None or len(paths) == 1:
+            inputs.extend(["-i", str(p)] for p in paths)
+            continue
+        list_path = Path(list_dir) / f"speech_{n:03d}.txt"
+        with open(list_path, "w") as f:
+            for p in paths:
+                quoted = str(Path(p).resolve()).replace("'", "'\\''")
+                f.write(f"file '{quoted}'\n")
+        inputs.append(["-f", "concat", "-safe", "0", "-i", str(list_path)])
+    return inputs
+
+
+def _bed_groups(durations, vibe_map):
+    """group_by_vibe with repeats of the same vibe joined, since the bed carries on through them."""
+    groups = []
+    for group in group_by_vibe(durations, vibe_map):
+        if groups and groups[-1]['vibe'] == group['vibe']:
+            groups[-1]['duration'] += group['duration']
+        else:
+            groups.append(dict(group))
+    return groups
+
+
+def build_filtergraph(speech_files, music_files, vibe_map, durations=None, list_dir=None,
+                      gain_db=BED_GAIN_DB, crossfade_ms=CROSSFADE_MS):
+    """Return (ffmpeg input arguments, filter_complex) that render the episode to the [out] pad.
+
+    Speech inputs are concatenated. Under them, each vibe group gets its loop
+    (aloop, trimmed to the group length) and consecutive groups are joined with
+    a linear acrossfade in which the old loop plays on under the new one, as
+    in the other mixers. The bed is turned down and amixed with the speech.
+    """
+    if durations is None:
+        durations = [probe_duration(f) for f in speech_files]
+    inputs = _speech_inputs(speech_files, list_dir)
+    filters = [f"[{i}:a]{_INPUT_FORMAT}[s{i}]" for i in range(len(inputs))]
+    filters.append("".join(f"[s{i}]" for i in range(len(inputs))) + f"concat=n={len(inputs)}:v=0:a=1[speech]")
+
+    groups = _bed_groups(durations, vibe_map)
+    loop_files = [music_files.get(g['vibe'], music_files.get(DEFAULT_VIBE)) for g in groups]
+    crossfade = crossfade_ms / 1000
+    # Each crossfade eats into the following group, clamped so short groups still work.
+    # Two vibes sharing a loop just restart it, like the other mixers do.
+    fades = [
+        min(crossfade, groups[g]['duration']) if loop_files[g] and loop_files[g] != loop_files[g - 1] else 0
+        for g in range(1, len(groups))
+    ] + [0]
+    for g, (group, loop_file, fade) in enumerate(zip(groups, loop_files, fades)):
+        length = group['duration'] + fade  # plays on under the next group's fade-in
+        if loop_file:
+            inputs.append(["-i", str(loop_file)])
+            filters.append(f"[{len(inputs) - 1}:a]{_INPUT_FORMAT},{_LOOP_FOREVER},atrim=duration={length:.6f}[b{g}]")
+        else:
+            # Silence if no loop found
+            filters.append(f"anullsrc=r={STREAM_FRAME_RATE}:cl=stereo,atrim=duration={length:.6f},aformat=sample_fmts=fltp[b{g}]")
+
+    # Join neighbouring beds pairwise in a balanced tree: a plain chain would push
+    # the start of the bed through every later crossfade, quadratic in the group count
+    beds = [(f"b{g}", g) for g in range(len(groups))]  # (pad, last group in it)
+    joins = 0
+    while len(beds) > 1:
+        joined = []
+        for i in range(0, len(beds) - 1, 2):
+            (left, left_last), (right, right_last) = beds[i], beds[i + 1]
+            fade = fades[left_last]
+            joins += 1
+            if fade:
+                filters.append(f"[{left}][{right}]acrossfade=d={fade:.6f}:c1=tri:c2=tri[x{joins}]")
+            else:
+                filters.append(f"[{left}][{right}]concat=n=2:v=0:a=1[x{joins}]")
+            joined.append((f"x{joins}", right_last))
+        if len(beds) % 2:
+            joined.append(beds[-1])
+        beds = joined
+    filters.append(f"[{beds[0][0]}]volume={gain_db}dB[bed]")
+    filters.append("[speech][bed]amix=inputs=2:duration=first:dropout_transition=0:normalize=0[out]")
+    return inputs, ";".join(filters)
+
+
+def render_filtergraph(speech_files, music_files, vibe_map, output_path, durations=None, bitrate="128k", work_dir=None):
+    """Render the whole episode to an MP3 with a single ffmpeg process.
+
+    The concat lists go in a temporary directory inside work_dir (the system
+    temp dir if None).
+    """
+    if not speech_files:
+        raise ValueError("No speech to render")
+    with tempfile.TemporaryDirectory(prefix="filtergraph_", dir=work_dir) as list_dir:
+        inputs, graph = build_filtergraph(speech_files, music_files, vibe_map, durations, list_dir)
+        ffmpeg_path = shutil.which("ffmpeg") or "ffmpeg"
+        command = [ffmpeg_path, "-hide_banner", "-loglevel", "error", "-y"]
+        for args in inputs:
+            command += args
+        command += ["-filter_complex", graph, "-map", "[out]", "-f", "mp3", "-b:a", bitrate, str(output_path)]
+        result = subprocess.run(command, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        raise Exception(f"ffmpeg render failed: {result.stderr.strip()[-500:]}")
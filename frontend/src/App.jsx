@@ -497,6 +497,7 @@ export default function App() {
                 setUrl={setUrl}
                 handleGenerate={handleGenerate}
                 addToPlaylist={addToPlaylist}
+                openEpisode={handleHistoryView}
               />
             )}
 
@@ -2,7 +2,7 @@ import React from 'react';
 import { motion } from 'framer-motion';
 import { Newspaper, Plus, Radio } from 'lucide-react';
 
-export function TrendingRadar({ trending, playlist, setUrl, handleGenerate, addToPlaylist }) {
+export function TrendingRadar({ trending, playlist, setUrl, handleGenerate, addToPlaylist, openEpisode }) {
     return (
         <motion.div
             key="radar"
@@ -87,12 +87,21 @@ export function TrendingRadar({ trending, playlist, setUrl, handleGenerate, addT
                                         <p className="text-[10px] uppercase tracking-widest text-black/40">{item.source} • {item.url}</p>
                                     </div>
                                 </div>
-                                <button
-                                    onClick={() => { setUrl(item.url); handleGenerate(); }}
-                                    className="px-6 py-2 border-2 border-black text-[10px] font-black uppercase tracking-widest hover:bg-black hover:text-white transition-all"
-                                >
-                                    Synth Now
-                                </button>
+                                {item.status === 'ready' ? (
+                                    <button
+                                        onClick={() => openEpisode(item.episode_id)}
+                                        className="px-6 py-2 border-2 border-[#ff4d00] bg-[#ff4d00] text-white text-[10px] font-black uppercase tracking-widest hover:bg-black hover:border-black transition-all"
+                                    >
+                                        Play
+                                    </button>
+                                ) : (
+                                    <button
+                                        onClick={() => { setUrl(item.url); handleGenerate(); }}
+                                        className="px-6 py-2 border-2 border-black text-[10px] font-black uppercase tracking-widest hover:bg-black hover:text-white transition-all"
+                                    >
+                                        Synth Now
+                                    </button>
+                                )}
                             </div>
                         ))}
                     </div>
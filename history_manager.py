@@ -1,8 +1,13 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import or_, func
 import datetime
+import gzip
 from pathlib import Path
-from models import Episode, ListenLaterItem, User, Comment
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import Episode, ListenLaterItem, User, Comment, Article
 from database import SessionLocal
+from content_extractor import extract_content, looks_like_html
+from workspace import JobWorkspace
 
 class HistoryManager:
     def __init__(self, history_dir="history"):
@@ -13,17 +18,20 @@ class HistoryManager:
     def _get_db(self):
         return SessionLocal()
 
-    def save_generation(self, url, content, script, persona="investigator", depth="deep_dive", metadata=None):
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        entry_id = f"gen_{timestamp}"
-        
-        # Save files to disk (keep file storage for large text/audio)
-        content_path = self.history_dir / f"{entry_id}_content.txt"
-        script_path = self.history_dir / f"{entry_id}_script.txt"
-        
-        with open(content_path, "w") as f:
+    def _raw_file(self, content_file):
+        # The scraped page as served, kept next to its extracted text
+        return content_file.replace("_content.txt", "_raw.html.gz")
+
+    def _write_generation(self, workspace, entry_id, content, script, raw_content):
+        """Write an entry's files into the workspace, then move them into history_dir."""
+        names = [f"{entry_id}_content.txt", f"{entry_id}_script.txt"]
+        with open(workspace.file(names[0]), "w") as f:
             f.write(str(content))
-        with open(script_path, "w") as f:
+        if raw_content:
+            names.append(self._raw_file(names[0]))
+            with gzip.open(workspace.file(names[-1]), "wt", encoding="utf-8") as f:
+                f.write(raw_content)
+        with open(workspace.file(names[1]), "w") as f:
             if isinstance(script, list):
                 # Handle list of strings or list of dicts
                 processed_lines = []
@@ -46,7 +54,20 @@ class HistoryManager:
                     f.write(json.dumps(script, indent=2))
             else:
                 f.write(str(script))
-            
+        for name in names:
+            workspace.publish(name, self.history_dir)
+
+    def save_generation(self, url, content, script, persona="investigator", depth="deep_dive", metadata=None, raw_content=None):
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        # Files are written in a private workspace and published atomically; its
+        # unique id keeps jobs finishing in the same second from sharing names
+        with JobWorkspace(prefix="gen_", root=self.history_dir / "jobs") as workspace:
+            entry_id = f"gen_{timestamp}_{workspace.job_id}"
+            self._write_generation(workspace, entry_id, content, script, raw_content)
+
+        content_path = self.history_dir / f"{entry_id}_content.txt"
+        script_path = self.history_dir / f"{entry_id}_script.txt"
+
         # Save metadata to DB
         import json
         db = self._get_db()
@@ -105,6 +126,10 @@ class HistoryManager:
             
             if content_path.exists():
                 with open(content_path, "r") as f: content = f.read()
+                if looks_like_html(content):
+                    # Entries from before extraction stored the whole page
+                    content = extract_content(content).text
+            raw_file = self._raw_file(ep.content_file) if ep.content_file else None
             if script_path.exists():
                 with open(script_path, "r") as f: script = f.read()
                 
@@ -118,6 +143,7 @@ class HistoryManager:
                 "audio_url": f"/history_files/{ep.audio_file}" if ep.audio_file else None,
                 "script_url": f"/history_files/{ep.script_file}" if ep.script_file else None,
                 "content_url": f"/history_files/{ep.content_file}" if ep.content_file else None,
+                "raw_url": f"/history_files/{raw_file}" if raw_file and (self.history_dir / raw_file).exists() else None,
                 "persona": ep.persona,
                 "depth": ep.depth,
                 "show_notes": ep.show_notes,
@@ -161,13 +187,163 @@ class HistoryManager:
             db.close()
             
     def get_listen_later(self):
+        """Queued items, plus processed ones whose pre-generated episode is ready to play."""
         db = self._get_db()
         try:
-            items = db.query(ListenLaterItem).filter(ListenLaterItem.is_processed == False).order_by(ListenLaterItem.added_at.desc()).all()
-            return [{"id": item.id, "url": item.url, "title": item.title, "source": item.source} for item in items]
+            rows = (db.query(ListenLaterItem, Episode)
+                    .outerjoin(Episode, Episode.id == ListenLaterItem.episode_id)
+                    .filter(or_(ListenLaterItem.is_processed.isnot(True), Episode.audio_file.isnot(None)))
+                    .order_by(ListenLaterItem.added_at.desc()).all())
+            return [{
+                "id": item.id,
+                "url": item.url,
+                "title": item.title,
+                "source": item.source,
+                "summary": item.summary,
+                "status": "ready" if ep and ep.audio_file else ("failed" if item.prefetch_error else "queued"),
+                "episode_id": str(ep.id) if ep else None,
+                "audio_url": f"/history_files/{ep.audio_file}" if ep and ep.audio_file else None
+            } for item, ep in rows]
         finally:
              db.close()
 
+    def next_listen_later_to_prefetch(self, max_attempts):
+        """The oldest unprocessed item with attempts left, untried items first, as a dict, or None."""
+        db = self._get_db()
+        try:
+            item = (db.query(ListenLaterItem)
+                    .filter(ListenLaterItem.is_processed.isnot(True))
+                    .filter(func.coalesce(ListenLaterItem.prefetch_attempts, 0) < max_attempts)
+                    .order_by(func.coalesce(ListenLaterItem.prefetch_attempts, 0), ListenLaterItem.added_at, ListenLaterItem.id).first())
+            return {"id": item.id, "url": item.url, "title": item.title} if item else None
+        finally:
+            db.close()
+
+    def count_listen_later_pending(self, max_attempts):
+        db = self._get_db()
+        try:
+            return (db.query(ListenLaterItem)
+                    .filter(ListenLaterItem.is_processed.isnot(True))
+                    .filter(func.coalesce(ListenLaterItem.prefetch_attempts, 0) < max_attempts).count())
+        finally:
+            db.close()
+
+    def mark_listen_later_processed(self, item_id, episode_id):
+        db = self._get_db()
+        try:
+            item = db.query(ListenLaterItem).filter(ListenLaterItem.id == item_id).first()
+            if item:
+                item.is_processed = True
+                item.episode_id = int(episode_id)
+                item.processed_at = datetime.datetime.now(datetime.timezone.utc)
+                item.prefetch_error = None
+                db.commit()
+        finally:
+            db.close()
+
+    def record_listen_later_failure(self, item_id, error):
+        db = self._get_db()
+        try:
+            item = db.query(ListenLaterItem).filter(ListenLaterItem.id == item_id).first()
+            if item:
+                item.prefetch_attempts = (item.prefetch_attempts or 0) + 1
+                item.prefetch_error = str(error)[:500]
+                db.commit()
+        finally:
+            db.close()
+
+    def get_prefetched_episode(self, url, persona, depth):
+        """Id of the episode pre-generated for a Listen Later URL with this persona and depth, if its audio exists."""
+        db = self._get_db()
+        try:
+            ep = (db.query(Episode)
+                  .join(ListenLaterItem, ListenLaterItem.episode_id == Episode.id)
+                  .filter(ListenLaterItem.url == url, Episode.persona == persona, Episode.depth == depth,
+                          Episode.audio_file.isnot(None))
+                  .first())
+            if ep and (self.history_dir / ep.audio_file).exists():
+                return ep.id
+            return None
+        finally:
+            db.close()
+
+    # Article Methods
+    def save_articles(self, articles):
+        """Insert new articles and refresh known ones, matched by URL. Returns how many were new."""
+        rows = list({a["url"]: a for a in articles}.values())
+        if not rows:
+            return 0
+        db = self._get_db()
+        try:
+            known = {url for (url,) in db.query(Article.url).filter(Article.url.in_([r["url"] for r in rows]))}
+            stmt = sqlite_insert(Article).values(rows)
+            stmt = stmt.on_conflict_do_update(index_elements=[Article.url], set_={
+                "title": stmt.excluded.title,
+                "summary": stmt.excluded.summary,
+                # published_at stays: undated entries are stamped when first seen
+                "image": stmt.excluded.image
+            })
+            db.execute(stmt)
+            db.commit()
+            return len(rows) - len(known)
+        finally:
+            db.close()
+
+    def _article_query(self, db, source=None, since=None):
+        query = db.query(Article)
+        if source:
+            query = query.filter(Article.source == source)
+        if since:
+            query = query.filter(Article.published_at >= since)
+        return query
+
+    def get_articles(self, limit=10, offset=0, source=None, since=None):
+        """Newest articles first, optionally from one source and published since a UTC datetime."""
+        db = self._get_db()
+        try:
+            articles = (self._article_query(db, source, since)
+                        .order_by(Article.published_at.desc(), Article.id.desc())
+                        .offset(offset).limit(limit).all())
+            return [{
+                "id": a.id,
+                "title": a.title,
+                "url": a.url,
+                "source": a.source,
+                "summary": a.summary or "",
+                "published": a.published_at.isoformat() if a.published_at else "",
+                "image": a.image
+            } for a in articles]
+        finally:
+            db.close()
+
+    def count_articles(self, source=None, since=None):
+        db = self._get_db()
+        try:
+            return self._article_query(db, source, since).count()
+        finally:
+            db.close()
+
+    def get_article_sources(self):
+        """Each source with its article count and newest publication time."""
+        db = self._get_db()
+        try:
+            rows = (db.query(Article.source, func.count(Article.id), func.max(Article.published_at))
+                    .group_by(Article.source).order_by(func.max(Article.published_at).desc()).all())
+            return [{"source": source, "articles": count, "latest": latest.isoformat() if latest else None}
+                    for source, count, latest in rows]
+        finally:
+            db.close()
+
+    def prune_articles(self, before):
+        """Delete articles published before a UTC datetime; returns how many went."""
+        db = self._get_db()
+        try:
+            removed = db.query(Article).filter(Article.published_at < before).delete()
+            db.commit()
+            return removed
+        finally:
+            db.close()
+
     # Social Methods
     def get_or_create_user(self, username):
         db = self._get_db()
@@ -0,0 +1,146 @@
+import asyncio
+import json
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Episodes generated side by side; each one also runs its own TTS pool
+DEFAULT_JOB_WORKERS = int(os.getenv("GENERATION_WORKERS", 2))
+# Finished jobs are forgotten after this long
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", 3600))
+
+FINISHED = ("done", "failed")
+
+
+class Job:
+    """State and event log of one background job.
+
+    The worker reports through set_stage / set_progress; readers poll
+    snapshot() or follow the event log with events_since().
+    """
+
+    def __init__(self, kind):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.status = "queued"
+        self.stage = None
+        self.progress = None
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self._lock = threading.Lock()
+        self._events = []
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    def _emit(self, event, **data):
+        with self._lock:
+            self.updated_at = time.time()
+            self._events.append({"event": event, "job_id": self.id, **data})
+
+    def set_status(self, status, **data):
+        # Logged before it shows, so a reader that sees a finished job has all its events
+        self._emit("status", status=status, **data)
+        self.status = status
+
+    def set_stage(self, stage):
+        self.stage = stage
+        self.progress = None
+        self._emit("stage", stage=stage)
+
+    def set_progress(self, done, total=None, **info):
+        self.progress = {"done": done, "total": total}
+        self._emit("progress", stage=self.stage, done=done, total=total, **info)
+
+    def events_since(self, cursor) -> list:
+        with self._lock:
+            return self._events[cursor:]
+
+    def snapshot(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+
+class JobManager:
+    """Runs blocking work (scraping, LLM calls, TTS, mixing) on a worker pool,
+    off the server's event loop, and keeps the jobs around for status queries."""
+
+    def __init__(self, max_workers=DEFAULT_JOB_WORKERS, ttl=JOB_TTL_SECONDS):
+        self.executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="job")
+        self.ttl = ttl
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind, fn, *args, **kwargs) -> Job:
+        """Queue fn(*args, job=job, **kwargs); its return value becomes job.result."""
+        job = Job(kind)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        self.executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        job.set_status("running")
+        try:
+            job.result = fn(*args, job=job, **kwargs)
+        except Exception as e:
+            print(f"❌ Job {job.id} failed: {e}")
+            traceback.print_exc()
+            job.error = getattr(e, "detail", None) or str(e)
+            job.set_status("failed", error=job.error)
+        else:
+            job.set_status("done", result=job.result)
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        for job_id in [j.id for j in self._jobs.values() if j.finished and j.updated_at < cutoff]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> list:
+        with self._lock:
+            return [job.snapshot() for job in self._jobs.values()]
+
+
+async def sse_events(job, poll_interval=0.25, keepalive=15):
+    """Server-Sent Events for a job: its whole event log so far, then new events
+    as they happen, ending after the final status. Polls, so no thread is tied up
+    per listener."""
+    cursor = 0
+    idle = 0.0
+    while True:
+        events = job.events_since(cursor)
+        cursor += len(events)
+        for event in events:
+            yield f"event: {event['event']}\ndata: {json.dumps(event, default=str)}\n\n"
+        if events:
+            idle = 0.0
+        if job.finished and not job.events_since(cursor):
+            return
+        if idle >= keepalive:
+            yield ": keepalive\n\n"
+            idle = 0.0
+        await asyncio.sleep(poll_interval)
+        idle += poll_interval
+
+
+default_job_manager = JobManager()
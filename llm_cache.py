@@ -0,0 +1,142 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import Counter
+
+from database import SessionLocal, Base
+from models import LLMCacheEntry
+
+# How long a cached LLM response stays valid (LLM_CACHE_TTL_SECONDS, default 7 days)
+DEFAULT_LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+
+
+def normalize_text(text) -> str:
+    """Collapse whitespace, so reflowed copies of the same text share a cache entry."""
+    return " ".join(str(text or "").split())
+
+
+class LLMCache:
+    """Persistent, TTL-bounded cache of parsed LLM responses, kept in the app database.
+
+    Entries are keyed by a hash of the request kind, the models that could
+    answer it and the normalized prompt inputs, so switching a tier's model
+    or changing any input is a miss. Expired entries count as misses and are
+    deleted when found or swept by purge_expired().
+    """
+
+    def __init__(self, ttl=None, session_factory=SessionLocal):
+        self.ttl = ttl if ttl is not None else DEFAULT_LLM_CACHE_TTL
+        self._session_factory = session_factory
+        self._table_ready = False
+        self._lock = threading.Lock()
+        self.hits = Counter()
+        self.misses = Counter()
+        self.bypassed = Counter()
+
+    @staticmethod
+    def make_key(kind, models, **inputs) -> str:
+        """Stable hash of what determines the response."""
+        payload = json.dumps({"kind": kind, "models": list(models), "inputs": inputs},
+                             sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _session(self):
+        db = self._session_factory()
+        if not self._table_ready:
+            # Callers outside the API (app.py) never run create_all
+            try:
+                Base.metadata.create_all(bind=db.get_bind(), tables=[LLMCacheEntry.__table__])
+                self._table_ready = True
+            except Exception as e:
+                print(f"  ⚠️ LLM cache table unavailable: {e}")
+        return db
+
+    def _count(self, counter, kind):
+        with self._lock:
+            counter[kind] += 1
+
+    def get(self, kind, key):
+        """The cached response for `key`, or None. Counts one hit or miss for `kind`."""
+        db = self._session()
+        try:
+            entry = db.get(LLMCacheEntry, key)
+            if entry is not None and entry.expires_at <= time.time():
+                db.delete(entry)
+                db.commit()
+                entry = None
+            response = json.loads(entry.response) if entry is not None else None
+        except Exception as e:
+            print(f"  ⚠️ LLM cache read failed: {e}")
+            db.rollback()
+            response = None
+        finally:
+            db.close()
+        self._count(self.hits if response is not None else self.misses, kind)
+        return response
+
+    def skip(self, kind):
+        """Record a lookup skipped because the caller forced a fresh response."""
+        self._count(self.bypassed, kind)
+
+    def put(self, kind, key, response, provider=None, ttl=None):
+        db = self._session()
+        try:
+            db.merge(LLMCacheEntry(
+                key=key,
+                kind=kind,
+                provider=provider,
+                response=json.dumps(response, ensure_ascii=False),
+                expires_at=time.time() + (ttl if ttl is not None else self.ttl)
+            ))
+            db.commit()
+        except Exception as e:
+            print(f"  ⚠️ LLM cache write failed: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+    def purge_expired(self) -> int:
+        db = self._session()
+        try:
+            removed = db.query(LLMCacheEntry).filter(LLMCacheEntry.expires_at <= time.time()).delete()
+            db.commit()
+            return removed
+        finally:
+            db.close()
+
+    def stats(self) -> dict:
+        db = self._session()
+        try:
+            now = time.time()
+            entries = db.query(LLMCacheEntry).filter(LLMCacheEntry.expires_at > now).count()
+            expired = db.query(LLMCacheEntry).filter(LLMCacheEntry.expires_at <= now).count()
+        finally:
+            db.close()
+        with self._lock:
+            kinds = sorted(set(self.hits) | set(self.misses) | set(self.bypassed))
+            by_kind = {}
+            for kind in kinds:
+                lookups = self.hits[kind] + self.misses[kind]
+                by_kind[kind] = {
+                    "hits": self.hits[kind],
+                    "misses": self.misses[kind],
+                    "bypassed": self.bypassed[kind],
+                    "hit_rate": round(self.hits[kind] / lookups, 4) if lookups else 0.0
+                }
+            hits, misses = sum(self.hits.values()), sum(self.misses.values())
+        lookups = hits + misses
+        return {
+            "entries": entries,
+            "expired": expired,
+            "ttl_seconds": self.ttl,
+            "hits": hits,
+            "misses": misses,
+            "bypassed": sum(v["bypassed"] for v in by_kind.values()),
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "by_kind": by_kind
+        }
+
+
+default_llm_cache = LLMCache()
@@ -0,0 +1,524 @@
+import asyncio
+import hashlib
+import json
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+import httpx
+
+# Seconds per HTTP attempt, unless the caller passes its own
+DEFAULT_LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", 30))
+# Extra attempts per provider on 429 / 5xx / connection errors. Not on timeouts:
+# a hung provider would cost (retries + 1) * timeout before the next tier
+DEFAULT_LLM_RETRIES = int(os.getenv("LLM_RETRIES", 2))
+# Backoff before retry n is uniform in [0, base * 2**n] seconds (full jitter)
+DEFAULT_LLM_BACKOFF = float(os.getenv("LLM_BACKOFF_SECONDS", 0.5))
+# Keep-alive connections per provider client
+DEFAULT_LLM_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 10))
+
+RETRY_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+# LLM_HEDGE=1 hedges every call that doesn't pass hedge= itself; off by default, since a
+# hedged call can have several paid or rate-limited requests in flight at once
+DEFAULT_LLM_HEDGE = os.getenv("LLM_HEDGE", "0") == "1"
+# Seconds a tier gets before the next one is started alongside it...
+DEFAULT_HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", 8))
+# ...or less, once it has this many timed completions of the same kind and their p95 is shorter
+HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", 10))
+HEDGE_MIN_DELAY = 0.5
+# Completion times kept per provider and call kind for the percentile
+LATENCY_WINDOW = 100
+# Kind of a call whose caller doesn't name one
+DEFAULT_CALL_KIND = "general"
+
+# Fallback order used when the caller doesn't choose
+DEFAULT_TIERS = ("gemini", "openrouter", "cerebras")
+
+
+class LLMError(Exception):
+    """Every provider tier failed (or none had a key)."""
+
+
+def extract_json(text):
+    """Parse a JSON object out of a model reply: bare, in a ``` fence, or wrapped in prose."""
+    text = text.strip()
+    if "```" in text:
+        fenced = text.split("```")[1]
+        if fenced.startswith("json"):
+            fenced = fenced[4:]
+        text = fenced.strip()
+    try:
+        return json.loads(text)
+    except ValueError:
+        start, end = text.find("{"), text.rfind("}")
+        if start == -1 or end <= start:
+            raise
+        return json.loads(text[start:end + 1])
+
+
+def _retryable(error) -> bool:
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRY_STATUS
+    return not isinstance(error, httpx.TimeoutException)
+
+
+def _describe(error) -> str:
+    # httpx status errors are multi-line, timeouts often have no message at all
+    if isinstance(error, httpx.HTTPStatusError):
+        return f"HTTP {error.response.status_code}"
+    return str(error) or type(error).__name__
+
+
+class Provider:
+    """How to call one chat-completion API: endpoint, auth, payload and reply shape."""
+
+    def __init__(self, name, env_key, model):
+        self.name = name
+        self.env_key = env_key
+        self.model = model
+
+    def auth_headers(self, key) -> dict:
+        return {"Authorization": f"Bearer {key}"}
+
+    def request(self, prompt, system, json_mode, stream=False):
+        """(url, json body) for one completion; with stream, one answered as server-sent events."""
+        raise NotImplementedError
+
+    def reply_text(self, body) -> str:
+        return body['choices'][0]['message']['content']
+
+    def stream_delta(self, event) -> str:
+        """Text added by one streamed event."""
+        choices = event.get('choices') or [{}]
+        return choices[0].get('delta', {}).get('content') or ""
+
+
+class OpenAIStyleProvider(Provider):
+    def __init__(self, name, env_key, model, url, json_mode=True):
+        super().__init__(name, env_key, model)
+        self.url = url
+        # Whether the endpoint accepts response_format; without it, JSON calls rely on
+        # the prompt and extract_json
+        self.json_mode = json_mode
+
+    def request(self, prompt, system, json_mode, stream=False):
+        messages = [{"role": "system", "content": system}] if system else []
+        messages.append({"role": "user", "content": prompt})
+        data = {"model": self.model, "messages": messages}
+        if json_mode and self.json_mode:
+            data["response_format"] = {"type": "json_object"}
+        if stream:
+            data["stream"] = True
+        return self.url, data
+
+
+class GeminiProvider(Provider):
+    def auth_headers(self, key) -> dict:
+        # Header rather than ?key=, so the key stays out of URLs and logs
+        return {"x-goog-api-key": key}
+
+    def request(self, prompt, system, json_mode, stream=False):
+        data = {"contents": [{"parts": [{"text": prompt}]}]}
+        if system:
+            data["systemInstruction"] = {"parts": [{"text": system}]}
+        if json_mode:
+            data["generationConfig"] = {"response_mime_type": "application/json"}
+        method = "streamGenerateContent?alt=sse" if stream else "generateContent"
+        return f"https://generativelanguage.googleapis.com/v1beta/models/{self.model}:{method}", data
+
+    def reply_text(self, body) -> str:
+        return body['candidates'][0]['content']['parts'][0]['text']
+
+    def stream_delta(self, event) -> str:
+        candidates = event.get('candidates') or [{}]
+        return "".join(part.get('text', "") for part in candidates[0].get('content', {}).get('parts', []))
+
+
+PROVIDERS = {
+    "gemini": GeminiProvider("gemini", "GEMINI_API_KEY", "gemini-3-flash-preview"),
+    # Many free OpenRouter routes reject or ignore response_format
+    "openrouter": OpenAIStyleProvider("openrouter", "OPENROUTER_API_KEY", "qwen/qwen3-4b:free",
+                                      "https://openrouter.ai/api/v1/chat/completions", json_mode=False),
+    "cerebras": OpenAIStyleProvider("cerebras", "CEREBRAS_API_KEY", "llama3.1-8b",
+                                    "https://api.cerebras.ai/v1/chat/completions"),
+}
+
+
+class LLMResult:
+    __slots__ = ("text", "provider", "latency", "data")
+
+    def __init__(self, text, provider, latency, data=None):
+        self.text = text
+        self.provider = provider
+        self.latency = latency
+        self.data = data  # parsed JSON for the *_json calls
+
+
+class ProviderStats:
+    """Call counts and latency of one provider, and how it fares in hedged races."""
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.failures = 0
+        self.retries = 0
+        self.last_latency = None
+        self.ewma_latency = None
+        self.last_error = None
+        # Seconds per successful completion, per call kind: a fact check and a
+        # whole script take very different times, even on the same model
+        self.completions = {}
+        self.races = 0
+        self.wins = 0
+        self.cancelled = 0
+
+    def add_completion(self, kind, seconds):
+        self.completions.setdefault(kind, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+    def p95(self, kind):
+        """95th percentile completion time of `kind` calls, None until there are HEDGE_MIN_SAMPLES."""
+        samples = self.completions.get(kind, ())
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def to_dict(self):
+        p95 = {kind: self.p95(kind) for kind in self.completions}
+        return {
+            "provider": self.name,
+            "calls": self.calls,
+            "failures": self.failures,
+            "retries": self.retries,
+            "last_latency": round(self.last_latency, 3) if self.last_latency is not None else None,
+            "ewma_latency": round(self.ewma_latency, 3) if self.ewma_latency is not None else None,
+            "p95_latency": {kind: round(value, 3) for kind, value in p95.items() if value is not None},
+            "races": self.races,
+            "wins": self.wins,
+            "win_rate": round(self.wins / self.races, 3) if self.races else None,
+            "cancelled": self.cancelled,
+            "last_error": self.last_error
+        }
+
+
+class LLMGateway:
+    """One place for every LLM call: tiered fallback over the providers.
+
+    Each (provider, credential) pair gets a pooled keep-alive httpx.AsyncClient.
+    All I/O runs on the gateway's own event loop thread, so the clients are
+    shared by sync callers on worker threads (complete / complete_json) and by
+    coroutines on the server's loop (acomplete / acomplete_json) alike.
+    Credentials come per call in `keys` ({"gemini": ..., "cerebras": ...}); a
+    provider without one falls back to its environment variable.
+
+    Tiers are tried one after another by default. With hedge=True a call
+    races them instead: the next tier starts when the current one fails, or
+    when it has run for hedge_delay seconds or past its own p95 completion
+    time for this kind of call, whichever is shorter. The first valid reply wins and the requests
+    still in flight are cancelled.
+    """
+
+    def __init__(self, providers=None, timeout=None, retries=None, backoff=None,
+                 max_connections=None, alpha=0.3, hedge=None, hedge_delay=None):
+        self.providers = providers or PROVIDERS
+        self.hedge = hedge if hedge is not None else DEFAULT_LLM_HEDGE
+        self.hedge_delay = hedge_delay if hedge_delay is not None else DEFAULT_HEDGE_DELAY
+        self.timeout = timeout or DEFAULT_LLM_TIMEOUT
+        self.retries = retries if retries is not None else DEFAULT_LLM_RETRIES
+        self.backoff = backoff if backoff is not None else DEFAULT_LLM_BACKOFF
+        self.max_connections = max_connections or DEFAULT_LLM_CONNECTIONS
+        self.alpha = alpha
+        self._clients = {}
+        self._stats = {name: ProviderStats(name) for name in self.providers}
+        self._stats_lock = threading.Lock()
+        self._loop = None
+        self._loop_lock = threading.Lock()
+
+    # Event loop / clients
+
+    def _ensure_loop(self):
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="llm-gateway", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def _submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def _client(self, provider, key) -> httpx.AsyncClient:
+        # Runs on the gateway loop only, so no lock is needed
+        client_id = (provider.name, hashlib.sha256(key.encode()).hexdigest())
+        client = self._clients.get(client_id)
+        if client is None:
+            client = httpx.AsyncClient(
+                headers={**provider.auth_headers(key), "Content-Type": "application/json"},
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections, keepalive_expiry=60)
+            )
+            self._clients[client_id] = client
+        return client
+
+    def _key(self, name, keys):
+        return (keys or {}).get(name) or os.environ.get(self.providers[name].env_key)
+
+    # Metrics
+
+    def _record(self, name, latency=None, error=None, retried=False):
+        with self._stats_lock:
+            stats = self._stats[name]
+            if retried:
+                stats.retries += 1
+                return
+            stats.calls += 1
+            if error is not None:
+                stats.failures += 1
+                stats.last_error = _describe(error)[:200]
+            if latency is not None:
+                stats.last_latency = latency
+                stats.ewma_latency = latency if stats.ewma_latency is None else (
+                    self.alpha * latency + (1 - self.alpha) * stats.ewma_latency)
+
+    def _record_outcome(self, name, completion=None, kind=DEFAULT_CALL_KIND, raced=False, won=False, cancelled=False):
+        with self._stats_lock:
+            stats = self._stats[name]
+            if completion is not None:
+                stats.add_completion(kind, completion)
+            stats.races += raced
+            stats.wins += won
+            stats.cancelled += cancelled
+
+    def _hedge_after(self, name, kind) -> float:
+        """Seconds to give `name` on a `kind` call before starting the next tier beside it."""
+        with self._stats_lock:
+            p95 = self._stats[name].p95(kind)
+        delay = self.hedge_delay if p95 is None else min(self.hedge_delay, p95)
+        return max(HEDGE_MIN_DELAY, delay)
+
+    def stats(self) -> list:
+        with self._stats_lock:
+            return [stats.to_dict() for stats in self._stats.values()]
+
+    def models(self, tiers=None) -> list:
+        """The tiers that could answer a call, as "provider:model", in order."""
+        return [f"{name}:{self.providers[name].model}" for name in tiers or DEFAULT_TIERS]
+
+    # Calls
+
+    async def _call(self, name, key, prompt, system, json_mode, timeout):
+        """One provider, with retries on transient failures. Returns the reply text."""
+        provider = self.providers[name]
+        url, data = provider.request(prompt, system, json_mode)
+        client = self._client(provider, key)
+        for attempt in range(self.retries + 1):
+            started = time.perf_counter()
+            try:
+                response = await client.post(url, json=data, timeout=timeout)
+                response.raise_for_status()
+                text = provider.reply_text(response.json())
+                self._record(name, latency=time.perf_counter() - started)
+                return text
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                if _retryable(e) and attempt < self.retries:
+                    self._record(name, retried=True)
+                    await asyncio.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+                    continue
+                self._record(name, latency=time.perf_counter() - started, error=e)
+                raise
+            except Exception as e:
+                # Malformed reply: retrying the same provider won't help
+                self._record(name, latency=time.perf_counter() - started, error=e)
+                raise
+
+    async def _attempt(self, name, key, prompt, system, json_mode, timeout, kind=DEFAULT_CALL_KIND) -> LLMResult:
+        """One tier: the call, plus parsing in JSON mode. Raises if the reply isn't usable."""
+        started = time.perf_counter()
+        text = await self._call(name, key, prompt, system, json_mode, timeout)
+        data = extract_json(text) if json_mode else None
+        latency = time.perf_counter() - started
+        self._record_outcome(name, completion=latency, kind=kind)
+        return LLMResult(text, name, latency, data)
+
+    def _failed(self, errors):
+        return LLMError("All LLM providers failed" + (f" ({'; '.join(errors)})" if errors else ": no API keys configured"))
+
+    async def _complete(self, prompt, system=None, json_mode=False, tiers=None, keys=None, timeout=None, hedge=None, kind=None):
+        candidates = [(name, key) for name in tiers or DEFAULT_TIERS for key in [self._key(name, keys)] if key]
+        timeout = timeout or self.timeout
+        hedge = self.hedge if hedge is None else hedge
+        kind = kind or DEFAULT_CALL_KIND
+        if hedge:
+            return await self._complete_hedged(candidates, prompt, system, json_mode, timeout, kind)
+        errors = []
+        for name, key in candidates:
+            try:
+                return await self._attempt(name, key, prompt, system, json_mode, timeout, kind)
+            except Exception as e:
+                print(f"⚠️ LLM {name} failed: {_describe(e)}")
+                errors.append(f"{name}: {_describe(e)}")
+        raise self._failed(errors)
+
+    async def _complete_hedged(self, candidates, prompt, system, json_mode, timeout, kind):
+        errors = []
+        waiting = list(candidates)
+        running = {}  # task -> provider name
+        latest = None  # (name, started) of the tier started last
+        try:
+            while waiting or running:
+                # Start the next tier if nothing is running or the latest one is overdue
+                if waiting and (not running or time.perf_counter() - latest[1] >= self._hedge_after(latest[0], kind)):
+                    name, key = waiting.pop(0)
+                    if running:
+                        print(f"⏱️ LLM {latest[0]} slow, hedging with {name}")
+                    task = asyncio.ensure_future(self._attempt(name, key, prompt, system, json_mode, timeout, kind))
+                    running[task] = name
+                    latest = (name, time.perf_counter())
+                    self._record_outcome(name, raced=True)
+                    continue
+                wait = None
+                if waiting:
+                    wait = max(0.0, self._hedge_after(latest[0], kind) - (time.perf_counter() - latest[1]))
+                done, _ = await asyncio.wait(running, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = running.pop(task)
+                    if task.exception() is None:
+                        self._record_outcome(name, won=True)
+                        return task.result()
+                    print(f"⚠️ LLM {name} failed: {_describe(task.exception())}")
+                    errors.append(f"{name}: {_describe(task.exception())}")
+            raise self._failed(errors)
+        finally:
+            # Losers (or everything, if the caller gave up) are cancelled
+            for task, name in running.items():
+                if not task.done():
+                    task.cancel()
+                    self._record_outcome(name, cancelled=True)
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+    async def _astream(self, prompt, system=None, json_mode=False, tiers=None, keys=None, timeout=None, kind=None):
+        """Yield the reply text as it streams in.
+
+        Tiers are tried in order until one starts answering; transient errors
+        before the first token are retried like _call (timeouts are not). Once
+        text has been yielded the stream is committed to that provider, so a
+        later failure is raised rather than restarted elsewhere. Not hedged.
+        """
+        errors = []
+        timeout = timeout or self.timeout
+        for name in tiers or DEFAULT_TIERS:
+            key = self._key(name, keys)
+            if not key:
+                continue
+            provider = self.providers[name]
+            url, data = provider.request(prompt, system, json_mode, stream=True)
+            client = self._client(provider, key)
+            for attempt in range(self.retries + 1):
+                started = time.perf_counter()
+                streamed = False
+                try:
+                    async with client.stream("POST", url, json=data, timeout=timeout) as response:
+                        response.raise_for_status()
+                        async for line in response.aiter_lines():
+                            if not line.startswith("data:"):
+                                continue
+                            payload = line[5:].strip()
+                            if payload == "[DONE]":
+                                break
+                            text = provider.stream_delta(json.loads(payload))
+                            if text:
+                                streamed = True
+                                yield text
+                    latency = time.perf_counter() - started
+                    self._record(name, latency=latency)
+                    self._record_outcome(name, completion=latency, kind=kind or DEFAULT_CALL_KIND)
+                    return
+                except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                    if _retryable(e) and not streamed and attempt < self.retries:
+                        self._record(name, retried=True)
+                        await asyncio.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+                        continue
+                    self._record(name, latency=time.perf_counter() - started, error=e)
+                    if streamed:
+                        raise
+                    print(f"⚠️ LLM {name} stream failed: {_describe(e)}")
+                    errors.append(f"{name}: {_describe(e)}")
+                    break
+                except Exception as e:
+                    self._record(name, latency=time.perf_counter() - started, error=e)
+                    if streamed:
+                        raise
+                    print(f"⚠️ LLM {name} stream failed: {_describe(e)}")
+                    errors.append(f"{name}: {_describe(e)}")
+                    break
+        raise self._failed(errors)
+
+    def stream(self, prompt, system=None, json_mode=False, tiers=None, keys=None, timeout=None, kind=None):
+        """Blocking iterator over the reply text as it streams in (see _astream)."""
+        chunks = queue.Queue()
+
+        async def pump():
+            try:
+                async for text in self._astream(prompt, system, json_mode, tiers, keys, timeout, kind):
+                    chunks.put((True, text))
+                chunks.put((False, None))
+            except Exception as e:
+                chunks.put((False, e))
+
+        future = self._submit(pump())
+        try:
+            while True:
+                more, value = chunks.get()
+                if not more:
+                    if value is not None:
+                        raise value
+                    return
+                yield value
+        finally:
+            # Stops the request if the consumer bails out early
+            future.cancel()
+
+    def complete(self, prompt, system=None, tiers=None, keys=None, timeout=None, hedge=None, kind=None) -> LLMResult:
+        """Blocking completion: the first provider in `tiers` that answers wins.
+
+        `kind` names the sort of call ("script", "fact_check"...); latency is
+        tracked per kind, so a hedged call waits as long as its own kind takes.
+        """
+        return self._submit(self._complete(prompt, system, False, tiers, keys, timeout, hedge, kind)).result()
+
+    def complete_json(self, prompt, system=None, tiers=None, keys=None, timeout=None, hedge=None, kind=None) -> LLMResult:
+        """Like complete, in JSON mode; a reply that doesn't parse counts as a failed tier."""
+        return self._submit(self._complete(prompt, system, True, tiers, keys, timeout, hedge, kind)).result()
+
+    def complete_many(self, prompts, system=None, tiers=None, keys=None, timeout=None, hedge=None, concurrency=None, kind=None) -> list:
+        """Blocking completion of several prompts side by side, at most `concurrency`
+        in flight. Returns one LLMResult per prompt, in order, or the LLMError
+        that prompt ended with."""
+        async def run():
+            limit = asyncio.Semaphore(max(1, concurrency or len(prompts) or 1))
+
+            async def one(prompt):
+                async with limit:
+                    return await self._complete(prompt, system, False, tiers, keys, timeout, hedge, kind)
+
+            return await asyncio.gather(*(one(p) for p in prompts), return_exceptions=True)
+
+        results = self._submit(run()).result()
+        for result in results:
+            if isinstance(result, BaseException) and not isinstance(result, LLMError):
+                raise result
+        return results
+
+    async def acomplete(self, prompt, system=None, tiers=None, keys=None, timeout=None, hedge=None, kind=None) -> LLMResult:
+        return await asyncio.wrap_future(self._submit(self._complete(prompt, system, False, tiers, keys, timeout, hedge, kind)))
+
+    async def acomplete_json(self, prompt, system=None, tiers=None, keys=None, timeout=None, hedge=None, kind=None) -> LLMResult:
+        return await asyncio.wrap_future(self._submit(self._complete(prompt, system, True, tiers, keys, timeout, hedge, kind)))
+
+
+default_llm_gateway = LLMGateway()
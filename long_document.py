@@ -0,0 +1,130 @@
+import os
+import re
+
+from llm_gateway import default_llm_gateway, LLMError
+
+# Characters of source text per map call
+DEFAULT_CHUNK_CHARS = int(os.getenv("LONG_DOC_CHUNK_CHARS", 8000))
+# Past this many chunks, chunks grow instead, so the map step stays one or two waves
+DEFAULT_MAX_CHUNKS = int(os.getenv("LONG_DOC_MAX_CHUNKS", 16))
+# Map calls in flight at once
+DEFAULT_MAP_CONCURRENCY = int(os.getenv("LONG_DOC_CONCURRENCY", 8))
+# Reduce rounds before the notes are cut to the budget as they are
+MAX_REDUCE_ROUNDS = 3
+# Rough characters per word, to turn a character budget into a word limit for the model
+CHARS_PER_WORD = 7
+
+# Break points tried in order when a chunk has to end: paragraph, line, sentence, word
+_BREAKS = (re.compile(r"\n\s*\n"), re.compile(r"\n"), re.compile(r"(?<=[.!?])\s+"), re.compile(r"\s+"))
+
+MAP_PROMPT = """
+You are reading part {part} of {parts} of a long document.
+Extract {focus} from this part as concise bullet points, at most {words} words in total.
+Keep concrete facts, figures, names, quotes and arguments. Skip navigation, ads, cookie notices and other page boilerplate.
+If the part has nothing relevant, return nothing.
+
+Part {part}:
+{chunk}
+"""
+
+REDUCE_PROMPT = """
+Below are notes taken part by part from one long document, in document order.
+Merge them into one set of concise bullet points on {focus}, at most {words} words in total.
+Drop what the parts repeat; keep concrete facts, figures, names, quotes and arguments, in document order.
+
+Notes:
+{notes}
+"""
+
+
+def split_chunks(text, size) -> list:
+    """Split text into chunks of at most `size` characters, ending each one at the
+    strongest natural break (paragraph, line, sentence, word) in its second half."""
+    chunks = []
+    start = 0
+    while len(text) - start > size:
+        end = start + size
+        window = text[start + size // 2:end]
+        for pattern in _BREAKS:
+            found = [m.end() for m in pattern.finditer(window)]
+            if found:
+                end = start + size // 2 + found[-1]
+                break
+        chunks.append(text[start:end].strip())
+        start = end
+    chunks.append(text[start:].strip())
+    return [chunk for chunk in chunks if chunk]
+
+
+class DocumentCondenser:
+    """Map-reduce for documents longer than a prompt's content budget.
+
+    The full text is split into chunks and every chunk is condensed to key
+    points by its own LLM call (the map, run side by side through the
+    gateway). Notes that together still overflow the budget are merged by
+    one more call (the reduce), or mapped again if they are too long for
+    one. After MAX_REDUCE_ROUNDS the notes are cut to the budget. With the
+    fan-out bounded by the concurrency, a 100KB article costs about as long
+    as two or three calls.
+    """
+
+    def __init__(self, gateway=None, chunk_chars=None, max_chunks=None, concurrency=None):
+        self.gateway = gateway or default_llm_gateway
+        self.chunk_chars = chunk_chars or DEFAULT_CHUNK_CHARS
+        self.max_chunks = max(1, max_chunks or DEFAULT_MAX_CHUNKS)
+        self.concurrency = concurrency or DEFAULT_MAP_CONCURRENCY
+
+    def condense(self, text, budget, focus="the key points", keys=None) -> str:
+        """`text` itself if it fits in `budget` characters, else notes on all of it that do."""
+        text = str(text or "")
+        if len(text) <= budget:
+            return text
+        notes = self._map(text, budget, focus, keys)
+        for _ in range(MAX_REDUCE_ROUNDS):
+            if len(notes) <= budget:
+                return notes
+            if len(notes) > self.chunk_chars:
+                notes = self._map(notes, budget, focus, keys)
+                continue
+            reduced = self._reduce(notes, budget, focus, keys)
+            if reduced is None:
+                break
+            notes = reduced
+        if len(notes) <= budget:
+            return notes
+        print(f"  ⚠️ Notes still {len(notes)} chars, cut to {budget}")
+        return split_chunks(notes, budget)[0]
+
+    def _reduce(self, notes, budget, focus, keys):
+        """One call merging the notes into at most `budget` characters; None if it failed."""
+        prompt = REDUCE_PROMPT.format(focus=focus, words=max(30, budget // CHARS_PER_WORD), notes=notes)
+        print(f"📚 Merging {len(notes)} chars of notes")
+        try:
+            result = self.gateway.complete(prompt, keys=keys, timeout=30, kind="reduce_notes")
+        except LLMError as e:
+            print(f"  ⚠️ Notes not merged: {e}")
+            return None
+        return result.text.strip() or None
+
+    def _map(self, text, budget, focus, keys) -> str:
+        size = max(self.chunk_chars, -(-len(text) // self.max_chunks))
+        chunks = split_chunks(text, size)
+        share = budget // len(chunks)
+        words = max(30, share // CHARS_PER_WORD)
+        prompts = [MAP_PROMPT.format(part=i + 1, parts=len(chunks), focus=focus, words=words, chunk=chunk)
+                   for i, chunk in enumerate(chunks)]
+        print(f"📚 Condensing {len(text)} chars in {len(chunks)} chunks")
+        results = self.gateway.complete_many(prompts, keys=keys, timeout=30, concurrency=self.concurrency, kind="map_chunk")
+
+        notes = []
+        for i, (chunk, result) in enumerate(zip(chunks, results)):
+            if isinstance(result, LLMError):
+                # Keep the part in the picture, if only by its opening
+                print(f"  ⚠️ Chunk {i + 1} not condensed: {result}")
+                notes.append(chunk[:share])
+            else:
+                notes.append(result.text.strip())
+        return "\n\n".join(note for note in notes if note)
+
+
+default_condenser = DocumentCondenser()
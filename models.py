@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, func
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Float, ForeignKey, Index, func
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -28,6 +28,11 @@ class ListenLaterItem(Base):
     source = Column(String) # e.g., "Trending", "Manual"
     added_at = Column(DateTime(timezone=True), server_default=func.now())
     is_processed = Column(Boolean, default=False)
+    summary = Column(Text, nullable=True)
+    episode_id = Column(Integer, ForeignKey("episodes.id"), nullable=True) # Episode pre-generated for this item
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+    prefetch_attempts = Column(Integer, default=0)
+    prefetch_error = Column(Text, nullable=True)
 
 class User(Base):
     __tablename__ = "users"
@@ -49,3 +54,28 @@ class Comment(Base):
     # Relationships
     user = relationship("User")
     episode = relationship("Episode")
+
+class LLMCacheEntry(Base):
+    __tablename__ = "llm_cache"
+
+    key = Column(String, primary_key=True) # Hash of kind, models and normalized prompt inputs
+    kind = Column(String, index=True) # "script", "persona", "fact_check"
+    provider = Column(String, nullable=True) # Tier that produced the response
+    response = Column(Text) # JSON string
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(Float, index=True) # Unix time
+
+class Article(Base):
+    __tablename__ = "articles"
+    # Trending pages: newest first, overall or for one source
+    __table_args__ = (Index("ix_articles_source_published", "source", "published_at"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    url = Column(String, unique=True, index=True)
+    title = Column(String)
+    source = Column(String) # Feed title, e.g. "TechCrunch"
+    feed_url = Column(String, index=True)
+    summary = Column(Text, nullable=True)
+    image = Column(String, nullable=True)
+    published_at = Column(DateTime(timezone=True), index=True) # UTC; when the feed gives none, when first seen
+    first_seen_at = Column(DateTime(timezone=True), server_default=func.now())
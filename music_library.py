@@ -0,0 +1,75 @@
+import threading
+from pathlib import Path
+from pydub import AudioSegment
+
+from audio_mixer import TiledLoop, to_samples
+from episode_plan import VIBES
+from episode_stream import normalize
+
+MUSIC_DIR = Path(__file__).resolve().parent / "music"
+
+
+class MusicLibrary:
+    """Music beds decoded once and kept in memory in the mix format.
+
+    Each vibe's loop (music/<vibe>.mp3) is decoded on first use, converted to
+    the output sample rate / channels, and pre-tiled for the NumPy mixer: the
+    loop is repeated one mix block past its end, so the bed under any window
+    of any episode is a slice of that one buffer, whatever the episode length.
+    A file whose mtime or size changes is decoded again on the next call;
+    a deleted file drops out of the library.
+    """
+
+    def __init__(self, music_dir=MUSIC_DIR, vibes=VIBES):
+        self.music_dir = Path(music_dir)
+        self.vibes = list(vibes)
+        self._lock = threading.Lock()
+        self._entries = {}  # vibe -> (signature, AudioSegment, TiledLoop)
+        self.decodes = 0
+
+    def _path(self, vibe) -> Path:
+        return self.music_dir / f"{vibe.lower()}.mp3"
+
+    def _refresh(self):
+        # Decoding happens under the lock, so concurrent renders wait for one decode
+        with self._lock:
+            for vibe in self.vibes:
+                path = self._path(vibe)
+                try:
+                    stat = path.stat()
+                except OSError:
+                    self._entries.pop(vibe, None)
+                    continue
+                signature = (stat.st_mtime_ns, stat.st_size)
+                entry = self._entries.get(vibe)
+                if entry and entry[0] == signature:
+                    continue
+                try:
+                    loop = normalize(AudioSegment.from_mp3(path))
+                except Exception as e:
+                    print(f"⚠️ Failed to load music bed {path.name}: {e}")
+                    self._entries.pop(vibe, None)
+                    continue
+                self.decodes += 1
+                tiled = TiledLoop(to_samples(loop)) if len(loop) > 0 else None
+                self._entries[vibe] = (signature, loop, tiled)
+            return dict(self._entries)
+
+    def loops(self) -> dict:
+        """{vibe: AudioSegment} for the pydub mixer."""
+        return {vibe: loop for vibe, (_, loop, _) in self._refresh().items()}
+
+    def beds(self) -> dict:
+        """{vibe: TiledLoop} for the NumPy mixer."""
+        return {vibe: tiled for vibe, (_, _, tiled) in self._refresh().items() if tiled is not None}
+
+    def files(self) -> dict:
+        """{vibe: Path} of the loop files on disk, for renderers that decode them themselves."""
+        return {vibe: self._path(vibe) for vibe in self.vibes if self._path(vibe).exists()}
+
+    def preload(self):
+        entries = self._refresh()
+        print(f"🎵 Music beds ready: {', '.join(entries) or 'none'}")
+
+
+default_music_library = MusicLibrary()
@@ -1,40 +1,166 @@
+import os
+import time
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import feedparser
-import random
+import requests
+
+# (connect, read) seconds per feed request
+FEED_TIMEOUT = (5, 15)
+# Feeds fetched side by side during a poll
+FEED_FETCH_WORKERS = int(os.getenv("FEED_FETCH_WORKERS", 8))
+
+
+def load_feeds(default) -> list:
+    """Feed URLs from NEWS_FEEDS (comma-separated) or NEWS_FEEDS_FILE (one per line, # comments), else `default`."""
+    path = os.getenv("NEWS_FEEDS_FILE")
+    feeds = []
+    if path:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                feeds = [line.split("#", 1)[0].strip() for line in f]
+        except OSError as e:
+            print(f"⚠️ Could not read NEWS_FEEDS_FILE, using the default feeds: {e}")
+    else:
+        feeds = os.getenv("NEWS_FEEDS", "").split(",")
+    feeds = list(dict.fromkeys(feed.strip() for feed in feeds if feed.strip()))
+    return feeds or list(default)
+
 
 class NewsAggregator:
+    """Fetches the configured news feeds into article dicts, for the FeedPoller.
+
+    Feeds are fetched side by side with the ETag / Last-Modified validators
+    of their last fetch, so an unchanged feed costs a 304 and is skipped.
+    There is only ever one fetch per feed in flight: refresh() hands a second
+    caller the running one.
+    """
+
     FEEDS = [
         "https://techcrunch.com/feed/",
         "https://www.theverge.com/rss/index.xml",
         "https://www.wired.com/feed/rss"
     ]
 
-    def get_trending(self, limit=10):
-        all_entries = []
-        for url in self.FEEDS:
+    def __init__(self, feeds=None, workers=None):
+        self.feeds = list(feeds or load_feeds(self.FEEDS))
+        self._session = requests.Session()
+        self._session.headers["User-Agent"] = f"feedparser/{feedparser.__version__} +https://github.com/kurtmckee/feedparser/"
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers or FEED_FETCH_WORKERS), thread_name_prefix="feed")
+        self._lock = threading.Lock()
+        self._feeds = {}       # feed url -> {"etag", "last_modified", "fetched_at", "checked_at", "articles", "error"}
+        self._refreshing = {}  # feed url -> Future of its fetch
+        self.fetched = 0
+        self.not_modified = 0
+        self.failed = 0
+
+    def fetch_all(self) -> dict:
+        """Fetch every feed; maps each feed that changed to its articles. Unchanged and failed feeds are left out."""
+        futures = [(url, self.refresh(url)) for url in self.feeds]
+        results = ((url, future.result()) for url, future in futures)
+        return {url: articles for url, articles in results if articles is not None}
+
+    def refresh(self, url):
+        """Start fetching one feed unless it is being fetched already; returns the Future of its articles."""
+        with self._lock:
+            future = self._refreshing.get(url)
+            if future is None:
+                future = self._refreshing[url] = self._executor.submit(self._refresh, url)
+            return future
+
+    def invalidate(self, url):
+        """Drop a feed's validators, so its next fetch is a full one (e.g. after its articles were lost)."""
+        with self._lock:
+            state = self._feeds.get(url)
+            if state:
+                state.pop("etag", None)
+                state.pop("last_modified", None)
+
+    def _refresh(self, url):
+        try:
+            with self._lock:
+                state = dict(self._feeds.get(url) or {})
             try:
-                feed = feedparser.parse(url)
-                for entry in feed.entries[:5]: # Get top 5 from each
-                    # Extract image if available
-                    image = None
-                    if 'media_content' in entry:
-                        image = entry.media_content[0]['url']
-                    elif 'links' in entry:
-                         for link in entry.links:
-                             if link.type.startswith('image/'):
-                                 image = link.href
-                                 break
-                    
-                    all_entries.append({
-                        "title": entry.title,
-                        "url": entry.link,
-                        "source": feed.feed.title if 'title' in feed.feed else "Unknown Source",
-                        "summary": entry.summary[:200] + "..." if 'summary' in entry else "",
-                        "published": entry.published if 'published' in entry else "",
-                        "image": image
-                    })
+                articles = self._fetch(url, state)
             except Exception as e:
                 print(f"Error parsing feed {url}: {e}")
-        
-        # Shuffle to mix sources
-        random.shuffle(all_entries)
-        return all_entries[:limit]
+                with self._lock:
+                    self.failed += 1
+                articles = None
+                state["error"] = str(e)
+            state["checked_at"] = time.time()
+            with self._lock:
+                self._feeds[url] = state
+            return articles
+        finally:
+            with self._lock:
+                del self._refreshing[url]
+
+    def _fetch(self, url, state):
+        headers = {}
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
+        response = self._session.get(url, headers=headers, timeout=FEED_TIMEOUT)
+        if response.status_code == 304:
+            with self._lock:
+                self.not_modified += 1
+            state["error"] = None
+            return None
+        response.raise_for_status()
+
+        feed = feedparser.parse(response.content)
+        source = feed.feed.title if 'title' in feed.feed else "Unknown Source"
+        articles = [self._article(entry, source, url) for entry in feed.entries if entry.get('link')]
+        with self._lock:
+            self.fetched += 1
+        state.update(etag=response.headers.get("ETag"), last_modified=response.headers.get("Last-Modified"),
+                     fetched_at=time.time(), articles=len(articles), error=None)
+        return articles
+
+    @staticmethod
+    def _article(entry, source, feed_url) -> dict:
+        # Extract image if available
+        image = None
+        if 'media_content' in entry:
+            image = entry.media_content[0]['url']
+        elif 'links' in entry:
+            for link in entry.links:
+                if link.get('type', '').startswith('image/'):
+                    image = link.href
+                    break
+
+        now = datetime.datetime.now(datetime.timezone.utc)
+        parsed = entry.get('published_parsed') or entry.get('updated_parsed')
+        published_at = datetime.datetime(*parsed[:6], tzinfo=datetime.timezone.utc) if parsed else now
+
+        return {
+            "title": entry.get('title', ''),
+            "url": entry.link,
+            "source": source,
+            "feed_url": feed_url,
+            "summary": entry.summary[:200] + "..." if 'summary' in entry else "",
+            # A date in the future would pin the story to the top
+            "published_at": min(published_at, now),
+            "image": image
+        }
+
+    def stats(self) -> dict:
+        now = time.time()
+        with self._lock:
+            return {
+                "feeds": {url: {
+                    "articles": state.get("articles"),
+                    "age_seconds": round(now - state["fetched_at"], 1) if state.get("fetched_at") else None,
+                    "checked_seconds_ago": round(now - state["checked_at"], 1),
+                    "error": state.get("error")
+                } for url, state in self._feeds.items()},
+                "configured": len(self.feeds),
+                "refreshing": list(self._refreshing),
+                "fetched": self.fetched,
+                "not_modified": self.not_modified,
+                "failed": self.failed
+            }
@@ -0,0 +1,136 @@
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from pydub import AudioSegment
+
+from segmenter import plan_batches, join_pieces, cut_at_pauses
+
+# Lines synthesized side by side. Provider caps still apply on top of this
+# (see DEFAULT_ENGINE_CONCURRENCY in tts_converter).
+DEFAULT_TTS_WORKERS = int(os.getenv("TTS_WORKERS", 4))
+# Container for intermediate segments: "wav" (raw PCM from the engines) or "mp3"
+DEFAULT_SEGMENT_FORMAT = os.getenv("TTS_SEGMENT_FORMAT", "wav")
+
+
+class ParallelSynthesizer:
+    """Sends script lines to the TTS engines through a bounded worker pool.
+
+    Lines pass through the segmenter first: long lines go out as several
+    sentence-sized requests, runs of short same-speaker lines as one.
+    With audio_format "wav", engines are asked for raw PCM, so segments are
+    never MP3-encoded and decode without spawning ffmpeg.
+    """
+
+    def __init__(self, converter, max_workers=None, use_cache=True, max_chars=None, merge_under=None, audio_format=None):
+        self.converter = converter
+        self.max_workers = max(1, max_workers or DEFAULT_TTS_WORKERS)
+        self.use_cache = use_cache
+        self.max_chars = max_chars
+        self.merge_under = merge_under
+        self.audio_format = audio_format or DEFAULT_SEGMENT_FORMAT
+
+    def _iter_batches(self, segments, output_dir):
+        """Yield (batch, request_files) in script order as each batch completes.
+
+        At most 2 x max_workers TTS requests are in flight at once.
+        """
+        window = self.max_workers * 2
+        ext = self.audio_format
+
+        def _run(segment, audio_file):
+            self.converter.synthesize_segment(segment, str(audio_file), use_cache=self.use_cache)
+            return audio_file
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="tts")
+        pending = deque()  # (batch, futures) in script order
+        in_flight = 0
+        try:
+            for batch in plan_batches(segments, self.max_chars, self.merge_under):
+                first = batch.lines[0][0]
+                if batch.is_direct:
+                    files = [output_dir / f"segment_{first:03d}.{ext}"]
+                else:
+                    files = [output_dir / f"request_{first:03d}_{n}.{ext}" for n in range(len(batch.requests))]
+                futures = [executor.submit(_run, request, f) for request, f in zip(batch.requests, files)]
+                pending.append((batch, futures))
+                in_flight += len(futures)
+                while in_flight >= window:
+                    batch, futures = pending.popleft()
+                    in_flight -= len(futures)
+                    yield batch, [future.result() for future in futures]
+            while pending:
+                batch, futures = pending.popleft()
+                yield batch, [future.result() for future in futures]
+        finally:
+            # Stop queued requests if the caller bails out or a request failed
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    @staticmethod
+    def _batch_audio(batch, files) -> list:
+        """Decoded audio for each line of a finished batch (None for a line with no audio)."""
+        if batch.is_merged:
+            return cut_at_pauses(AudioSegment.from_file(str(files[0])), batch.weights())
+        if batch.is_direct:
+            audio_file = files[0]
+            if not (audio_file.exists() and audio_file.stat().st_size > 0):
+                return [None]
+            return [AudioSegment.from_file(str(audio_file))]
+        return [join_pieces(files)]
+
+    def iter_synthesize(self, segments, output_dir, on_progress=None):
+        """Yield (index, audio_file) in script order, one file per line.
+
+        `segments` is any iterable of ScriptSegments; it is consumed lazily. A
+        line is yielded as soon as it and every line before it are done.
+        `on_progress(done, total, index, speaker)` fires as each line is ready;
+        `total` is None when the iterable has no len().
+        """
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        total = len(segments) if hasattr(segments, "__len__") else None
+        done = 0
+        for batch, files in self._iter_batches(segments, output_dir):
+            if batch.is_direct:
+                outputs = files
+            else:
+                outputs = [output_dir / f"segment_{index:03d}.{self.audio_format}" for index, _ in batch.lines]
+                for part, audio_file in zip(self._batch_audio(batch, files), outputs):
+                    part.export(str(audio_file), format=self.audio_format)
+                for request_file in files:
+                    os.remove(request_file)
+            for (index, segment), audio_file in zip(batch.lines, outputs):
+                done += 1
+                if on_progress:
+                    on_progress(done, total, index, segment.speaker)
+                yield index, audio_file
+
+    def iter_audio(self, segments, output_dir, on_progress=None):
+        """Like iter_synthesize, but yield (index, AudioSegment) and delete the work files.
+
+        Lines that produced no audio (e.g. nothing left after cleaning) are skipped.
+        """
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        total = len(segments) if hasattr(segments, "__len__") else None
+        done = 0
+        for batch, files in self._iter_batches(segments, output_dir):
+            parts = self._batch_audio(batch, files)
+            for request_file in files:
+                if request_file.exists():
+                    os.remove(request_file)
+            for (index, segment), audio in zip(batch.lines, parts):
+                done += 1
+                if on_progress:
+                    on_progress(done, total, index, segment.speaker)
+                if audio is not None:
+                    yield index, audio
+
+    def synthesize(self, segments, output_dir, on_progress=None) -> list:
+        """Synthesize every line and return [(index, audio_file)] in script order."""
+        return list(self.iter_synthesize(segments, output_dir, on_progress))
+
+
+def print_progress(done, total, index, speaker):
+    """Default per-line progress reporter for console runs."""
+    print(f"  ✓ TTS line {index + 1} ({speaker}) ready [{done}/{total if total is not None else '?'}]")
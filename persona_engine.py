@@ -1,31 +1,42 @@
-import os
-import requests
 from scraper import WebScraper
+from llm_gateway import default_llm_gateway
+from llm_cache import default_llm_cache
+from long_document import default_condenser
 
 class PersonaEngine:
+    # Characters of the profile page the prompt carries
+    CONTENT_LIMIT = 3000
+
     def __init__(self):
         self.scraper = WebScraper()
-        self.api_key = os.environ.get('CEREBRAS_API_KEY')
         
-    def extract_persona(self, url):
+    def extract_persona(self, url, keys=None, force_fresh=False, long_document=False, crawlbase_key=None):
         if not url:
             return None
+
+        # Keyed by URL, so a hit skips the scrape as well as the LLM call
+        key = default_llm_cache.make_key("persona", default_llm_gateway.models(), url=url.strip(), long_document=bool(long_document))
+        if force_fresh:
+            default_llm_cache.skip("persona")
+        else:
+            cached = default_llm_cache.get("persona", key)
+            if cached is not None:
+                return cached
             
         try:
             # Step 1: Scrape content
-            content = self.scraper.scrape(url)
+            scraper = WebScraper(crawlbase_key) if crawlbase_key else self.scraper
+            content = scraper.scrape(url, force_fresh=force_fresh)
+            if long_document:
+                # Notes on the whole page rather than its first few thousand characters
+                content = default_condenser.condense(content, self.CONTENT_LIMIT, focus="what the text says about the person: background, expertise, speaking style and views", keys=keys)
             
             # Step 2: Extract traits using LLM
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
             prompt = f"""
             Analyze the following text from a person's profile/wiki and extract their AI persona traits for a podcast.
             
             Content:
-            {content[:3000]}
+            {content[:self.CONTENT_LIMIT]}
             
             Return ONLY a JSON object with:
             - "name": Full Name
@@ -35,21 +46,10 @@ class PersonaEngine:
             - "likely_opinions": 2-3 specific views they might hold based on the text.
             """
             
-            data = {
-                "model": "llama3.1-8b",
-                "messages": [
-                    {"role": "system", "content": "You are an expert profile analyst that outputs raw JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                "response_format": {"type": "json_object"}
-            }
-            
-            response = requests.post("https://api.cerebras.ai/v1/chat/completions", headers=headers, json=data)
-            if response.status_code == 200:
-                import json
-                return json.loads(response.json()['choices'][0]['message']['content'])
-            else:
-                return None
+            system = "You are an expert profile analyst that outputs raw JSON."
+            result = default_llm_gateway.complete_json(prompt, system=system, keys=keys, kind="persona")
+            default_llm_cache.put("persona", key, result.data, provider=result.provider)
+            return result.data
         except Exception as e:
             print(f"Persona extraction error: {e}")
             return None
@@ -0,0 +1,124 @@
+import os
+import threading
+import time
+import traceback
+
+# LISTEN_LATER_PREFETCH=0 turns pre-generation off
+PREFETCH_ENABLED = os.getenv("LISTEN_LATER_PREFETCH", "1") == "1"
+# Seconds between looks at the queue when nothing wakes the prefetcher sooner
+PREFETCH_INTERVAL = float(os.getenv("PREFETCH_INTERVAL_SECONDS", 60))
+# Failed items are retried on later passes until they have failed this often
+PREFETCH_MAX_ATTEMPTS = int(os.getenv("PREFETCH_MAX_ATTEMPTS", 3))
+# TTS lines in flight for a background episode (foreground requests default to TTS_WORKERS)
+PREFETCH_TTS_WORKERS = int(os.getenv("PREFETCH_TTS_WORKERS", 1))
+# Scheduler niceness of the prefetch thread and everything it starts (TTS threads, ffmpeg)
+PREFETCH_NICENESS = int(os.getenv("PREFETCH_NICENESS", 10))
+
+
+class ActivityCounter:
+    """Counts work in progress: `with counter:` around each foreground generation."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.active = 0
+
+    def __enter__(self):
+        with self._lock:
+            self.active += 1
+        return self
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self.active -= 1
+
+
+foreground_activity = ActivityCounter()
+
+
+class ListenLaterPrefetcher:
+    """Generates episodes for the Listen Later queue ahead of time, one at a time.
+
+    Runs on one background thread at lowered priority. It waits for foreground
+    generations to finish before it starts an item, and runs TTS with few
+    workers. generate(url) runs the normal pipeline and returns its response;
+    the episode is then linked to the item, which is marked processed.
+    """
+
+    def __init__(self, history, idle=None, interval=None, max_attempts=None):
+        self.history = history
+        self.idle = idle or (lambda: foreground_activity.active == 0)
+        self.interval = interval if interval is not None else PREFETCH_INTERVAL
+        self.max_attempts = max_attempts if max_attempts is not None else PREFETCH_MAX_ATTEMPTS
+        self._wake = threading.Event()
+        self._thread = None
+        self.current = None
+        self.processed = 0
+        self.failed = 0
+        self.last_error = None
+
+    def start(self, generate):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, args=(generate,), name="listen-later-prefetch", daemon=True)
+        self._thread.start()
+
+    def wake(self):
+        """Look at the queue now rather than at the next interval."""
+        self._wake.set()
+
+    def _lower_priority(self):
+        try:
+            # Per thread on Linux; threads and processes started from here inherit it
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), PREFETCH_NICENESS)
+        except (AttributeError, OSError):
+            pass
+
+    def _run(self, generate):
+        self._lower_priority()
+        while True:
+            try:
+                item = self.history.next_listen_later_to_prefetch(self.max_attempts)
+            except Exception as e:
+                print(f"❌ Reading the Listen Later queue failed: {e}")
+                item = None
+            if item is None or not self._prefetch(item, generate):
+                # Nothing to do, or a failure that may be transient: wait for the next pass
+                self._wake.wait(self.interval)
+                self._wake.clear()
+
+    def _prefetch(self, item, generate) -> bool:
+        while not self.idle():
+            time.sleep(1)
+
+        self.current = item
+        print(f"📥 Pre-generating Listen Later item {item['id']}: {item['url']}")
+        started = time.perf_counter()
+        try:
+            result = generate(item['url'])
+            self.history.mark_listen_later_processed(item['id'], result['id'])
+        except Exception as e:
+            detail = getattr(e, "detail", None) or str(e)
+            print(f"❌ Pre-generating Listen Later item {item['id']} failed: {detail}")
+            traceback.print_exc()
+            self.failed += 1
+            self.last_error = detail
+            try:
+                self.history.record_listen_later_failure(item['id'], detail)
+            except Exception:
+                pass
+            return False
+        finally:
+            self.current = None
+        self.processed += 1
+        print(f"📥 Listen Later item {item['id']} ready as episode {result['id']} ({time.perf_counter() - started:.1f}s)")
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "current": self.current,
+            "pending": self.history.count_listen_later_pending(self.max_attempts),
+            "processed": self.processed,
+            "failed": self.failed,
+            "last_error": self.last_error
+        }
@@ -0,0 +1,178 @@
+import os
+import json
+import gzip
+import time
+import hashlib
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+
+# Pages are served from the cache without a request for this long (SCRAPE_CACHE_TTL_SECONDS, default 6 h)...
+DEFAULT_SCRAPE_TTL = int(os.getenv("SCRAPE_CACHE_TTL_SECONDS", 6 * 3600))
+# ...then revalidated; entries not refreshed for this long are deleted by sweep() (default 7 days)
+DEFAULT_SCRAPE_MAX_AGE = int(os.getenv("SCRAPE_CACHE_MAX_AGE_SECONDS", 7 * 24 * 3600))
+
+
+class ScrapeCache:
+    """URL-keyed on-disk cache of scraped pages, shared by every WebScraper.
+
+    Each entry is the gzipped page plus a JSON sidecar with its fetch time,
+    HTTP validators (ETag / Last-Modified) and extracted article. Fresh
+    entries are served as they are. Stale ones are revalidated: the fetch
+    gets the validators, and a 304 just renews the entry. If revalidation
+    fails, the stale page is served rather than an error. Concurrent fetches
+    of one URL share a single request (single-flight).
+    """
+
+    def __init__(self, cache_dir=None, ttl=None, max_age=None):
+        self.cache_dir = Path(cache_dir) if cache_dir else BASE_DIR / "history" / "scrape_cache"
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl if ttl is not None else DEFAULT_SCRAPE_TTL
+        self.max_age = max_age if max_age is not None else DEFAULT_SCRAPE_MAX_AGE
+
+        self._lock = threading.Lock()
+        self._inflight = {}  # key -> Future of the entry being fetched
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0   # stale, answered 304
+        self.refreshed = 0     # stale, fetched again
+        self.stale_served = 0  # stale, fetch failed
+        self.collapsed = 0     # waited on another caller's fetch
+
+    @staticmethod
+    def make_key(url) -> str:
+        return hashlib.sha256(url.strip().encode("utf-8")).hexdigest()
+
+    def _paths(self, key):
+        return self.cache_dir / f"{key}.json", self.cache_dir / f"{key}.html.gz"
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def get(self, url, fetch, force_fresh=False) -> dict:
+        """The entry for `url`: {"url", "html", "fetched_at", "etag", "last_modified", "extracted"}.
+
+        fetch(url, validators) does the download: it returns the new entry's
+        fields (html, etag, last_modified, extracted), or None when the server
+        says the page is unchanged (304). force_fresh skips the cache and the
+        validators, but still shares an in-flight fetch.
+        """
+        key = self.make_key(url)
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+            else:
+                self.collapsed += 1
+        if not leader:
+            return future.result()
+
+        try:
+            entry = self._get(key, url, fetch, force_fresh)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(entry)
+            return entry
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def _get(self, key, url, fetch, force_fresh):
+        entry = None if force_fresh else self._read(key)
+        if entry and time.time() - entry["fetched_at"] < self.ttl:
+            self._count("hits")
+            return entry
+        if entry is None:
+            self._count("misses")
+            return self._write(key, {"url": url, **fetch(url, {})})
+
+        validators = {k: entry[k] for k in ("etag", "last_modified") if entry.get(k)}
+        try:
+            fields = fetch(url, validators)
+        except Exception as e:
+            print(f"  ⚠️ Revalidating {url} failed, serving the cached page: {e}")
+            self._count("stale_served")
+            return entry
+        if fields is None:
+            self._count("revalidated")
+            entry["fetched_at"] = time.time()
+            meta_path, _ = self._paths(key)
+            self._write_meta(meta_path, entry)
+            return entry
+        self._count("refreshed")
+        return self._write(key, {"url": url, **fields})
+
+    def _read(self, key):
+        meta_path, html_path = self._paths(key)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            with gzip.open(html_path, "rt", encoding="utf-8") as f:
+                entry["html"] = f.read()
+            return entry
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, meta_path, entry):
+        meta = {k: v for k, v in entry.items() if k != "html"}
+        tmp = meta_path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp, meta_path)
+
+    def _write(self, key, entry):
+        entry["fetched_at"] = time.time()
+        meta_path, html_path = self._paths(key)
+        tmp = html_path.with_suffix(f".{threading.get_ident()}.tmp")
+        try:
+            with gzip.open(tmp, "wt", encoding="utf-8") as f:
+                f.write(entry.get("html") or "")
+            os.replace(tmp, html_path)
+            self._write_meta(meta_path, entry)
+        except OSError as e:
+            print(f"  ⚠️ Scrape cache write failed: {e}")
+            try: os.remove(tmp)
+            except OSError: pass
+        return entry
+
+    def sweep(self) -> int:
+        """Delete entries not refreshed within max_age. Returns how many went."""
+        cutoff = time.time() - self.max_age
+        removed = 0
+        for meta_path in self.cache_dir.glob("*.json"):
+            try:
+                if meta_path.stat().st_mtime >= cutoff:
+                    continue
+                meta_path.unlink()
+                (self.cache_dir / f"{meta_path.stem}.html.gz").unlink(missing_ok=True)
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def stats(self) -> dict:
+        files = list(self.cache_dir.glob("*.html.gz"))
+        with self._lock:
+            lookups = self.hits + self.misses + self.revalidated + self.refreshed + self.stale_served
+            served = self.hits + self.revalidated + self.stale_served
+            return {
+                "entries": len(files),
+                "bytes": sum(p.stat().st_size for p in files if p.exists()),
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidated": self.revalidated,
+                "refreshed": self.refreshed,
+                "stale_served": self.stale_served,
+                "collapsed": self.collapsed,
+                "hit_rate": round(served / lookups, 4) if lookups else 0.0
+            }
+
+
+default_scrape_cache = ScrapeCache()
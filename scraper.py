@@ -1,37 +1,105 @@
 import os
 import requests
+from requests.adapters import HTTPAdapter
 from urllib.parse import quote
 from dotenv import load_dotenv
 
+from content_extractor import ContentExtractor, ExtractedContent
+from scrape_cache import default_scrape_cache
+
 load_dotenv()
 
+# (connect, read) seconds per Crawlbase request; rendering a heavy page can take a while
+SCRAPE_TIMEOUT = (float(os.getenv("SCRAPE_CONNECT_TIMEOUT", 5)), float(os.getenv("SCRAPE_READ_TIMEOUT", 60)))
+# Keep-alive connections shared by every WebScraper
+SCRAPE_CONNECTIONS = int(os.getenv("SCRAPE_MAX_CONNECTIONS", 10))
+
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=SCRAPE_CONNECTIONS, pool_maxsize=SCRAPE_CONNECTIONS))
+
+
+class ScrapedPage:
+    """A fetched page: the raw HTML as served and its extracted article."""
+
+    def __init__(self, url, html, extracted: ExtractedContent):
+        self.url = url
+        self.html = html
+        self.extracted = extracted
+
+    @property
+    def text(self) -> str:
+        return self.extracted.text
+
 
 class WebScraper:
-    def __init__(self):
-        self.token = os.getenv('CRAWLBASE_API_KEY')
+    def __init__(self, token=None):
+        # A per-request token stays with its scraper; the environment is only the default
+        self.token = token or os.getenv('CRAWLBASE_API_KEY')
         self.base_url = "https://api.crawlbase.com/"
         
-    def scrape(self, url: str) -> str:
-        """Scrape content from a given URL using Crawlbase."""
+    def scrape(self, url: str, force_fresh=False) -> str:
+        """Scrape a URL and return its article as plain text (title, byline, body)."""
+        return self.fetch(url, force_fresh=force_fresh).text
+
+    def fetch(self, url: str, force_fresh=False) -> ScrapedPage:
+        """Scrape content from a given URL using Crawlbase, through the shared scrape cache.
+
+        force_fresh downloads the page again even if the cached copy is fresh."""
         try:
-            # Encode the target URL
-            encoded_url = quote(url, safe='')
-            # format=text or format=json can be used. We'll use default which returns HTML
-            # and then we could iterate, but simpler is to use Crawlbase's format=json if they support it
-            # or just get the HTML. 
-            # Actually, Crawlbase often returns the whole page.
-            
-            api_url = f"{self.base_url}?token={self.token}&url={encoded_url}"
-            response = requests.get(api_url)
-            response.raise_for_status()
-            
-            content = response.text
-            
-            if not content:
-                raise ValueError("No content extracted from URL")
-            
-            # Since Crawlbase returns HTML, we might want to strip tags for the LLM
-            # but usually modern LLMs handle HTML fine. For a cleaner prompt, we can do basic cleaning.
-            return content
+            entry = default_scrape_cache.get(url, self._download, force_fresh=force_fresh)
         except Exception as e:
-            raise Exception(f"Scraping failed: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Scraping failed: {str(e)}")
+
+        html = entry["html"]
+        extracted = ExtractedContent(**entry["extracted"])
+        if not extracted.body:
+            # Nothing recognisable as text (e.g. a script-rendered page): pass the page on as it came
+            print("  ⚠️ No article text found, using the raw page")
+            extracted.body = html
+        return ScrapedPage(url, html, extracted)
+
+    def _download(self, url, validators):
+        """Fetch a page for the scrape cache; None if the validators show it unchanged.
+
+        The HTML is parsed as it downloads, so extraction is done when the
+        last chunk arrives."""
+        # Encode the target URL
+        encoded_url = quote(url, safe='')
+        # format=text or format=json can be used. We'll use default which returns HTML
+        # and then we could iterate, but simpler is to use Crawlbase's format=json if they support it
+        # or just get the HTML. 
+        # Actually, Crawlbase often returns the whole page.
+        
+        api_url = f"{self.base_url}?token={self.token}&url={encoded_url}"
+        headers = {}
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+        with _session.get(api_url, headers=headers, stream=True, timeout=SCRAPE_TIMEOUT) as response:
+            if response.status_code == 304:
+                return None
+            response.raise_for_status()
+            response.encoding = response.encoding or "utf-8"
+
+            extractor = ContentExtractor()
+            raw = []
+            for chunk in response.iter_content(chunk_size=16384, decode_unicode=True):
+                raw.append(chunk)
+                extractor.feed(chunk)
+            extractor.close()
+            etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+        
+        html = "".join(raw)
+        if not html.strip():
+            raise ValueError("No content extracted from URL")
+        extracted = extractor.result()
+        if extracted.body:
+            print(f"🧾 Extracted {len(extracted.text)} chars of article from {len(html)} chars of HTML")
+        return {
+            "html": html,
+            "etag": etag,
+            "last_modified": last_modified,
+            "extracted": {"title": extracted.title, "byline": extracted.byline, "body": extracted.body}
+        }
@@ -0,0 +1,156 @@
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Speaker prefixes in script order of precedence -> voice key
+SPEAKER_PREFIXES = (
+    ("Host 1:", "male"),
+    ("Host 2:", "female"),
+    ("Guest:", "guest")
+)
+
+_MARKDOWN = re.compile(r'\*.*?\*')
+_TAGS = re.compile(r'\[.*?\]')
+
+# Every emotional cue we react to, matched in a single scan of the line
+_EMOTION_CUES = re.compile(
+    r'\[(laugh|chuckle|excit|energet|sad|sorrow|sigh|angr|frustrat|calm|whisper|nervous|scar)',
+    re.IGNORECASE
+)
+_CUE_CATEGORY = {
+    "laugh": "joy", "chuckle": "joy",
+    "excit": "excited", "energet": "excited",
+    "sad": "sad", "sorrow": "sad", "sigh": "sad",
+    "angr": "anger", "frustrat": "anger",
+    "calm": "calm", "whisper": "calm",
+    "nervous": "nervous", "scar": "nervous"
+}
+# (category, Cartesia emotion control, speed override), applied in this order
+_EMOTION_RULES = (
+    ("joy", "positivity:high", None),
+    ("excited", "curiosity:high", "fast"),
+    ("sad", "sadness:high", "slow"),
+    ("anger", "anger:high", None),
+    ("calm", "positivity:low", "slow"),
+    ("nervous", "anger:lowest", "fast")
+)
+# If no specific emotion detected, use neutral positive
+_NEUTRAL_EMOTION = ["positivity:medium", "curiosity:medium"]
+
+
+class ScriptSegment:
+    """One spoken line, pre-processed for every TTS engine."""
+
+    __slots__ = ("speaker", "text", "cartesia_text", "clean_text", "emotion", "line_index")
+
+    def __init__(self, speaker, text, cartesia_text, clean_text, emotion, line_index):
+        self.speaker = speaker
+        self.text = text                    # line without the speaker prefix
+        self.cartesia_text = cartesia_text  # markdown stripped, emotion tags kept
+        self.clean_text = clean_text        # markdown and [tags] stripped
+        self.emotion = emotion              # Cartesia controls: {"speed", "emotion"}
+        self.line_index = line_index        # index of the line in the source script
+
+    def __iter__(self):
+        # Unpacks like the legacy (speaker, text) tuples
+        return iter((self.speaker, self.text))
+
+    def __repr__(self):
+        return f"ScriptSegment({self.line_index}, {self.speaker!r}, {self.text[:40]!r})"
+
+
+def extract_emotion(text: str) -> dict:
+    """Map emotional cues like [laughs] or [whispers] to Cartesia controls."""
+    found = {_CUE_CATEGORY[m.group(1).lower()] for m in _EMOTION_CUES.finditer(text)}
+    emotion_controls = {"speed": "normal", "emotion": []}
+    for category, control, speed in _EMOTION_RULES:
+        if category in found:
+            emotion_controls["emotion"].append(control)
+            if speed:
+                emotion_controls["speed"] = speed
+    if not emotion_controls["emotion"]:
+        emotion_controls["emotion"] = list(_NEUTRAL_EMOTION)
+    return emotion_controls
+
+
+def parse_line(line: str):
+    """Split "Host 1: text" into ("male", "text"); None if the line has no speaker."""
+    line = line.strip()
+    for prefix, speaker in SPEAKER_PREFIXES:
+        if line.startswith(prefix):
+            return speaker, line.replace(prefix, "").strip()
+    return None
+
+
+def speakable(text: str) -> str:
+    """Text with markdown and [tags] stripped: what clean_text holds."""
+    return _MARKDOWN.sub('', _TAGS.sub('', text).strip()).strip()
+
+
+def _compile(speaker, text, line_index, emotion=None) -> ScriptSegment:
+    cartesia_text = _MARKDOWN.sub('', text).strip()
+    clean_text = speakable(text)
+    if emotion is None:
+        emotion = extract_emotion(text)
+    return ScriptSegment(speaker.lower(), text, cartesia_text, clean_text, emotion, line_index)
+
+
+def compile_line(text: str, speaker: str, line_index: int = 0) -> ScriptSegment:
+    """Compile a single line for `speaker`; a leading speaker prefix is stripped."""
+    parsed = parse_line(text)
+    if parsed:
+        text = parsed[1]
+    return _compile(speaker, text, line_index)
+
+
+def compile_script_line(line: str, line_index: int):
+    """ScriptSegment for one raw script line, None if the line has no speaker."""
+    parsed = parse_line(line)
+    return _compile(parsed[0], parsed[1], line_index) if parsed else None
+
+
+def derive_segment(segment: ScriptSegment, text: str) -> ScriptSegment:
+    """Segment for a piece (or a merge) of `segment`'s text, keeping its speaker, emotion and line index."""
+    return _compile(segment.speaker, text, segment.line_index, emotion=segment.emotion)
+
+
+def script_lines(script) -> list:
+    """Normalise a script (string, list of lines/dicts, or dict) to a list of lines."""
+    if isinstance(script, list):
+        return [str(item.get('text') if isinstance(item, dict) else item) for item in script]
+    if isinstance(script, dict):
+        return [str(v) for v in script.values()]
+    return str(script).strip().split('\n')
+
+
+def _hash_lines(lines) -> str:
+    return hashlib.sha256("\n".join(lines).encode("utf-8")).hexdigest()
+
+
+def script_hash(script) -> str:
+    return _hash_lines(script_lines(script))
+
+
+_compiled_cache = OrderedDict()
+_compiled_cache_lock = threading.Lock()
+COMPILED_CACHE_SIZE = 64
+
+
+def compile_script(script) -> tuple:
+    """Parse a script into ScriptSegments in one pass. Results are cached by script hash."""
+    lines = script_lines(script)
+    key = _hash_lines(lines)
+    with _compiled_cache_lock:
+        cached = _compiled_cache.get(key)
+        if cached is not None:
+            _compiled_cache.move_to_end(key)
+            return cached
+
+    segments = tuple(filter(None, (compile_script_line(line, i) for i, line in enumerate(lines))))
+
+    with _compiled_cache_lock:
+        _compiled_cache[key] = segments
+        while len(_compiled_cache) > COMPILED_CACHE_SIZE:
+            _compiled_cache.popitem(last=False)
+    return segments
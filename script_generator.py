@@ -1,8 +1,12 @@
-import os
-import requests
-import json
 from dotenv import load_dotenv
 
+import json
+
+from llm_gateway import default_llm_gateway, LLMError
+from llm_cache import default_llm_cache, normalize_text
+from long_document import default_condenser
+from script_stream import StreamedScript
+
 load_dotenv()
 
 class ScriptGenerator:
@@ -35,12 +39,14 @@ class ScriptGenerator:
         "deep_dive": "Length: Extensive (20+ exchanges). Deep philosophical exploration. Check every detail, discuss the future, and find obscure connections. This is a long-form podcast."
     }
 
-    def __init__(self):
-        self.gemini_key = os.environ.get('GEMINI_API_KEY')
-        self.cerebras_key = os.environ.get('CEREBRAS_API_KEY')
-        self.openrouter_key = os.environ.get('OPENROUTER_API_KEY')
+    # Characters of source content the prompt carries
+    CONTENT_LIMIT = 4000
+
+    def __init__(self, keys=None):
+        # {"gemini": ..., "openrouter": ..., "cerebras": ...}; missing ones come from the environment
+        self.keys = keys
     
-    def generate(self, content, persona="investigator", depth="deep_dive", improv=False, guest_persona=None):
+    def _build_prompt(self, content, persona="investigator", depth="deep_dive", improv=False, guest_persona=None):
         persona_instruction = self.PERSONA_PROMPTS.get(persona, self.PERSONA_PROMPTS["investigator"])
         depth_instruction = self.DEPTH_PROMPTS.get(depth, self.DEPTH_PROMPTS["deep_dive"])
         
@@ -80,55 +86,65 @@ class ScriptGenerator:
         5. "segments": List of {{"start_line_index": N, "sentiment": "LOFI"|"TENSE"|"EXCITED"|"CORPORATE"}}.
 
         Content:
-        {content[:4000]}
+        {content[:self.CONTENT_LIMIT]}
         """
 
-        # Tier 1: Gemini 3 Flash
-        if self.gemini_key:
-            try:
-                url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-3-flash-preview:generateContent?key={self.gemini_key}"
-                data = {
-                    "contents": [{"parts": [{"text": prompt}]}],
-                    "generationConfig": {"response_mime_type": "application/json"}
-                }
-                res = requests.post(url, json=data, timeout=30)
-                if res.status_code == 200:
-                    text = res.json()['candidates'][0]['content']['parts'][0]['text']
-                    return json.loads(text)
-            except Exception as e:
-                print(f"Gemini Generation Failed: {e}")
-
-        # Tier 2: OpenRouter (Wait, user said fallback to OpenRouter)
-        if self.openrouter_key:
-            try:
-                headers = {"Authorization": f"Bearer {self.openrouter_key}", "Content-Type": "application/json"}
-                data = {
-                    "model": "qwen/qwen3-4b:free",
-                    "messages": [{"role": "user", "content": prompt}]
-                }
-                res = requests.post("https://openrouter.ai/api/v1/chat/completions", headers=headers, json=data, timeout=30)
-                if res.status_code == 200:
-                    result = res.json()['choices'][0]['message']['content']
-                    if "```json" in result:
-                        result = result.split("```json")[1].split("```")[0].strip()
-                    return json.loads(result)
-            except Exception as e:
-                print(f"OpenRouter Fallback Failed: {e}")
-
-        # Tier 3: Cerebras Fallback
-        if self.cerebras_key:
-            try:
-                headers = {"Authorization": f"Bearer {self.cerebras_key}", "Content-Type": "application/json"}
-                data = {
-                    "model": "llama3.1-8b",
-                    "messages": [{"role": "user", "content": prompt}],
-                    "response_format": {"type": "json_object"}
-                }
-                res = requests.post("https://api.cerebras.ai/v1/chat/completions", headers=headers, json=data, timeout=30)
-                if res.status_code == 200:
-                    result = res.json()['choices'][0]['message']['content']
-                    return json.loads(result)
-            except Exception as e:
-                print(f"Cerebras Final Fallback Failed: {e}")
+        return prompt
+
+    def _cache_key(self, content, persona, depth, improv, guest_persona, long_document):
+        # The inputs as the prompt uses them: unknown persona/depth fall back like _build_prompt
+        return default_llm_cache.make_key(
+            "script", default_llm_gateway.models(),
+            content=normalize_text(content if long_document else content[:self.CONTENT_LIMIT]),
+            long_document=bool(long_document),
+            persona=persona if persona in self.PERSONA_PROMPTS else "investigator",
+            depth=depth if depth in self.DEPTH_PROMPTS else "deep_dive",
+            improv=bool(improv),
+            guest_persona=guest_persona or None
+        )
+
+    def _source(self, content, long_document):
+        """What the prompt gets to see: the opening of the content, or with
+        long_document, key points condensed from all of it."""
+        if long_document:
+            return default_condenser.condense(content, self.CONTENT_LIMIT, focus="the key points for a podcast discussion", keys=self.keys)
+        return content
+
+    def generate(self, content, persona="investigator", depth="deep_dive", improv=False, guest_persona=None, force_fresh=False, long_document=False):
+        key = self._cache_key(content, persona, depth, improv, guest_persona, long_document)
+        if force_fresh:
+            default_llm_cache.skip("script")
+        else:
+            cached = default_llm_cache.get("script", key)
+            if cached is not None:
+                return cached
+
+        prompt = self._build_prompt(self._source(content, long_document), persona, depth, improv, guest_persona)
+
+        # Gemini -> OpenRouter -> Cerebras; raced (first valid JSON wins) only with LLM_HEDGE=1
+        try:
+            result = default_llm_gateway.complete_json(prompt, keys=self.keys, timeout=30, kind="script")
+        except LLMError as e:
+            print(f"Script generation failed: {e}")
+        else:
+            default_llm_cache.put("script", key, result.data, provider=result.provider)
+            return result.data
         
-        raise Exception("All generation engines exhausted.")
\ No newline at end of file
+        raise Exception("All generation engines exhausted.")
+
+    def generate_stream(self, content, persona="investigator", depth="deep_dive", improv=False, guest_persona=None, force_fresh=False, long_document=False) -> StreamedScript:
+        """Like generate, but token-streamed: script lines come out of the returned
+        StreamedScript as the LLM writes them; the rest of the reply (chapters,
+        show notes...) is in its .response once the stream is done. A cached
+        reply is replayed as a single chunk."""
+        key = self._cache_key(content, persona, depth, improv, guest_persona, long_document)
+        if force_fresh:
+            default_llm_cache.skip("script")
+        else:
+            cached = default_llm_cache.get("script", key)
+            if cached is not None:
+                return StreamedScript(iter([json.dumps(cached)]))
+
+        prompt = self._build_prompt(self._source(content, long_document), persona, depth, improv, guest_persona)
+        return StreamedScript(default_llm_gateway.stream(prompt, json_mode=True, keys=self.keys, timeout=30, kind="script"),
+                              on_response=lambda response: default_llm_cache.put("script", key, response))
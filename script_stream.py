@@ -0,0 +1,178 @@
+import re
+
+from llm_gateway import extract_json
+from script_compiler import compile_script, compile_script_line
+
+# Opening quote of the "script" value in the JSON reply
+_SCRIPT_KEY = re.compile(r'[{,]\s*"script"\s*:\s*"')
+_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f', '/': '/', '\\': '\\', '"': '"'}
+# Tail of the reply kept searchable, so a key split across chunks is still found
+_KEY_OVERLAP = 64
+
+
+def _hex(digits) -> int:
+    # Tolerant: a malformed \u escape becomes U+FFFD rather than stopping the stream
+    try:
+        return int(digits, 16)
+    except ValueError:
+        return 0xFFFD
+
+
+class ScriptLineParser:
+    """Pulls script lines out of an LLM reply while it is still streaming.
+
+    feed() takes raw text chunks and returns the (line_index, line) pairs they
+    complete. The reply is expected to be the JSON object ScriptGenerator asks
+    for: the parser finds the "script" string, decodes its escapes as they
+    arrive and closes a line at every newline, without waiting for the rest
+    of the object. A reply that doesn't open like JSON is read as a plain
+    script. Lines are numbered the way script_lines() numbers the finished
+    script, so line indices match the segments metadata.
+    """
+
+    def __init__(self):
+        self.text = ""          # the whole reply so far
+        self.mode = None        # "json" or "plain", decided by the first character
+        self.lines = []         # script lines completed so far
+        self._pos = 0           # next character of text to read
+        self._in_script = False
+        self._closed = False    # the script string has ended
+        self._started = False   # past the leading whitespace script_lines() strips
+        self._line = []
+
+    @property
+    def script(self) -> str:
+        return "\n".join(self.lines)
+
+    def feed(self, chunk) -> list:
+        self.text += chunk
+        if self.mode is None:
+            head = self.text.lstrip()
+            if not head:
+                return []
+            self.mode = "json" if head[0] in "{`" else "plain"
+        out = []
+        if self.mode == "plain":
+            for ch in self.text[self._pos:]:
+                self._char(ch, out)
+            self._pos = len(self.text)
+        else:
+            self._scan_json(out)
+        return out
+
+    def finish(self) -> list:
+        """Lines left open when the reply ends (e.g. a truncated JSON string)."""
+        out = []
+        if self._line:
+            self._end_line(out)
+        self._closed = True
+        return out
+
+    def _scan_json(self, out):
+        text = self.text
+        if self._closed:
+            return
+        if not self._in_script:
+            match = _SCRIPT_KEY.search(text, self._pos)
+            if not match:
+                self._pos = max(self._pos, len(text) - _KEY_OVERLAP)
+                return
+            self._pos = match.end()
+            self._in_script = True
+        i = self._pos
+        while i < len(text):
+            ch = text[i]
+            if ch == '"':
+                self._pos = i + 1
+                if self._line:
+                    self._end_line(out)
+                self._closed = True
+                return
+            if ch == '\\':
+                # An escape split across chunks waits for the rest
+                if i + 1 >= len(text):
+                    break
+                esc = text[i + 1]
+                if esc != 'u':
+                    ch, i = _ESCAPES.get(esc, esc), i + 2
+                else:
+                    if i + 6 > len(text):
+                        break
+                    code = _hex(text[i + 2:i + 6])
+                    if 0xD800 <= code < 0xDC00:
+                        # Surrogate pair: needs the low half too
+                        if i + 12 > len(text):
+                            break
+                        low = _hex(text[i + 8:i + 12])
+                        ch, i = chr(0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)), i + 12
+                    else:
+                        ch, i = chr(code), i + 6
+            else:
+                i += 1
+            self._char(ch, out)
+        self._pos = i
+
+    def _char(self, ch, out):
+        if not self._started:
+            if ch.isspace():
+                return
+            self._started = True
+        if ch == '\n':
+            self._end_line(out)
+        else:
+            self._line.append(ch)
+
+    def _end_line(self, out):
+        line = "".join(self._line)
+        out.append((len(self.lines), line))
+        self.lines.append(line)
+        self._line = []
+
+
+class StreamedScript:
+    """A script still arriving from the LLM.
+
+    segments() yields ScriptSegments as their lines complete, so TTS can start
+    on the first line while the rest is being written. Once it is exhausted,
+    `done` is set and `response` holds the whole reply (chapters, show notes,
+    segments metadata...), parsed as ScriptGenerator.generate would return it.
+    on_response(response) is called once the reply is in, if it parsed as JSON.
+    """
+
+    def __init__(self, chunks, on_response=None):
+        self._chunks = chunks
+        self._on_response = on_response
+        self.parser = ScriptLineParser()
+        self.response = None
+        self.done = False
+        self.segment_count = 0
+        self.parsed = False     # the reply was a JSON object with a script
+
+    def segments(self):
+        for chunk in self._chunks:
+            for line_index, line in self.parser.feed(chunk):
+                segment = compile_script_line(line, line_index)
+                if segment:
+                    self.segment_count += 1
+                    yield segment
+        tail = list(filter(None, (compile_script_line(line, i) for i, line in self.parser.finish())))
+        self.response = self._final_response()
+        if self._on_response and self.parsed:
+            self._on_response(self.response)
+        if not self.parser.lines:
+            # Nothing recognisable streamed (e.g. the script came as a list): use the parsed reply
+            tail = list(compile_script(self.response.get('script', '')))
+        self.segment_count += len(tail)
+        self.done = True
+        yield from tail
+
+    def _final_response(self) -> dict:
+        try:
+            response = extract_json(self.parser.text)
+        except ValueError:
+            response = None
+        if not isinstance(response, dict) or 'script' not in response:
+            # Plain-text or truncated reply: the script is what streamed
+            return {"script": self.parser.script}
+        self.parsed = True
+        return response
@@ -0,0 +1,123 @@
+import os
+import json
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+
+# Byte budget for cached segments (TTS_CACHE_MAX_MB, default 512 MB)
+DEFAULT_CACHE_MAX_BYTES = int(float(os.getenv("TTS_CACHE_MAX_MB", 512)) * 1024 * 1024)
+
+
+class SegmentCache:
+    """Content-addressed on-disk cache of synthesized TTS segments.
+
+    Entries are keyed by a hash of everything that affects the audio and are
+    evicted least-recently-used first once the byte budget is exceeded. Recency
+    is persisted through file mtimes, so the LRU order survives restarts.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=None):
+        self.cache_dir = Path(cache_dir) if cache_dir else BASE_DIR / "history" / "tts_cache"
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes if max_bytes is not None else DEFAULT_CACHE_MAX_BYTES
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> size in bytes, oldest first
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        files = sorted(self.cache_dir.glob("*.seg"), key=lambda p: p.stat().st_mtime)
+        for path in files:
+            size = path.stat().st_size
+            self._entries[path.stem] = size
+            self.total_bytes += size
+        with self._lock:
+            self._evict()
+
+    @staticmethod
+    def make_key(**parts) -> str:
+        """Stable hash of the synthesis inputs (text, voice, engine, controls...)."""
+        payload = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return self.cache_dir / f"{key}.seg"
+
+    def fetch(self, keys, output_file):
+        """Copy the first cached entry among `keys` to output_file.
+
+        Counts one hit or one miss per call and returns the matching key, or None.
+        """
+        with self._lock:
+            for key in keys:
+                if key not in self._entries:
+                    continue
+                path = self._path(key)
+                try:
+                    shutil.copyfile(path, output_file)
+                    os.utime(path)
+                except OSError:
+                    # File vanished underneath us; forget it and keep looking
+                    self.total_bytes -= self._entries.pop(key)
+                    continue
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return key
+            self.misses += 1
+            return None
+
+    def store(self, key, source_file):
+        """Add a freshly synthesized file under `key`, evicting old entries if needed."""
+        try:
+            size = os.path.getsize(source_file)
+        except OSError:
+            return
+        if size == 0 or size > self.max_bytes:
+            return
+
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        try:
+            shutil.copyfile(source_file, tmp_path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"  ⚠️ TTS cache write failed: {e}")
+            try: os.remove(tmp_path)
+            except OSError: pass
+            return
+
+        with self._lock:
+            self.total_bytes -= self._entries.pop(key, 0)
+            self._entries[key] = size
+            self.total_bytes += size
+            self._evict()
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            self.evictions += 1
+            try: os.remove(self._path(key))
+            except OSError: pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions
+            }
+
+
+default_segment_cache = SegmentCache()
@@ -0,0 +1,199 @@
+import os
+import re
+from pydub import AudioSegment
+from pydub.silence import detect_silence
+
+from script_compiler import derive_segment, speakable
+
+# Longest text (chars) sent in one TTS request. Longer lines are split at
+# sentence boundaries and the pieces synthesized in parallel. 300 is the
+# Chatterbox input limit, so every tier can take every piece.
+DEFAULT_MAX_CHARS = int(os.getenv("TTS_MAX_CHARS", 300))
+# Consecutive same-speaker lines shorter than this are sent as one request
+# and cut back apart afterwards (0 disables merging)
+DEFAULT_MERGE_UNDER_CHARS = int(os.getenv("TTS_MERGE_UNDER_CHARS", 80))
+
+# How far (ms) either side of the proportional cut point to look for a pause
+SPLIT_SEARCH_MS = 600
+MIN_PAUSE_MS = 60
+
+_TERMINAL = ('.', '!', '?', '…')
+_CLAUSE_END = (',', ';', ':', '—')
+# A word: a run of non-space characters, with any [tag] or *markdown* span in it
+# taken whole, spaces and all, so no break falls inside one
+_WORD = re.compile(r'(?:\[[^\]]*\]|\*[^*]*\*|\S)+')
+_SPAN = re.compile(r'[\[*]')
+
+
+def _spoken_len(text) -> int:
+    """Length as the engines measure it (clean_text: no markdown or [tags])."""
+    return len(speakable(text))
+
+
+def _runs(words, ends) -> list:
+    """Group words into runs, each closed by a word ending in one of `ends`."""
+    runs, current = [], []
+    for word in words:
+        current.append(word)
+        if word.endswith(ends):
+            runs.append(current)
+            current = []
+    if current:
+        runs.append(current)
+    return runs
+
+
+def _pack(units, max_chars) -> list:
+    """Greedily join units with spaces into chunks of at most max_chars spoken characters."""
+    chunks = []
+    current = ""
+    for unit in units:
+        joined = f"{current} {unit}" if current else unit
+        if current and _spoken_len(joined) > max_chars:
+            chunks.append(current)
+            current = unit
+        else:
+            current = joined
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _split_sentence(words, max_chars) -> list:
+    """Units no longer than max_chars from one overlong sentence: clauses, then words."""
+    units = []
+    for clause in _runs(words, _CLAUSE_END):
+        text = " ".join(clause)
+        if _spoken_len(text) <= max_chars:
+            units.append(text)
+            continue
+        for word in clause:
+            # Only plain words are cut; one holding a tag or markdown is kept whole
+            while len(word) > max_chars and not _SPAN.search(word):
+                units.append(word[:max_chars])
+                word = word[max_chars:]
+            units.append(word)
+    return units
+
+
+def split_text(text: str, max_chars: int = DEFAULT_MAX_CHARS) -> list:
+    """Split text into pieces of at most max_chars, breaking at sentences where possible.
+
+    Length is counted without [tags] and *markdown*, as on clean_text, and
+    breaks only fall on whitespace outside them. Only whitespace between
+    pieces is lost; every word is kept.
+    """
+    text = text.strip()
+    if _spoken_len(text) <= max_chars:
+        return [text]
+    units = []
+    for sentence in _runs(_WORD.findall(text), _TERMINAL):
+        if _spoken_len(" ".join(sentence)) > max_chars:
+            units.extend(_split_sentence(sentence, max_chars))
+        else:
+            units.append(" ".join(sentence))
+    return _pack(units, max_chars)
+
+
+class SynthesisBatch:
+    """Script lines and the TTS requests that produce them.
+
+    Either one line -> one request, one long line -> several requests (the
+    audio is concatenated), or several short lines -> one request (the audio
+    is cut back apart at pauses).
+    """
+
+    __slots__ = ("lines", "requests")
+
+    def __init__(self, lines, requests):
+        self.lines = lines        # [(index, ScriptSegment)] in script order
+        self.requests = requests  # [ScriptSegment] sent to the TTS engines
+
+    @property
+    def is_direct(self):
+        return len(self.lines) == 1 and len(self.requests) == 1
+
+    @property
+    def is_merged(self):
+        return len(self.lines) > 1
+
+    def weights(self) -> list:
+        """Relative spoken length of each line, used to place the cuts in merged audio."""
+        return [max(len(segment.clean_text), 1) for _, segment in self.lines]
+
+
+def _merge(lines) -> SynthesisBatch:
+    if len(lines) == 1:
+        return SynthesisBatch(lines, [lines[0][1]])
+    texts = []
+    for _, segment in lines:
+        text = segment.text.strip()
+        # Terminal punctuation makes the engine pause where we want to cut
+        texts.append(text if text.endswith(_TERMINAL) else text + ".")
+    return SynthesisBatch(lines, [derive_segment(lines[0][1], " ".join(texts))])
+
+
+def _mergeable(segment, merge_under):
+    return 0 < len(segment.clean_text) < merge_under
+
+
+def plan_batches(segments, max_chars=None, merge_under=None):
+    """Yield SynthesisBatches covering every segment, in order. Consumes `segments` lazily."""
+    max_chars = max_chars or DEFAULT_MAX_CHARS
+    merge_under = DEFAULT_MERGE_UNDER_CHARS if merge_under is None else merge_under
+
+    run = []  # pending short lines of one speaker / emotion
+    run_chars = 0
+    for index, segment in enumerate(segments):
+        if run and (
+            not _mergeable(segment, merge_under)
+            or segment.speaker != run[0][1].speaker
+            or segment.emotion != run[0][1].emotion
+            or run_chars + len(segment.clean_text) + 2 > max_chars
+        ):
+            yield _merge(run)
+            run, run_chars = [], 0
+
+        if _mergeable(segment, merge_under):
+            run.append((index, segment))
+            run_chars += len(segment.clean_text) + 2  # room for the added "." and space
+        elif len(segment.clean_text) > max_chars:
+            pieces = split_text(segment.text, max_chars)
+            yield SynthesisBatch([(index, segment)], [derive_segment(segment, p) for p in pieces])
+        else:
+            yield SynthesisBatch([(index, segment)], [segment])
+    if run:
+        yield _merge(run)
+
+
+def join_pieces(files) -> AudioSegment:
+    """Concatenate the audio of a split line."""
+    pieces = [AudioSegment.from_file(str(f)) for f in files]
+    return sum(pieces[1:], pieces[0])
+
+
+def cut_at_pauses(audio: AudioSegment, weights, search_ms=SPLIT_SEARCH_MS) -> list:
+    """Cut merged audio into len(weights) parts.
+
+    Each cut goes to the pause closest to where the text proportions put it,
+    within search_ms; if there is no pause there, the proportional point is used.
+    """
+    total = sum(weights)
+    cuts = [0]
+    consumed = 0
+    for weight in weights[:-1]:
+        consumed += weight
+        target = int(len(audio) * consumed / total)
+        lo = max(cuts[-1], target - search_ms)
+        hi = min(len(audio), target + search_ms)
+        cut = target
+        window = audio[lo:hi]
+        if len(window) >= MIN_PAUSE_MS and window.dBFS != float("-inf"):
+            pauses = detect_silence(window, min_silence_len=MIN_PAUSE_MS,
+                                    silence_thresh=window.dBFS - 16, seek_step=5)
+            if pauses:
+                start, end = min(pauses, key=lambda p: abs(lo + (p[0] + p[1]) // 2 - target))
+                cut = lo + (start + end) // 2
+        cuts.append(max(cut, cuts[-1]))
+    cuts.append(len(audio))
+    return [audio[a:b] for a, b in zip(cuts, cuts[1:])]
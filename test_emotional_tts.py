@@ -4,7 +4,7 @@ Test script to demonstrate emotional TTS capabilities
 """
 import os
 from dotenv import load_dotenv
-from tts_converter import TTSConverter
+from tts_converter import get_converter
 
 load_dotenv()
 
@@ -47,7 +47,7 @@ def main():
     print("\n" + "=" * 60)
     print("\n🎬 Generating emotional podcast segments...\n")
     
-    converter = TTSConverter()
+    converter = get_converter()
     output_dir = "test_emotional_output"
     
     try:
@@ -0,0 +1,80 @@
+import time
+
+from engine_router import EngineRouter, CLOSED, OPEN, HALF_OPEN
+
+
+def _router(**kwargs):
+    options = dict(failure_threshold=2, cooldown_seconds=60, tier_penalty=1.0)
+    options.update(kwargs)
+    return EngineRouter(("fast", "backup", "last"), **options)
+
+
+def _state(router, name):
+    return router._health[name].state
+
+
+def test_untried_engines_keep_tier_order():
+    router = _router()
+    assert router.rank(["fast", "backup", "last"]) == ["fast", "backup", "last"]
+
+
+def test_slow_engine_drops_behind_a_faster_tier():
+    router = _router()
+    router.record("fast", True, 5.0)
+    router.record("backup", True, 0.5)
+    assert router.rank(["fast", "backup"]) == ["backup", "fast"]
+
+
+def test_consecutive_failures_open_the_circuit():
+    router = _router()
+    router.record("fast", False, 1.0)
+    assert _state(router, "fast") == CLOSED
+    router.record("fast", False, 1.0)
+    assert _state(router, "fast") == OPEN
+    assert router.rank(["fast", "backup"]) == ["backup"]
+    assert not router.acquire("fast", ["fast", "backup"])
+
+
+def test_success_resets_the_failure_count():
+    router = _router()
+    router.record("fast", False, 1.0)
+    router.record("fast", True, 1.0)
+    router.record("fast", False, 1.0)
+    assert _state(router, "fast") == CLOSED
+
+
+def test_every_engine_open_falls_back_to_all_of_them():
+    router = _router(failure_threshold=1)
+    for name in ("fast", "backup"):
+        router.record(name, False, 1.0)
+    assert router.rank(["fast", "backup"]) == ["fast", "backup"]
+    assert router.acquire("fast", ["fast", "backup"])
+
+
+def _cool_down(router, name):
+    router._health[name].opened_at = time.time() - router.cooldown_seconds
+
+
+def test_one_probe_after_cooldown_and_a_good_probe_closes():
+    router = _router(failure_threshold=1)
+    router.record("fast", False, 1.0)
+    _cool_down(router, "fast")
+    assert router.rank(["fast", "backup"])[0] == "fast"
+    assert router.acquire("fast", ["fast", "backup"])
+    assert _state(router, "fast") == HALF_OPEN
+    # Only one probe at a time
+    assert not router.acquire("fast", ["fast", "backup"])
+    assert "fast" not in router.rank(["fast", "backup"])
+    router.record("fast", True, 0.2)
+    assert _state(router, "fast") == CLOSED
+
+
+def test_failed_probe_reopens_the_circuit():
+    router = _router(failure_threshold=3)
+    for _ in range(3):
+        router.record("fast", False, 1.0)
+    _cool_down(router, "fast")
+    assert router.acquire("fast", ["fast", "backup"])
+    router.record("fast", False, 1.0)
+    assert _state(router, "fast") == OPEN
+    assert not router.acquire("fast", ["fast", "backup"])
@@ -0,0 +1,33 @@
+from episode_plan import AD_VIBE, ad_insert_index, build_vibe_map, group_by_vibe, insert_into_vibe_map
+
+
+def test_ad_lands_proportionally():
+    assert ad_insert_index(10, 0.5) == 5
+    assert ad_insert_index(10, 0.33) == 3
+
+
+def test_ad_position_is_clamped_to_the_segment_list():
+    assert ad_insert_index(10, 0.0) == 0
+    assert ad_insert_index(10, 1.0) == 10
+    assert ad_insert_index(0, 0.5) == 0
+
+
+def test_ad_never_goes_before_the_intro():
+    assert ad_insert_index(11, 0.0, start=1) == 1
+    assert ad_insert_index(11, 0.5, start=1) == 5
+
+
+def test_inserted_ad_shifts_later_vibes():
+    vibe_map = build_vibe_map([{"start_line_index": 0, "sentiment": "TENSE"},
+                               {"start_line_index": 4, "sentiment": "EXCITED"}], script_start_offset=1)
+    assert vibe_map == {1: "TENSE", 5: "EXCITED"}
+    assert insert_into_vibe_map(vibe_map, 3) == {1: "TENSE", 3: AD_VIBE, 6: "EXCITED"}
+
+
+def test_ad_at_a_vibe_change_pushes_the_change_back():
+    assert insert_into_vibe_map({0: "LOFI", 2: "TENSE"}, 2) == {0: "LOFI", 2: AD_VIBE, 3: "TENSE"}
+
+
+def test_durations_are_grouped_by_vibe():
+    groups = group_by_vibe([100, 200, 300, 400], {0: "TENSE", 2: AD_VIBE})
+    assert groups == [{"vibe": "TENSE", "duration": 300}, {"vibe": AD_VIBE, "duration": 700}]
@@ -0,0 +1,80 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import llm_gateway
+from llm_gateway import LLMGateway, LLMError, LLMResult, Provider, HEDGE_MIN_SAMPLES
+
+TIERS = ("a", "b", "c")
+KEYS = {name: "key" for name in TIERS}
+
+
+def _gateway(behaviour, **options):
+    """A gateway whose tiers answer after `delay` seconds, or fail: {name: (delay, ok)}."""
+    providers = {name: Provider(name, f"TEST_{name.upper()}_KEY", "model") for name in TIERS}
+    gateway = LLMGateway(providers=providers, **options)
+    started = []
+
+    async def attempt(name, key, prompt, system, json_mode, timeout, kind=llm_gateway.DEFAULT_CALL_KIND):
+        started.append(name)
+        delay, ok = behaviour[name]
+        await asyncio.sleep(delay)
+        if not ok:
+            raise httpx.ConnectError(f"{name} down")
+        gateway._record_outcome(name, completion=delay, kind=kind)
+        return LLMResult(f"from {name}", name, delay)
+
+    gateway._attempt = attempt
+    return gateway, started
+
+
+def _stats(gateway, name):
+    return next(s for s in gateway.stats() if s["provider"] == name)
+
+
+@pytest.fixture(autouse=True)
+def short_hedges(monkeypatch):
+    monkeypatch.setattr(llm_gateway, "HEDGE_MIN_DELAY", 0.01)
+
+
+def test_slow_tier_is_hedged_and_the_loser_cancelled():
+    gateway, started = _gateway({"a": (2.0, True), "b": (0.01, True), "c": (0.01, True)}, hedge_delay=0.1)
+    begin = time.perf_counter()
+    result = gateway.complete("prompt", tiers=TIERS, keys=KEYS, hedge=True)
+    assert result.provider == "b"
+    assert time.perf_counter() - begin < 1.0
+    assert started == ["a", "b"]
+    assert _stats(gateway, "a")["cancelled"] == 1
+    assert _stats(gateway, "b")["wins"] == 1
+
+
+def test_failed_tier_starts_the_next_without_waiting():
+    gateway, started = _gateway({"a": (0.0, False), "b": (0.01, True), "c": (0.01, True)}, hedge_delay=5)
+    begin = time.perf_counter()
+    assert gateway.complete("prompt", tiers=TIERS, keys=KEYS, hedge=True).provider == "b"
+    assert time.perf_counter() - begin < 1.0
+
+
+def test_every_tier_failing_raises():
+    gateway, started = _gateway({name: (0.0, False) for name in TIERS}, hedge_delay=5)
+    with pytest.raises(LLMError) as error:
+        gateway.complete("prompt", tiers=TIERS, keys=KEYS, hedge=True)
+    assert all(f"{name} down" in str(error.value) for name in TIERS)
+    assert started == list(TIERS)
+
+
+def test_unhedged_calls_wait_for_the_first_tier():
+    gateway, started = _gateway({"a": (0.3, True), "b": (0.01, True), "c": (0.01, True)}, hedge_delay=0.05, hedge=False)
+    assert gateway.complete("prompt", tiers=TIERS, keys=KEYS).provider == "a"
+    assert started == ["a"]
+
+
+def test_hedge_delay_follows_the_p95_of_each_call_kind():
+    gateway, _ = _gateway({name: (0.0, True) for name in TIERS}, hedge_delay=8)
+    for _ in range(HEDGE_MIN_SAMPLES):
+        gateway._record_outcome("a", completion=0.2, kind="fact_check")
+    assert gateway._hedge_after("a", "fact_check") == pytest.approx(0.2)
+    # Quick fact checks say nothing about how long a script takes
+    assert gateway._hedge_after("a", "script") == 8
@@ -0,0 +1,58 @@
+import random
+import threading
+import time
+
+from pydub import AudioSegment
+
+from parallel_tts import ParallelSynthesizer
+from script_compiler import compile_line
+
+
+class FakeConverter:
+    """Writes a short silent WAV per request after a random delay and tracks concurrency."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def synthesize_segment(self, segment, output_file, use_cache=True):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(random.uniform(0, 0.02))
+        AudioSegment.silent(duration=50 + segment.line_index).export(output_file, format="wav")
+        with self.lock:
+            self.active -= 1
+
+
+def _segments(count):
+    return [compile_line(f"Line number {i}.", "male" if i % 2 else "female", i) for i in range(count)]
+
+
+def _synthesizer(converter, workers):
+    return ParallelSynthesizer(converter, max_workers=workers, max_chars=200, merge_under=0, audio_format="wav")
+
+
+def test_lines_come_back_in_script_order(tmp_path):
+    results = _synthesizer(FakeConverter(), 4).synthesize(_segments(12), tmp_path)
+    assert [index for index, _ in results] == list(range(12))
+    assert all(len(AudioSegment.from_file(str(f))) == 50 + i for i, f in results)
+
+
+def test_requests_in_flight_never_exceed_the_pool(tmp_path):
+    converter = FakeConverter()
+    _synthesizer(converter, 3).synthesize(_segments(20), tmp_path)
+    assert 1 <= converter.peak <= 3
+
+
+def test_progress_is_reported_per_line(tmp_path):
+    progress = []
+    _synthesizer(FakeConverter(), 2).synthesize(_segments(5), tmp_path, on_progress=lambda *args: progress.append(args))
+    assert [(done, total, index) for done, total, index, _ in progress] == [(i + 1, 5, i) for i in range(5)]
+
+
+def test_audio_iterator_leaves_no_work_files(tmp_path):
+    audio = list(_synthesizer(FakeConverter(), 4).iter_audio(iter(_segments(6)), tmp_path))
+    assert [index for index, _ in audio] == list(range(6))
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+
+from scrape_cache import ScrapeCache
+
+URL = "https://example.com/article"
+
+
+class Origin:
+    """A fake fetch: serves `html` with an ETag and answers 304 when the validator matches."""
+
+    def __init__(self, html="<p>v1</p>", etag='"v1"'):
+        self.html = html
+        self.etag = etag
+        self.fail = False
+        self.calls = []
+
+    def __call__(self, url, validators):
+        self.calls.append(dict(validators))
+        if self.fail:
+            raise ConnectionError("origin down")
+        if validators.get("etag") == self.etag:
+            return None
+        return {"html": self.html, "etag": self.etag, "last_modified": None, "extracted": {"body": self.html}}
+
+
+def test_fresh_entry_is_served_without_a_request(tmp_path):
+    cache, origin = ScrapeCache(tmp_path, ttl=3600), Origin()
+    assert cache.get(URL, origin)["html"] == "<p>v1</p>"
+    assert cache.get(URL, origin)["html"] == "<p>v1</p>"
+    assert origin.calls == [{}]
+    assert (cache.misses, cache.hits) == (1, 1)
+
+
+def test_entry_survives_a_new_cache_instance(tmp_path):
+    ScrapeCache(tmp_path, ttl=3600).get(URL, Origin())
+    origin = Origin()
+    assert ScrapeCache(tmp_path, ttl=3600).get(URL, origin)["extracted"] == {"body": "<p>v1</p>"}
+    assert origin.calls == []
+
+
+def test_stale_entry_is_revalidated_with_its_etag(tmp_path):
+    cache, origin = ScrapeCache(tmp_path, ttl=0), Origin()
+    first = cache.get(URL, origin)
+    time.sleep(0.01)
+    second = cache.get(URL, origin)
+    assert origin.calls == [{}, {"etag": '"v1"'}]
+    assert second["html"] == "<p>v1</p>"
+    assert second["fetched_at"] > first["fetched_at"]
+    assert cache.revalidated == 1
+
+
+def test_changed_page_replaces_the_entry(tmp_path):
+    cache, origin = ScrapeCache(tmp_path, ttl=0), Origin()
+    cache.get(URL, origin)
+    origin.html, origin.etag = "<p>v2</p>", '"v2"'
+    assert cache.get(URL, origin)["html"] == "<p>v2</p>"
+    assert cache.refreshed == 1
+
+
+def test_failed_revalidation_serves_the_stale_page(tmp_path):
+    cache, origin = ScrapeCache(tmp_path, ttl=0), Origin()
+    cache.get(URL, origin)
+    origin.fail = True
+    assert cache.get(URL, origin)["html"] == "<p>v1</p>"
+    assert cache.stale_served == 1
+
+
+def test_failed_first_fetch_raises(tmp_path):
+    origin = Origin()
+    origin.fail = True
+    with pytest.raises(ConnectionError):
+        ScrapeCache(tmp_path).get(URL, origin)
+
+
+def test_force_fresh_skips_the_validators(tmp_path):
+    cache, origin = ScrapeCache(tmp_path, ttl=3600), Origin()
+    cache.get(URL, origin)
+    cache.get(URL, origin, force_fresh=True)
+    assert origin.calls == [{}, {}]
+
+
+def test_concurrent_fetches_of_one_url_share_a_request(tmp_path):
+    cache = ScrapeCache(tmp_path)
+    release = threading.Event()
+    calls = []
+
+    def slow_fetch(url, validators):
+        calls.append(url)
+        release.wait(5)
+        return {"html": "<p>once</p>", "extracted": {}}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get(URL, slow_fetch))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    while cache.collapsed < 3:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert calls == [URL]
+    assert [r["html"] for r in results] == ["<p>once</p>"] * 4
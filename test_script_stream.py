@@ -0,0 +1,68 @@
+import json
+
+from script_compiler import compile_script
+from script_stream import ScriptLineParser, StreamedScript
+
+SCRIPT = (
+    "Host 1: [excited] Welcome back! Today: \"quotes\", tabs\tand a back\\slash.\n"
+    "Host 2: *laughs* Unicode too: café, — and \U0001F600.\n"
+    "\n"
+    "Not a speaker line\n"
+    "Guest: Thanks for having me."
+)
+REPLY = json.dumps({"chapters": [{"title": "Intro"}], "script": SCRIPT, "show_notes": "Notes"})
+
+
+def _chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def _streamed_lines(chunks):
+    parser = ScriptLineParser()
+    lines = []
+    for chunk in chunks:
+        lines.extend(parser.feed(chunk))
+    lines.extend(parser.finish())
+    return lines
+
+
+def _summary(segments):
+    return [(s.line_index, s.speaker, s.text, s.clean_text, s.emotion) for s in segments]
+
+
+def test_lines_match_the_finished_script_at_any_chunk_size():
+    expected = list(enumerate(SCRIPT.strip().split("\n")))
+    # Size 1 splits every escape (\n, \", \uXXXX and surrogate pairs) across chunks
+    for size in (1, 2, 5, 7, 64, len(REPLY)):
+        assert _streamed_lines(_chunks(REPLY, size)) == expected
+
+
+def test_key_split_across_chunks_is_found():
+    reply = json.dumps({"show_notes": "x" * 200, "script": "Host 1: Hi."})
+    assert _streamed_lines(_chunks(reply, 3)) == [(0, "Host 1: Hi.")]
+
+
+def test_fenced_reply_is_read_as_json():
+    assert _streamed_lines(["```json\n", REPLY[:40], REPLY[40:], "\n```"])[0] == (0, SCRIPT.split("\n")[0])
+
+
+def test_plain_reply_is_read_as_a_script():
+    assert _streamed_lines(_chunks("\n  Host 1: One.\nHost 2: Two.", 4)) == [(0, "Host 1: One."), (1, "Host 2: Two.")]
+
+
+def test_truncated_reply_keeps_the_open_line():
+    assert _streamed_lines([REPLY[:REPLY.index("Welcome") + 7]]) == [(0, "Host 1: [excited] Welcome")]
+
+
+def test_streamed_segments_match_compile_script():
+    streamed = StreamedScript(iter(_chunks(REPLY, 9)))
+    assert _summary(streamed.segments()) == _summary(compile_script(SCRIPT))
+    assert streamed.done and streamed.parsed
+    assert streamed.response["show_notes"] == "Notes"
+    assert streamed.segment_count == 3
+
+
+def test_script_sent_as_a_list_falls_back_to_the_parsed_reply():
+    reply = json.dumps({"script": ["Host 1: One.", "Host 2: Two."]})
+    streamed = StreamedScript(iter([reply]))
+    assert [s.text for s in streamed.segments()] == ["One.", "Two."]
@@ -0,0 +1,67 @@
+from script_compiler import compile_line, speakable
+from segmenter import split_text, plan_batches
+
+
+def test_short_text_is_one_piece():
+    assert split_text("  Hello there.  ", 50) == ["Hello there."]
+
+
+def test_pieces_fit_and_keep_every_word():
+    text = "First sentence is here. Second one, with a clause; and more words after it. Third!"
+    pieces = split_text(text, 30)
+    assert len(pieces) > 1
+    assert all(len(speakable(p)) <= 30 for p in pieces)
+    assert " ".join(pieces).split() == text.split()
+
+
+def test_prefers_sentence_breaks():
+    assert split_text("One two three. Four five six.", 20) == ["One two three.", "Four five six."]
+
+
+def test_tags_and_markdown_do_not_count_toward_the_limit():
+    text = "[whispers very quietly now] Just a few words *leans in toward the microphone*"
+    assert split_text(text, 20) == [text]
+
+
+def test_never_breaks_inside_a_tag_or_markdown_span():
+    text = " ".join(["word"] * 12) + " [laughs out loud here] " + " ".join(["word"] * 12) + " *a long stage direction* end."
+    for piece in split_text(text, 25):
+        assert piece.count("[") == piece.count("]")
+        assert piece.count("*") % 2 == 0
+
+
+def test_overlong_word_is_cut():
+    assert split_text("a" * 25, 10) == ["a" * 10, "a" * 10, "a" * 5]
+
+
+def _line(text, speaker="male", index=0):
+    return compile_line(text, speaker, index)
+
+
+def test_short_runs_of_one_speaker_are_merged():
+    segments = [_line("Hi.", index=0), _line("Yes", index=1), _line("Okay then", "female", 2)]
+    batches = list(plan_batches(segments, max_chars=100, merge_under=20))
+    assert [[i for i, _ in b.lines] for b in batches] == [[0, 1], [2]]
+    assert batches[0].is_merged
+    assert batches[0].requests[0].text == "Hi. Yes."
+
+
+def test_long_line_is_split_into_requests():
+    segment = _line(" ".join(["Words go here."] * 10))
+    [batch] = plan_batches([segment], max_chars=40, merge_under=0)
+    assert len(batch.requests) > 1
+    assert all(len(r.clean_text) <= 40 for r in batch.requests)
+    assert all(r.speaker == segment.speaker and r.line_index == segment.line_index for r in batch.requests)
+
+
+def test_line_under_the_limit_once_tags_are_removed_is_not_split():
+    segment = _line("[excited] [laughs] " + "x" * 30 + " *pounds the table twice*")
+    [batch] = plan_batches([segment], max_chars=40, merge_under=0)
+    assert batch.is_direct
+
+
+def test_every_line_is_planned_once_in_order():
+    segments = [_line("Short.", "male" if i % 3 else "female", i) for i in range(7)]
+    segments.append(_line("A much longer line that has to be split up. " * 3, "male", 7))
+    batches = list(plan_batches(iter(segments), max_chars=50, merge_under=20))
+    assert [i for b in batches for i, _ in b.lines] == list(range(8))
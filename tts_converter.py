@@ -5,15 +5,101 @@ from dotenv import load_dotenv
 from cartesia import Cartesia
 from pydub import AudioSegment
 import subprocess
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from requests.adapters import HTTPAdapter
+from segment_cache import default_segment_cache
+from voice_registry import default_voice_registry, account_id
+from engine_router import EngineRouter
+from script_compiler import ScriptSegment, compile_script, compile_line, extract_emotion
+import time
+import wave
 
 load_dotenv()
 
+# Fallback order of the synthesis tiers
+ENGINES = ("cartesia", "elevenlabs", "resemble", "chatterbox", "edge")
+
+# Max in-flight requests per provider, shared by every converter in the process.
+# Override with TTS_MAX_CONCURRENCY_<ENGINE>, e.g. TTS_MAX_CONCURRENCY_CARTESIA=8
+DEFAULT_ENGINE_CONCURRENCY = {
+    "cartesia": 4,
+    "elevenlabs": 2,
+    "resemble": 2,
+    "chatterbox": 1,
+    "edge": 4
+}
+
+# Reference recordings for Cartesia cloning and Chatterbox prompts (none for the guest)
+VOICE_SAMPLES = {
+    "male": "test_audio/1754476089398011524-298693777248327.mp3",
+    "female": "test_audio/1754476231322799699-298694229168254.mp3"
+}
+
+EDGE_VOICES = {
+    "male": "en-US-GuyNeural",
+    "female": "en-US-AriaNeural",
+    "guest": "en-US-EricNeural"
+}
+
+# Segments written to a .wav path are requested as raw PCM where the provider
+# supports it (no MP3 encode here, no ffmpeg decode later); .mp3 paths get MP3
+CARTESIA_SAMPLE_RATE = 44100
+# pcm_44100 needs a Pro ElevenLabs plan; pcm_24000 works on every tier
+ELEVENLABS_PCM_FORMAT = os.getenv("ELEVENLABS_PCM_FORMAT", "pcm_24000")
+
+# Chatterbox rejects longer input; such text is left to the other engines
+# (the segmenter keeps lines under this by default)
+CHATTERBOX_MAX_CHARS = 300
+
+# Per-request timeout (seconds) for every provider call, so a dead engine fails fast
+TTS_REQUEST_TIMEOUT = float(os.getenv("TTS_REQUEST_TIMEOUT", 30))
+
+# Health/latency tracking shared by every converter: providers fail for everyone at once
+default_engine_router = EngineRouter(ENGINES)
+
+_engine_limits = {
+    engine: int(os.getenv(f"TTS_MAX_CONCURRENCY_{engine.upper()}", limit))
+    for engine, limit in DEFAULT_ENGINE_CONCURRENCY.items()
+}
+_engine_slots = {engine: threading.BoundedSemaphore(limit) for engine, limit in _engine_limits.items()}
+
+# gradio_client takes no timeout, so Chatterbox calls run here and are waited on for
+# at most TTS_REQUEST_TIMEOUT; a hung call keeps its thread but releases its slot
+_chatterbox_pool = ThreadPoolExecutor(max_workers=_engine_limits["chatterbox"], thread_name_prefix="chatterbox")
+
+
+def _is_wav(path) -> bool:
+    return str(path).lower().endswith(".wav")
+
+
+def _write_pcm_wav(pcm: bytes, output_file, sample_rate, channels=1, sample_width=2):
+    """Wrap raw little-endian PCM in a WAV header."""
+    with wave.open(str(output_file), "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(sample_width)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+
+
+def _transcode(source, output_file):
+    """Re-encode source into output_file's container (wav or mp3) with ffmpeg."""
+    ffmpeg_path = shutil.which("ffmpeg") or "ffmpeg"
+    subprocess.run(
+        [ffmpeg_path, "-y", "-i", source, "-f", "wav" if _is_wav(output_file) else "mp3", output_file],
+        check=True,
+        stderr=subprocess.PIPE,
+        text=True,
+        timeout=TTS_REQUEST_TIMEOUT
+    )
+
 
 class TTSConverter:
-    def __init__(self):
-        self.cartesia_key = os.getenv('CARTESIA_API_KEY')
-        self.elevenlabs_key = os.getenv('ELEVENLABS_API_KEY')
-        self.resemble_key = os.getenv('RESEMBLE_API_KEY')
+    def __init__(self, cartesia_key=None, elevenlabs_key=None, resemble_key=None, segment_cache=None, voice_registry=None, engine_router=None):
+        self.cartesia_key = cartesia_key or os.getenv('CARTESIA_API_KEY')
+        self.elevenlabs_key = elevenlabs_key or os.getenv('ELEVENLABS_API_KEY')
+        self.resemble_key = resemble_key or os.getenv('RESEMBLE_API_KEY')
         self.resemble_project_id = "dd6cd421"
         
         # Cartesia Voice IDs
@@ -39,7 +125,18 @@ class TTSConverter:
 
         self.cartesia_client = None
         if self.cartesia_key:
-            self.cartesia_client = Cartesia(api_key=self.cartesia_key)
+            self.cartesia_client = Cartesia(api_key=self.cartesia_key, timeout=TTS_REQUEST_TIMEOUT)
+
+        self.segment_cache = segment_cache or default_segment_cache
+        self.voice_registry = voice_registry or default_voice_registry
+        self.engine_router = engine_router or default_engine_router
+        self._voices_lock = threading.Lock()
+        self._voices_ready = False
+
+        # Keep-alive HTTP session for the REST tiers (ElevenLabs / Resemble)
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=sum(DEFAULT_ENGINE_CONCURRENCY.values()))
+        self.http.mount("https://", adapter)
 
     @property
     def voices(self):
@@ -47,272 +144,317 @@ class TTSConverter:
         
     def convert(self, script: str, output_dir: str = "audio_segments") -> list:
         """Convert script to speech with multiple fallbacks."""
-        if self.cartesia_client:
-            self._setup_cartesia_voices()
-
-        segments = self._parse_script(script)
+        segments = compile_script(script)
         os.makedirs(output_dir, exist_ok=True)
         
         audio_files = []
-        for i, (speaker, text) in enumerate(segments, 1):
+        for i, segment in enumerate(segments, 1):
             print(f"  Generating segment {i}/{len(segments)} ...")
             audio_file = os.path.join(output_dir, f"segment_{i:03d}.mp3")
             
-            self._generate_and_save_speech(text, speaker, audio_file)
-            audio_files.append((speaker, audio_file))
+            self.synthesize_segment(segment, audio_file)
+            audio_files.append((segment.speaker, audio_file))
             print(f"  ✓ Saved to {audio_file}")
         
         return audio_files
 
     def _setup_cartesia_voices(self):
-        """Attempts to clone voices in Cartesia if samples exist."""
-        samples = {
-            "male": "test_audio/1754476089398011524-298693777248327.mp3",
-            "female": "test_audio/1754476231322799699-298694229168254.mp3"
-        }
-        try:
-            voices_pager = self.cartesia_client.voices.list()
-            existing_voices = [v for v in voices_pager]
-            
-            for speaker, sample_path in samples.items():
+        """Attempts to clone voices in Cartesia if samples exist.
+
+        Resolved IDs are kept in the voice registry, so the voices.list() / clone
+        round trips only happen once per account per TTL. Safe to call from many
+        threads; the work is done once per converter. get_converter calls it
+        before handing a converter out.
+        """
+        if not self.cartesia_client:
+            return
+        with self._voices_lock:
+            if self._voices_ready:
+                return
+            account = account_id(self.cartesia_key)
+            pending = {}
+            for speaker, sample_path in VOICE_SAMPLES.items():
                 if not os.path.exists(sample_path): continue
-                voice_name = f"Podcast {speaker.capitalize()} Clone"
-                found = next((v for v in existing_voices if v.get('name') == voice_name), None)
-                
-                if found:
-                    self.cartesia_voices[speaker] = found['id']
+                cached = self.voice_registry.get("cartesia", account, speaker)
+                if cached:
+                    self.cartesia_voices[speaker] = cached
                 else:
-                    new_voice = self.cartesia_client.voices.clone(
-                        name=voice_name,
-                        filepath=sample_path,
-                        description=f"Cloned for podcast {speaker}"
-                    )
-                    self.cartesia_voices[speaker] = new_voice['id']
-        except Exception as e:
-            print(f"  ⚠️ Cartesia setup failed: {e}. Using defaults.")
+                    pending[speaker] = sample_path
+
+            try:
+                if pending:
+                    voices_pager = self.cartesia_client.voices.list()
+                    existing_voices = [v for v in voices_pager]
+
+                for speaker, sample_path in pending.items():
+                    voice_name = f"Podcast {speaker.capitalize()} Clone"
+                    found = next((v for v in existing_voices if v.get('name') == voice_name), None)
+                    
+                    if found:
+                        self.cartesia_voices[speaker] = found['id']
+                    else:
+                        new_voice = self.cartesia_client.voices.clone(
+                            name=voice_name,
+                            filepath=sample_path,
+                            description=f"Cloned for podcast {speaker}"
+                        )
+                        self.cartesia_voices[speaker] = new_voice['id']
+                    self.voice_registry.put("cartesia", account, speaker, self.cartesia_voices[speaker])
+                self._voices_ready = True
+            except Exception as e:
+                print(f"  ⚠️ Cartesia setup failed: {e}. Using defaults.")
 
     def _parse_script(self, script) -> list:
-        segments = []
-        if isinstance(script, list):
-            lines = [str(item.get('text') if isinstance(item, dict) else item) for item in script]
-        elif isinstance(script, dict):
-            lines = [str(v) for v in script.values()]
-        else:
-            lines = str(script).strip().split('\n')
-            
-        for line in lines:
-            line = line.strip()
-            if line.startswith("Host 1:"):
-                segments.append(("male", line.replace("Host 1:", "").strip()))
-            elif line.startswith("Host 2:"):
-                segments.append(("female", line.replace("Host 2:", "").strip()))
-            elif line.startswith("Guest:"):
-                segments.append(("guest", line.replace("Guest:", "").strip()))
-        return segments
+        """Legacy (speaker, text) view of compile_script()."""
+        return [(seg.speaker, seg.text) for seg in compile_script(script)]
 
     def _extract_emotion_context(self, text: str) -> dict:
         """Extract emotional cues from text and map to Cartesia controls."""
-        import re
-        
-        # Default emotional state
-        emotion_controls = {
-            "speed": "normal",
-            "emotion": []
-        }
-        
-        text_lower = text.lower()
+        return extract_emotion(text)
+
+    def _engine_enabled(self, engine: str) -> bool:
+        if engine == "cartesia":
+            return bool(self.cartesia_client and self.cartesia_key)
+        if engine == "elevenlabs":
+            return bool(self.elevenlabs_key)
+        if engine == "resemble":
+            return bool(self.resemble_key)
+        return True
+
+    def _engine_voice(self, engine: str, speaker: str):
+        """Voice (or voice sample) each engine uses for a speaker."""
+        if engine == "cartesia":
+            return self.cartesia_voices.get(speaker, self.cartesia_voices["male"])
+        if engine == "elevenlabs":
+            return self.eleven_voices.get(speaker) or self.eleven_voices["male"]
+        if engine == "resemble":
+            return self.resemble_voices.get(speaker, self.resemble_voices["female"])
+        if engine == "chatterbox":
+            return VOICE_SAMPLES.get(speaker)
+        return EDGE_VOICES.get(speaker, EDGE_VOICES["male"])
+
+    def _cache_key(self, engine, segment, wav=False) -> str:
+        """Hash of everything that changes the audio a given engine would return."""
+        voice = self._engine_voice(engine, segment.speaker)
+        if engine == "cartesia":
+            return self.segment_cache.make_key(
+                engine=engine, model="sonic-english", voice=voice,
+                text=segment.cartesia_text, controls=segment.emotion,
+                format=f"{'pcm_s16le' if wav else 'mp3'}/{CARTESIA_SAMPLE_RATE}"
+            )
+        if engine == "elevenlabs":
+            return self.segment_cache.make_key(
+                engine=engine, model="eleven_turbo_v2_5", voice=voice,
+                text=segment.cartesia_text, format=ELEVENLABS_PCM_FORMAT if wav else "mp3"
+            )
+        return self.segment_cache.make_key(
+            engine=engine, voice=voice, text=segment.clean_text, format="wav" if wav else "mp3"
+        )
+
+    def _generate_and_save_speech(self, text: str, speaker: str, output_file: str, use_cache: bool = True):
+        """Synthesize one raw line (speaker prefix optional) to output_file."""
+        self.synthesize_segment(compile_line(text, speaker), output_file, use_cache=use_cache)
+
+    def synthesize_segment(self, segment: ScriptSegment, output_file: str, use_cache: bool = True):
+        """Core generation logic with 5-tier automatic fallback.
+
+        Engines are tried healthiest/fastest first (see EngineRouter); engines
+        whose circuit is open are skipped without waiting on their timeout.
+        With use_cache, a segment already synthesized for the same text, voice
+        and controls by the engine that would be tried first right now is
+        copied from the segment cache instead; a fallback engine's audio is
+        only reused while that engine is the first choice.
+        Cartesia / ElevenLabs get segment.cartesia_text (emotion tags kept, they
+        support them natively); the other engines get segment.clean_text.
+        A .wav output_file gets uncompressed PCM, a .mp3 one gets MP3.
+        """
+        speaker = segment.speaker
+        if not segment.clean_text: return 
         
-        # Detect laughter/joy
-        if re.search(r'\[laugh', text_lower) or re.search(r'\[chuckle', text_lower):
-            emotion_controls["emotion"].append("positivity:high")
-            
-        # Detect excitement/energy
-        if re.search(r'\[excit', text_lower) or re.search(r'\[energet', text_lower):
-            emotion_controls["emotion"].append("curiosity:high")
-            emotion_controls["speed"] = "fast"
-            
-        # Detect sadness/sorrow
-        if re.search(r'\[sad', text_lower) or re.search(r'\[sorrow', text_lower) or re.search(r'\[sigh', text_lower):
-            emotion_controls["emotion"].append("sadness:high")
-            emotion_controls["speed"] = "slow"
+        engines = [e for e in ENGINES if self._engine_enabled(e)]
+        wav = _is_wav(output_file)
+        cache_keys = {e: self._cache_key(e, segment, wav) for e in engines}
+        ranked = self.engine_router.rank(engines)
+        if use_cache and ranked and self.segment_cache.fetch([cache_keys[ranked[0]]], output_file):
+            print(f"  💾 TTS cache hit for {speaker}")
+            return
+
+        for engine in ranked:
+            if not self.engine_router.acquire(engine, engines):
+                continue
+            # Cap in-flight requests per provider across every worker thread
+            with _engine_slots[engine]:
+                speak = getattr(self, f"_speak_{engine}")
+                started = time.monotonic()
+                ok = speak(segment, output_file)
+                self.engine_router.record(engine, ok, time.monotonic() - started)
+            if ok:
+                self.segment_cache.store(cache_keys[engine], output_file)
+                return
+
+        # If all 5 engines fail
+        if not os.path.exists(output_file) or os.path.getsize(output_file) == 0:
+            raise Exception(f"All 5 TTS Engines failed for speaker: {speaker}")
+
+    def _speak_cartesia(self, segment, output_file) -> bool:
+        """Tier 1: Cartesia with EMOTIONAL CONTROLS."""
+        speaker = segment.speaker
+        try:
+            voice_id = self._engine_voice("cartesia", speaker)
             
-        # Detect anger/frustration
-        if re.search(r'\[angr', text_lower) or re.search(r'\[frustrat', text_lower):
-            emotion_controls["emotion"].append("anger:high")
+            # Build voice config with emotional controls
+            voice_config = {
+                "mode": "id",
+                "id": voice_id,
+                "__experimental_controls": segment.emotion
+            }
             
-        # Detect calmness
-        if re.search(r'\[calm', text_lower) or re.search(r'\[whisper', text_lower):
-            emotion_controls["emotion"].append("positivity:low")
-            emotion_controls["speed"] = "slow"
+            print(f"  🎭 Cartesia generating with emotions: {segment.emotion}")
             
-        # Detect nervousness/fear
-        if re.search(r'\[nervous', text_lower) or re.search(r'\[scar', text_lower):
-            emotion_controls["emotion"].append("anger:lowest")
-            emotion_controls["speed"] = "fast"
-        
-        # If no specific emotion detected, use neutral positive
-        if not emotion_controls["emotion"]:
-            emotion_controls["emotion"] = ["positivity:medium", "curiosity:medium"]
-        
-        return emotion_controls
-
-
-    def _generate_and_save_speech(self, text: str, speaker: str, output_file: str):
-        """Core generation logic with 5-tier automatic fallback."""
-        speaker = speaker.lower()
-        import re
-        
-        # Extract emotional context for Cartesia emotional controls
-        emotion_context = self._extract_emotion_context(text)
-        
-        # For Cartesia: KEEP emotional tags - it supports them natively!
-        # Only clean for non-Cartesia fallbacks
-        cartesia_text = re.sub(r'\*.*?\*', '', text).strip()  # Remove markdown only
-        
-        # For other services: clean all emotional markers
-        clean_text = re.sub(r'\[.*?\]', '', text).strip()
-        clean_text = re.sub(r'\*.*?\*', '', clean_text).strip()
-        if not clean_text: return 
-        
-        # Step 1: Try Cartesia with EMOTIONAL CONTROLS
-        if self.cartesia_client and self.cartesia_key:
-            try:
-                voice_id = self.cartesia_voices.get(speaker, self.cartesia_voices["male"])
-                
-                # Build voice config with emotional controls
-                voice_config = {
-                    "mode": "id",
-                    "id": voice_id,
-                    "__experimental_controls": emotion_context
-                }
-                
-                print(f"  🎭 Cartesia generating with emotions: {emotion_context}")
-                
-                output = self.cartesia_client.tts.bytes(
-                    model_id="sonic-english",
-                    transcript=cartesia_text,  # Keep emotion tags!
-                    voice=voice_config,
-                    output_format={"container": "mp3", "encoding": "mp3", "sample_rate": 44100}
-                )
+            wav = _is_wav(output_file)
+            if wav:
+                output_format = {"container": "raw", "encoding": "pcm_s16le", "sample_rate": CARTESIA_SAMPLE_RATE}
+            else:
+                output_format = {"container": "mp3", "encoding": "mp3", "sample_rate": CARTESIA_SAMPLE_RATE}
+            output = self.cartesia_client.tts.bytes(
+                model_id="sonic-english",
+                transcript=segment.cartesia_text,  # Keep emotion tags!
+                voice=voice_config,
+                output_format=output_format
+            )
+            if wav:
+                _write_pcm_wav(b"".join(output), output_file, CARTESIA_SAMPLE_RATE)
+            else:
                 with open(output_file, 'wb') as f:
                     for chunk in output: f.write(chunk)
-                return 
-            except Exception as e:
-                print(f"  ⚠️ Cartesia failed for {speaker}: {e}. Falling back to ElevenLabs...")
+            return True
+        except Exception as e:
+            print(f"  ⚠️ Cartesia failed for {speaker}: {e}. Falling back...")
+        return False
 
-        # Step 2: Try ElevenLabs v3 (supports emotion tags!)
-        if self.elevenlabs_key:
-            try:
-                voice_id = self.eleven_voices.get(speaker)
-                if not voice_id:
-                     voice_id = self.eleven_voices["male"]
-                
-                print(f"  -🎭 ElevenLabs v3 generating with emotions for {speaker} using voice {voice_id}")
-                
-                # ElevenLabs v3 supports emotion tags like [laughs], [whispers], [angry], etc.
-                # Keep the emotional tags in the text!
-                elevenlabs_text = re.sub(r'\*.*?\*', '', text).strip()  # Remove markdown only
-                
-                url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
-                headers = {
-                    "Accept": "audio/mpeg",
-                    "Content-Type": "application/json",
-                    "xi-api-key": self.elevenlabs_key
-                }
-                data = {
-                    "text": elevenlabs_text,  # Keep emotion tags!
-                    "model_id": "eleven_turbo_v2_5",  # v3 model with emotion support
-                    "voice_settings": {
-                        "stability": 0.5, 
-                        "similarity_boost": 0.75,
-                        "style": 0.5,  # Enable expressive delivery
-                        "use_speaker_boost": True
-                    }
+    def _speak_elevenlabs(self, segment, output_file) -> bool:
+        """Tier 2: ElevenLabs v3 (supports emotion tags!)."""
+        speaker = segment.speaker
+        try:
+            voice_id = self._engine_voice("elevenlabs", speaker)
+            
+            print(f"  -🎭 ElevenLabs v3 generating with emotions for {speaker} using voice {voice_id}")
+            
+            # ElevenLabs v3 supports emotion tags like [laughs], [whispers], [angry], etc.
+            # Keep the emotional tags in the text!
+            url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
+            wav = _is_wav(output_file)
+            params = {"output_format": ELEVENLABS_PCM_FORMAT} if wav else None
+            headers = {
+                "Accept": "audio/pcm" if wav else "audio/mpeg",
+                "Content-Type": "application/json",
+                "xi-api-key": self.elevenlabs_key
+            }
+            data = {
+                "text": segment.cartesia_text,  # Keep emotion tags!
+                "model_id": "eleven_turbo_v2_5",  # v3 model with emotion support
+                "voice_settings": {
+                    "stability": 0.5, 
+                    "similarity_boost": 0.75,
+                    "style": 0.5,  # Enable expressive delivery
+                    "use_speaker_boost": True
                 }
-                response = requests.post(url, json=data, headers=headers)
-                if response.status_code == 200:
+            }
+            response = self.http.post(url, json=data, headers=headers, params=params, timeout=TTS_REQUEST_TIMEOUT)
+            if response.status_code == 200:
+                if wav:
+                    _write_pcm_wav(response.content, output_file, int(ELEVENLABS_PCM_FORMAT.split("_")[1]))
+                else:
                     with open(output_file, 'wb') as f:
                         f.write(response.content)
-                    print(f"  ✨ ElevenLabs saved emotional audio for {speaker}")
-                    return 
-                else:
-                    print(f"  ⚠️ ElevenLabs API Error: {response.text}")
-            except Exception as e:
-                print(f"  ⚠️ ElevenLabs failed for {speaker}: {e}")
-
+                print(f"  ✨ ElevenLabs saved emotional audio for {speaker}")
+                return True
+            else:
+                print(f"  ⚠️ ElevenLabs API Error: {response.text}")
+        except Exception as e:
+            print(f"  ⚠️ ElevenLabs failed for {speaker}: {e}")
+        return False
 
-        # Step 3: Try Resemble AI API
-        if self.resemble_key:
-            try:
-                voice_uuid = self.resemble_voices.get(speaker, self.resemble_voices["female"])
-                print(f"  -> Resemble AI generating for {speaker} using voice {voice_uuid}")
-                
-                url = f"https://app.resemble.ai/api/v2/projects/{self.resemble_project_id}/clips"
-                headers = {
-                    "Authorization": f"Token token={self.resemble_key}",
-                    "Content-Type": "application/json"
-                }
-                data = {
-                    "title": f"Podcast Segment {speaker}",
-                    "body": clean_text,
-                    "voice_uuid": voice_uuid,
-                    "is_public": False,
-                    "is_archived": False
-                }
-                
-                res = requests.post(url, json=data, headers=headers)
-                if res.status_code == 200:
-                    clip_data = res.json().get("item")
-                    audio_src = clip_data.get("audio_src")
-                    if audio_src:
-                        audio_res = requests.get(audio_src)
-                        with open(output_file, 'wb') as f:
-                            f.write(audio_res.content)
-                        print(f"  ✨ Resemble AI saved audio for {speaker}")
-                        return
-                else:
-                    print(f"  ⚠️ Resemble API Error: {res.text}")
-            except Exception as e:
-                print(f"  ⚠️ Resemble AI failed: {e}")
+    def _speak_resemble(self, segment, output_file) -> bool:
+        """Tier 3: Resemble AI API."""
+        speaker = segment.speaker
+        try:
+            voice_uuid = self._engine_voice("resemble", speaker)
+            print(f"  -> Resemble AI generating for {speaker} using voice {voice_uuid}")
+            
+            url = f"https://app.resemble.ai/api/v2/projects/{self.resemble_project_id}/clips"
+            headers = {
+                "Authorization": f"Token token={self.resemble_key}",
+                "Content-Type": "application/json"
+            }
+            data = {
+                "title": f"Podcast Segment {speaker}",
+                "body": segment.clean_text,
+                "voice_uuid": voice_uuid,
+                "is_public": False,
+                "is_archived": False
+            }
+            if _is_wav(output_file):
+                data["output_format"] = "wav"
+            
+            res = self.http.post(url, json=data, headers=headers, timeout=TTS_REQUEST_TIMEOUT)
+            if res.status_code == 200:
+                clip_data = res.json().get("item")
+                audio_src = clip_data.get("audio_src")
+                if audio_src:
+                    audio_res = self.http.get(audio_src, timeout=TTS_REQUEST_TIMEOUT)
+                    with open(output_file, 'wb') as f:
+                        f.write(audio_res.content)
+                    print(f"  ✨ Resemble AI saved audio for {speaker}")
+                    return True
+            else:
+                print(f"  ⚠️ Resemble API Error: {res.text}")
+        except Exception as e:
+            print(f"  ⚠️ Resemble AI failed: {e}")
+        return False
 
-        # Step 4: Try Resemble Chatterbox
+    def _speak_chatterbox(self, segment, output_file) -> bool:
+        """Tier 4: Resemble Chatterbox (Gradio space)."""
+        speaker = segment.speaker
+        if len(segment.clean_text) > CHATTERBOX_MAX_CHARS:
+            # Truncating would silently drop the rest of the line
+            print(f"  ⚠️ Chatterbox skipped for {speaker}: {len(segment.clean_text)} chars > {CHATTERBOX_MAX_CHARS}")
+            return False
         try:
             from gradio_client import Client, handle_file
             print(f"  -> Resemble Chatterbox generating for {speaker} (final fallback)")
             
-            sample_path = None
-            if speaker == "male":
-                sample_path = "test_audio/1754476089398011524-298693777248327.mp3"
-            elif speaker == "female":
-                sample_path = "test_audio/1754476231322799699-298694229168254.mp3"
-            
+            sample_path = self._engine_voice("chatterbox", speaker)
             sample_arg = None
             if sample_path and os.path.exists(sample_path):
                  sample_arg = handle_file(os.path.abspath(sample_path))
 
-            client = Client("ResembleAI/Chatterbox")
-            result = client.predict(
-                text_input=clean_text[:300],  
-                audio_prompt_path_input=sample_arg,
-                exaggeration_input=0.5,
-                temperature_input=0.8,
-                seed_num_input=0,
-                cfgw_input=0.5,
-                vad_trim_input=False,
-                api_name="/generate_tts_audio"
-            )
-            
+            def generate():
+                client = Client("ResembleAI/Chatterbox")
+                return client.predict(
+                    text_input=segment.clean_text,
+                    audio_prompt_path_input=sample_arg,
+                    exaggeration_input=0.5,
+                    temperature_input=0.8,
+                    seed_num_input=0,
+                    cfgw_input=0.5,
+                    vad_trim_input=False,
+                    api_name="/generate_tts_audio"
+                )
+
+            future = _chatterbox_pool.submit(generate)
+            try:
+                result = future.result(timeout=TTS_REQUEST_TIMEOUT)
+            except FutureTimeout:
+                future.cancel()
+                print(f"  ⚠️ Resemble Chatterbox timed out after {TTS_REQUEST_TIMEOUT:.0f}s for {speaker}")
+                return False
+
             if result and os.path.exists(result):
-                ffmpeg_path = shutil.which("ffmpeg") or "ffmpeg"
                 try:
-                    subprocess.run(
-                        [ffmpeg_path, "-y", "-i", result, "-f", "mp3", output_file],
-                        check=True,
-                        stderr=subprocess.PIPE,
-                        text=True
-                    )
+                    _transcode(result, output_file)
                     print(f"  ✨ Resemble Chatterbox saved audio (converted) for {speaker}")
-                    return
+                    return True
                 except subprocess.CalledProcessError as e:
                     print(f"  ⚠️ FFmpeg failed: {e.stderr}")
                     try:
@@ -320,35 +462,68 @@ class TTSConverter:
                     except: pass
         except Exception as e:
             print(f"  ⚠️ Resemble Chatterbox failed: {e}")
+        return False
 
-        # Step 5: Try Edge TTS (Free Neural - Ultimate Backup)
+    def _speak_edge(self, segment, output_file) -> bool:
+        """Tier 5: Edge TTS (Free Neural - Ultimate Backup)."""
+        speaker = segment.speaker
         try:
             import sys
             print(f"  -> Edge TTS generating for {speaker} (ultimate backup)")
-            edge_voice = "en-US-GuyNeural" # Default Male
-            if speaker == "female":
-                edge_voice = "en-US-AriaNeural"
-            elif speaker == "guest":
-                edge_voice = "en-US-EricNeural"
+            edge_voice = self._engine_voice("edge", speaker)
             
             edge_bin = shutil.which("edge-tts")
             if not edge_bin:
                 # Fallback to venv bin
                 edge_bin = os.path.join(os.path.dirname(sys.executable), "edge-tts")
             
+            # Edge only speaks MP3; decode it here when the caller wants PCM
+            media_file = output_file + ".mp3" if _is_wav(output_file) else output_file
             subprocess.run(
-                [edge_bin, "--text", clean_text, "--voice", edge_voice, "--write-media", output_file],
+                [edge_bin, "--text", segment.clean_text, "--voice", edge_voice, "--write-media", media_file],
                 check=True,
                 stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL
+                stderr=subprocess.DEVNULL,
+                timeout=TTS_REQUEST_TIMEOUT
             )
+            if media_file != output_file:
+                try:
+                    _transcode(media_file, output_file)
+                finally:
+                    os.remove(media_file)
             
             if os.path.exists(output_file) and os.path.getsize(output_file) > 0:
                 print(f"  ✨ Edge TTS saved audio for {speaker}")
-                return
+                return True
         except Exception as e:
             print(f"  ⚠️ Edge TTS failed: {e}")
+        return False
 
-        # Step 6: If all 5 engines fail
-        if not os.path.exists(output_file) or os.path.getsize(output_file) == 0:
-            raise Exception(f"All 5 TTS Engines failed for speaker: {speaker}")
\ No newline at end of file
+
+# Process-wide converters keyed by credentials, so requests reuse clients,
+# keep-alive connections and resolved voices instead of rebuilding them
+MAX_POOLED_CONVERTERS = 8
+_converter_pool = OrderedDict()
+_converter_pool_lock = threading.Lock()
+
+
+def get_converter(cartesia_key=None, elevenlabs_key=None, resemble_key=None) -> TTSConverter:
+    """Return the shared TTSConverter for these credentials (env vars fill the gaps)."""
+    creds = (
+        cartesia_key or os.getenv('CARTESIA_API_KEY'),
+        elevenlabs_key or os.getenv('ELEVENLABS_API_KEY'),
+        resemble_key or os.getenv('RESEMBLE_API_KEY')
+    )
+    with _converter_pool_lock:
+        converter = _converter_pool.get(creds)
+        if converter is None:
+            converter = TTSConverter(*creds)
+            _converter_pool[creds] = converter
+            while len(_converter_pool) > MAX_POOLED_CONVERTERS:
+                _converter_pool.popitem(last=False)
+        else:
+            _converter_pool.move_to_end(creds)
+    # Outside the pool lock: the first call per account may clone voices. Callers
+    # for the same converter wait on its own lock until the voices are resolved
+    converter._setup_cartesia_voices()
+    return converter
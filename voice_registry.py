@@ -0,0 +1,63 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+
+# How long a resolved/cloned voice ID is trusted before we ask the provider again
+DEFAULT_VOICE_TTL_SECONDS = int(float(os.getenv("VOICE_REGISTRY_TTL_HOURS", 24)) * 3600)
+
+
+def account_id(api_key: str) -> str:
+    """Registry namespace for a credential. Never store the key itself."""
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+
+
+class VoiceRegistry:
+    """Persistent cache of provider voice IDs (resolved or cloned) with a TTL."""
+
+    def __init__(self, path=None, ttl_seconds=None):
+        self.path = Path(path) if path else BASE_DIR / "history" / "voice_registry.json"
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else DEFAULT_VOICE_TTL_SECONDS
+        self._lock = threading.Lock()
+        self._entries = {}
+        try:
+            with open(self.path, "r") as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def _key(self, provider, account, speaker):
+        return f"{provider}:{account}:{speaker}"
+
+    def get(self, provider, account, speaker):
+        """Return the cached voice ID, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(self._key(provider, account, speaker))
+        if not entry or time.time() - entry["resolved_at"] > self.ttl_seconds:
+            return None
+        return entry["voice_id"]
+
+    def put(self, provider, account, speaker, voice_id):
+        with self._lock:
+            self._entries[self._key(provider, account, speaker)] = {
+                "voice_id": voice_id,
+                "resolved_at": time.time()
+            }
+            self._save()
+
+    def _save(self):
+        tmp_path = self.path.with_suffix(".json.tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump(self._entries, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"  ⚠️ Voice registry write failed: {e}")
+
+
+default_voice_registry = VoiceRegistry()
@@ -0,0 +1,64 @@
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+JOBS_DIR = Path(__file__).resolve().parent / "history" / "jobs"
+# Workspaces left behind by a crashed or killed process are swept after this long
+STALE_WORKSPACE_SECONDS = int(os.getenv("STALE_WORKSPACE_SECONDS", 24 * 3600))
+
+
+class JobWorkspace:
+    """Private scratch directory for one generation job.
+
+    Every job gets a unique directory under history/jobs, so concurrent jobs
+    never write, read or delete each other's segment files. Finished
+    artifacts are written inside the workspace and moved into place with
+    publish(): os.replace is atomic on the same filesystem, so nothing ever
+    sees a half-written episode. Leaving the `with` block removes the
+    directory and everything that was not published.
+    """
+
+    def __init__(self, prefix="job_", root=JOBS_DIR):
+        root = Path(root)
+        root.mkdir(parents=True, exist_ok=True)
+        self.path = Path(tempfile.mkdtemp(prefix=prefix, dir=root))
+        self.job_id = self.path.name[len(prefix):]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cleanup()
+
+    def file(self, name) -> Path:
+        """Path for a work file inside the workspace."""
+        return self.path / name
+
+    def publish(self, name, dest_dir, dest_name=None) -> Path:
+        """Atomically move a finished work file to dest_dir; returns its new path."""
+        dest = Path(dest_dir) / (dest_name or name)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(self.path / name, dest)
+        return dest
+
+    def cleanup(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def sweep_stale_workspaces(root=JOBS_DIR, max_age=STALE_WORKSPACE_SECONDS) -> int:
+    """Remove workspaces untouched for max_age seconds; returns how many went."""
+    root = Path(root)
+    if not root.exists():
+        return 0
+    cutoff = time.time() - max_age
+    removed = 0
+    for path in root.iterdir():
+        try:
+            if path.is_dir() and path.stat().st_mtime < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+        except OSError:
+            continue
+    return removed